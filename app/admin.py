@@ -0,0 +1,68 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
+from app.agendador import situacao
+from app.auth import ADMIN_USERNAME, ADMIN_PASSWORD
+from app.ingestao import atualizar, atualizar_todos, TIPOS
+from app.cache_respostas import cache
+from app.database import get_db_leitura
+
+router = APIRouter()
+
+def validar_admin(admin: OAuth2PasswordRequestForm = Depends()):
+    if admin.username != ADMIN_USERNAME or admin.password != ADMIN_PASSWORD:
+        raise HTTPException(status_code=401, detail="Acesso negado ao avaliador.")
+    return admin.username
+
+@router.post("/admin/atualizar", summary="Atualiza a base com os dados da Embrapa")
+def atualizar_base(tipo: Optional[str] = None, forcar: bool = False, admin: str = Depends(validar_admin)):
+    """
+    Dispara a ingestão dos dados diretamente do site da Embrapa.
+
+    - Sem o parâmetro `tipo`, atualiza todos os conjuntos de dados.
+    - Os endpoints de consulta passam a refletir os novos dados assim que a ingestão termina.
+
+    **Parâmetros (form-data do admin):**
+    - `username`: admin
+    - `password`: admin123
+
+    **Query Params:**
+    - `tipo` (opcional): `producao`, `comercializacao`, `processamento`, `importacao` ou `exportacao`
+    - `forcar` (opcional): reprocessa os arquivos mesmo que não tenham mudado desde a última ingestão
+    """
+    if tipo is None:
+        return atualizar_todos(forcar=forcar)
+    if tipo not in TIPOS:
+        raise HTTPException(status_code=400, detail=f"Tipo deve ser um de {TIPOS}.")
+    return {tipo: atualizar(tipo, forcar)}
+
+@router.post("/admin/cache", summary="Estatísticas do cache de respostas")
+def estatisticas_cache(limpar: bool = False, admin: str = Depends(validar_admin)):
+    """
+    Mostra o estado do cache de respostas dos endpoints de consulta: entradas, acertos, falhas,
+    remoções por tamanho, expiradas por TTL, respostas 304 e invalidações (uma por ingestão com dados novos).
+
+    **Parâmetros (form-data do admin):**
+    - `username`: admin
+    - `password`: admin123
+
+    **Query Params:**
+    - `limpar` (opcional): descarta todas as entradas antes de retornar as estatísticas
+    """
+    if limpar:
+        cache.invalidar()
+    return cache.estatisticas()
+
+@router.post("/admin/ingestao", summary="Situação das ingestões por conjunto de dados")
+def situacao_ingestao(db: Session = Depends(get_db_leitura), admin: str = Depends(validar_admin)):
+    """
+    Mostra, para cada conjunto de dados, a última tentativa de ingestão (origem, sucesso, erro),
+    o último sucesso (duração e registros inseridos/atualizados/removidos/inalterados), se os dados estão
+    vencidos (último sucesso há mais de `INGESTAO_INTERVALO_HORAS`) e se há ingestão em andamento.
+
+    **Parâmetros (form-data do admin):**
+    - `username`: admin
+    - `password`: admin123
+    """
+    return situacao(db)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app import ingestao
+from app.config import settings
+from app.database import SessionLeitura
+from app.models import ExecucaoIngestao
+
+logger = logging.getLogger(__name__)
+
+def _ultima(db: Session, tipo: str, somente_sucesso: bool = False):
+    query = db.query(ExecucaoIngestao).filter(ExecucaoIngestao.tipo == tipo)
+    if somente_sucesso:
+        query = query.filter(ExecucaoIngestao.sucesso == 1)
+    return query.order_by(ExecucaoIngestao.iniciado_em.desc()).first()
+
+def situacao(db: Session) -> dict:
+    """Por conjunto: última tentativa, último sucesso (com duração e contagens) e se os dados estão vencidos."""
+    intervalo = timedelta(hours=settings.INGESTAO_INTERVALO_HORAS)
+    agora = datetime.utcnow()
+    resultado = {}
+    for tipo in ingestao.TIPOS:
+        tentativa, sucesso = _ultima(db, tipo), _ultima(db, tipo, somente_sucesso=True)
+        resultado[tipo] = {
+            "ultima_tentativa": tentativa and {
+                "iniciado_em": tentativa.iniciado_em,
+                "origem": tentativa.origem,
+                "sucesso": bool(tentativa.sucesso),
+                "erro": tentativa.erro,
+            },
+            "ultimo_sucesso": sucesso and {
+                "finalizado_em": sucesso.finalizado_em,
+                "duracao_s": sucesso.duracao_s,
+                "arquivos": sucesso.arquivos,
+                "inseridos": sucesso.inseridos,
+                "atualizados": sucesso.atualizados,
+                "removidos": sucesso.removidos,
+                "inalterados": sucesso.inalterados,
+            },
+            "desatualizado": sucesso is None or agora - sucesso.finalizado_em > intervalo,
+            "em_andamento": tipo in ingestao._em_andamento,
+        }
+    return resultado
+
+def _sucesso(resultado: dict) -> bool:
+    return "erro" not in resultado and not any("erro" in a for a in resultado.get("arquivos", []))
+
+class Agendador:
+    """
+    Atualiza cada conjunto de dados em segundo plano, a cada `INGESTAO_INTERVALO_HORAS`
+    (com variação aleatória de `AGENDADOR_JITTER`, para os conjuntos não coincidirem).
+
+    As consultas nunca esperam pela Embrapa: continuam lendo os dados já gravados enquanto
+    a atualização roda numa thread (stale-while-revalidate). Um endpoint que encontre seu
+    conjunto vencido apenas antecipa a próxima atualização.
+    """
+
+    def __init__(self):
+        self._proximas = {}
+        self._ultimo_sucesso = {}
+        self._ultima_tentativa = {}
+        self._acordar = None
+        self._tarefa = None
+
+    @property
+    def intervalo(self) -> float:
+        return settings.INGESTAO_INTERVALO_HORAS * 3600
+
+    def _com_jitter(self, segundos: float) -> float:
+        return segundos * (1 + random.uniform(-settings.AGENDADOR_JITTER, settings.AGENDADOR_JITTER))
+
+    def _carregar_estado(self):
+        db = SessionLeitura()
+        try:
+            return {tipo: _ultima(db, tipo, somente_sucesso=True) for tipo in ingestao.TIPOS}
+        finally:
+            db.close()
+
+    async def iniciar(self):
+        estado = await asyncio.to_thread(self._carregar_estado)
+        agora, relogio = datetime.utcnow(), time.monotonic()
+        for tipo, execucao in estado.items():
+            if execucao is None:
+                restante = 0.0
+            else:
+                self._ultimo_sucesso[tipo] = execucao.finalizado_em
+                restante = max(0.0, self.intervalo - (agora - execucao.finalizado_em).total_seconds())
+            # Conjuntos vencidos não disparam todos juntos na subida da API
+            self._proximas[tipo] = relogio + restante + random.uniform(0, settings.AGENDADOR_ATRASO_INICIAL_S)
+        self._acordar = asyncio.Event()
+        self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    async def _executar(self):
+        while True:
+            tipo = min(self._proximas, key=self._proximas.get)
+            espera = self._proximas[tipo] - time.monotonic()
+            if espera > 0:
+                self._acordar.clear()
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), timeout=espera)
+                    continue  # agenda antecipada: recalcula o próximo conjunto
+                except asyncio.TimeoutError:
+                    pass
+
+            self._ultima_tentativa[tipo] = time.monotonic()
+            try:
+                resultado = await asyncio.to_thread(ingestao.atualizar, tipo, False, "agendador")
+            except Exception:
+                logger.exception("Falha na atualização agendada de %s", tipo)
+                resultado = {"erro": "exceção"}
+
+            if _sucesso(resultado):
+                self._ultimo_sucesso[tipo] = datetime.utcnow()
+                self._proximas[tipo] = time.monotonic() + self._com_jitter(self.intervalo)
+            else:
+                logger.warning("Atualização agendada de %s com erro; nova tentativa em %s s", tipo, settings.AGENDADOR_RETENTATIVA_S)
+                self._proximas[tipo] = time.monotonic() + self._com_jitter(settings.AGENDADOR_RETENTATIVA_S)
+
+    def revalidar_se_desatualizado(self, tipo: str):
+        """Chamado pelos endpoints: se o conjunto estiver vencido, antecipa sua atualização (sem esperar por ela)."""
+        if self._tarefa is None or tipo not in self._proximas:
+            return
+        ultimo = self._ultimo_sucesso.get(tipo)
+        if ultimo is not None and datetime.utcnow() - ultimo < timedelta(seconds=self.intervalo):
+            return
+        agora = time.monotonic()
+        tentativa = self._ultima_tentativa.get(tipo)
+        if tentativa is not None and agora - tentativa < settings.AGENDADOR_RETENTATIVA_S:
+            return  # falhou há pouco: não insiste a cada requisição
+        if self._proximas[tipo] > agora:
+            self._proximas[tipo] = agora
+            self._acordar.set()
+
+agendador = Agendador()
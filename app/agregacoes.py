@@ -0,0 +1,195 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import Float, and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.agendador import agendador
+from app.auth_token import get_current_user
+from app.cache_respostas import responder_com_cache_async
+from app.consultas import TABELAS, TABELAS_ARVORE
+from app.database import get_db_async
+from app.models import NoArvore, TotalArvore
+
+router = APIRouter()
+
+# Colunas textuais que podem ser filtradas (lista de valores) e agrupadas, quando existem na tabela
+COLUNAS_TEXTO = ["categoria", "control", "produto", "cultivar", "pais"]
+AGREGACOES = {"soma": func.sum, "media": func.avg, "minimo": func.min, "maximo": func.max}
+# "crescimento": variação da soma em relação ao ano anterior, dentro do mesmo grupo
+AGREGACOES_VALIDAS = [*AGREGACOES, "crescimento"]
+# Nível da árvore de itens (`arvore_itens`) agregado nos conjuntos de produtos/cultivares: somar
+# itens de primeiro nível e subitens juntos contaria o mesmo volume duas vezes
+NIVEIS = {
+    "itens": lambda no: no.c.nivel == 1,
+    "subitens": lambda no: no.c.nivel == 2,
+    "folhas": lambda no: and_(no.c.nivel > 0, no.c.filhos == 0),
+    "todos": None,
+}
+
+def colunas_valor(tabela) -> list:
+    return [c for c in tabela.columns if isinstance(c.type, Float)]
+
+def fonte_por_nivel(tipo: str, nivel: str):
+    """
+    Nós de um nível da árvore de itens (`arvore_itens`) com o total pré-calculado de cada ano
+    (`totais_arvore`), nas colunas do conjunto: o item sem valor no CSV entra com a soma dos
+    subitens, como no total da categoria. Com `todos`, a própria tabela.
+    """
+    tabela = TABELAS[tipo]["modelo"].__table__
+    if NIVEIS[nivel] is None:
+        return tabela
+    totais, no = TotalArvore.__table__, NoArvore.__table__
+    valor, = colunas_valor(tabela)
+    return (
+        select(
+            totais.c.categoria, no.c.control, no.c.nome.label(TABELAS[tipo]["filtro"]),
+            totais.c.ano, totais.c.total.label(valor.name),
+        )
+        .join_from(totais, no, and_(
+            no.c.tabela == totais.c.tabela, no.c.categoria == totais.c.categoria, no.c.chave == totais.c.chave,
+        ))
+        .where(totais.c.tabela == tipo, NIVEIS[nivel](no))
+        .subquery()
+    )
+
+def montar_agregacao(
+    tipo: str,
+    agrupar: List[str],
+    agregacoes: List[str],
+    filtros: dict,
+    ano_inicial: Optional[int] = None,
+    ano_final: Optional[int] = None,
+    limite: int = 1000,
+    offset: int = 0,
+    nivel: Optional[str] = None,
+):
+    """
+    Compila filtros, agrupamento e agregações numa única instrução SQL com parâmetros.
+
+    - `nivel`: nos conjuntos de produtos/cultivares, o nível da árvore de itens agregado
+      (padrão `itens`, o de primeiro nível; ver `NIVEIS`); não se aplica a importação/exportação
+    - `filtros`: coluna textual -> lista de valores aceitos (`IN`), servidos pelos índices `(coluna, ano)`
+    - cada agregação é calculada para cada coluna numérica da tabela (`soma_quantidade`, `media_valor_usd`...)
+    - `crescimento` usa `LAG` sobre a soma, por grupo e em ordem de ano; é nulo quando o ano
+      anterior não tem dados. O ano anterior ao `ano_inicial` entra na consulta interna só
+      para o cálculo do crescimento do primeiro ano.
+
+    Levanta ValueError com a mensagem para o cliente quando os parâmetros não se aplicam ao conjunto.
+    """
+    if tipo in TABELAS_ARVORE:
+        nivel = nivel or "itens"
+        if nivel not in NIVEIS:
+            raise ValueError(f"Nível '{nivel}' inválido; use {list(NIVEIS)}.")
+    elif nivel is not None:
+        raise ValueError(f"'nivel' só se aplica a {TABELAS_ARVORE}.")
+    else:
+        nivel = "todos"
+    tabela = fonte_por_nivel(tipo, nivel)
+    textos = [c for c in COLUNAS_TEXTO if c in tabela.c]
+    invalidos = [c for c in [*agrupar, *filtros] if c != "ano" and c not in textos]
+    if invalidos:
+        raise ValueError(f"Colunas {invalidos} não existem em {tipo}; use {['ano', *textos]}.")
+    invalidas = [a for a in agregacoes if a not in AGREGACOES_VALIDAS]
+    if invalidas:
+        raise ValueError(f"Agregações {invalidas} inválidas; use {AGREGACOES_VALIDAS}.")
+    if not agrupar and not agregacoes:
+        raise ValueError("Informe ao menos uma coluna em 'agrupar' ou uma 'agregacao'.")
+    crescimento = "crescimento" in agregacoes
+    if crescimento and "ano" not in agrupar:
+        raise ValueError("A agregação 'crescimento' requer agrupar por 'ano'.")
+
+    grupos = [tabela.c[c] for c in dict.fromkeys(agrupar)]
+    # Na árvore, os nomes dos itens são gravados sem espaços nas pontas
+    filtros = {c: [v.strip() for v in valores] if nivel != "todos" and c != "control" else valores for c, valores in filtros.items()}
+    condicoes = [tabela.c[c].in_(valores) for c, valores in filtros.items() if valores]
+    if ano_inicial is not None:
+        condicoes.append(tabela.c.ano >= (ano_inicial - 1 if crescimento else ano_inicial))
+    if ano_final is not None:
+        condicoes.append(tabela.c.ano <= ano_final)
+
+    colunas = [
+        AGREGACOES[agregacao](coluna).label(f"{agregacao}_{coluna.name}")
+        for agregacao in dict.fromkeys(agregacoes) if agregacao in AGREGACOES
+        for coluna in colunas_valor(tabela)
+    ]
+    if crescimento:
+        demais = [g for g in grupos if g.name != "ano"]
+        for coluna in colunas_valor(tabela):
+            colunas += [
+                func.sum(coluna).label(f"_soma_{coluna.name}"),
+                func.lag(func.sum(coluna)).over(partition_by=demais, order_by=tabela.c.ano).label(f"_anterior_{coluna.name}"),
+            ]
+        colunas.append(func.lag(tabela.c.ano).over(partition_by=demais, order_by=tabela.c.ano).label("_ano_anterior"))
+
+    consulta = select(*grupos, *colunas).where(*condicoes).group_by(*grupos)
+    if not crescimento:
+        return consulta.order_by(*grupos).limit(limite).offset(offset)
+
+    interna = consulta.subquery()
+    externas = [interna.c[c.key] for c in [*grupos, *colunas] if not c.key.startswith("_")]
+    for coluna in colunas_valor(tabela):
+        soma, anterior = interna.c[f"_soma_{coluna.name}"], interna.c[f"_anterior_{coluna.name}"]
+        consecutivo = and_(interna.c._ano_anterior == interna.c.ano - 1, anterior != 0)
+        externas.append(case((consecutivo, (soma - anterior) / anterior), else_=None).label(f"crescimento_{coluna.name}"))
+    externa = select(*externas)
+    if ano_inicial is not None:
+        externa = externa.where(interna.c.ano >= ano_inicial)
+    return externa.order_by(*[interna.c[g.name] for g in grupos]).limit(limite).offset(offset)
+
+async def consultar_agregacao(db: AsyncSession, consulta, limite: int, offset: int) -> dict:
+    resultados = [dict(linha) for linha in (await db.execute(consulta)).mappings()]
+    return {"limite": limite, "offset": offset, "resultados": resultados}
+
+@router.get("/agregacoes/{tipo}", summary="Agrega um conjunto de dados no servidor")
+async def agregacoes(
+    tipo: str,
+    request: Request,
+    agrupar: List[str] = Query(["ano"]),
+    agregacao: List[str] = Query(["soma"]),
+    ano_inicial: Optional[int] = Query(None, ge=1970, le=2100),
+    ano_final: Optional[int] = Query(None, ge=1970, le=2100),
+    produto: List[str] = Query([]),
+    cultivar: List[str] = Query([]),
+    pais: List[str] = Query([]),
+    control: List[str] = Query([]),
+    categoria: List[str] = Query([]),
+    nivel: Optional[str] = Query(None),
+    limite: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db_async),
+    usuario: str = Depends(get_current_user),
+):
+    """
+    Filtra, agrupa e agrega um conjunto de dados numa única consulta SQL, em vez de baixar
+    as tabelas para agregar no cliente.
+
+    - `agrupar`: uma ou mais colunas entre `ano`, `categoria`, `control` e a coluna textual
+      do conjunto (`produto`, `cultivar` ou `pais`); vazio (`agrupar=`) agrega tudo numa linha
+    - `agregacao`: uma ou mais entre `soma`, `media`, `minimo`, `maximo` e `crescimento`
+      (variação anual da soma, requer agrupar por `ano`), calculadas para cada coluna numérica
+    - `nivel` (produção, comercialização e processamento): `itens` (padrão, itens de primeiro
+      nível, como no total da categoria), `subitens`, `folhas` (nós sem filhos) ou `todos`
+      (todas as linhas, somando itens e subitens juntos)
+    - Filtros: `ano_inicial`, `ano_final` e listas de valores (ex: `pais=Chile&pais=Paraguai`)
+    - Resultados ordenados pelas colunas de agrupamento, paginados com `limite` e `offset`
+
+    **Parâmetro de caminho:**
+    - `tipo`: `producao`, `comercializacao`, `processamento`, `importacao` ou `exportacao`
+
+    🔒 Este endpoint requer autenticação via token JWT.
+    """
+    if tipo not in TABELAS:
+        raise HTTPException(status_code=404, detail=f"Tipo deve ser um de {list(TABELAS)}.")
+    filtros = {
+        coluna: valores
+        for coluna, valores in (("produto", produto), ("cultivar", cultivar), ("pais", pais), ("control", control), ("categoria", categoria))
+        if valores
+    }
+    try:
+        consulta = montar_agregacao(
+            tipo, [c for c in agrupar if c], [a for a in agregacao if a], filtros, ano_inicial, ano_final, limite, offset, nivel
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    agendador.revalidar_se_desatualizado(tipo)
+    return await responder_com_cache_async(request, lambda: consultar_agregacao(db, consulta, limite, offset))
@@ -1,28 +1,162 @@
-from fastapi import APIRouter, Query
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.catalogo import sem_acentos
+from app.config import settings
+from app.consultas import TABELAS_ARVORE
+from app.database import SessionLeitura
+from app.models import MetricaComercio, NoArvore, ResumoAnual, SerieAnual, ResumoSerie, TotalArvore
+from app.cache_respostas import responder_com_cache_async
 
 router = APIRouter()
 
+# Variação das importações (último ano) a partir da qual o ajuste de estoque é recomendado
+LIMIAR_ALERTA_ESTOQUE = 0.10
+
+def _calcular(funcao, *args):
+    db = SessionLeitura()
+    try:
+        return funcao(db, *args)
+    finally:
+        db.close()
+
+def _em_thread(funcao, *args):
+    """Cálculo síncrono (SQLAlchemy + pandas/NumPy) executado fora do event loop."""
+    return run_in_threadpool(_calcular, funcao, *args)
+
+def _tendencia(cagr):
+    if cagr is None:
+        return "indefinida"
+    if cagr > 0.01:
+        return "crescimento"
+    if cagr < -0.01:
+        return "queda"
+    return "estavel"
+
+def _prever_producao(db: Session, anos: int, produto: Optional[str]):
+    # O modelo (NumPy/pandas) só é importado na primeira previsão, não na subida da API
+    from app.previsao import obter_modelo
+
+    versao, modelo = obter_modelo(db)
+    if modelo is None:
+        raise HTTPException(status_code=404, detail="Dados de produção insuficientes. Execute a ingestão.")
+
+    ultimo_ano = modelo["ultimo_ano"]
+    anos_previstos = list(range(ultimo_ano + 1, ultimo_ano + anos + 1))
+    previsoes = modelo["previsoes"][:, :anos]
+    total = previsoes[modelo["raiz"]].sum(axis=0)
+
+    selecionados = range(len(previsoes))
+    if produto:
+        termo = produto.lower()
+        selecionados = [i for i, nome in enumerate(modelo["nomes"]) if termo in nome.lower()]
+
+    return {
+        "modelo": "tendencia_linear_ar1",
+        "versao_dados": versao,
+        "base": {"ano_inicial": modelo["ano_inicial"], "ano_final": ultimo_ano},
+        "previsoes": [
+            {"ano": ano, "producao_prevista": float(valor)} for ano, valor in zip(anos_previstos, total)
+        ],
+        "produtos": [
+            {
+                "produto": modelo["nomes"][i],
+                "nivel": "categoria" if modelo["raiz"][i] else "subitem",
+                "previsoes": [
+                    {"ano": ano, "producao_prevista": float(valor)} for ano, valor in zip(anos_previstos, previsoes[i])
+                ],
+            }
+            for i in selecionados
+        ],
+    }
+
 @router.get("/producao/previsao", summary="Previsão futura da produção de uvas")
-def prever_producao(anos: int = Query(5, ge=1, le=20)):
+async def prever_producao(
+    request: Request,
+    anos: int = Query(5, ge=1, le=settings.PREVISAO_HORIZONTE_MAXIMO),
+    produto: Optional[str] = None,
+):
     """
     Estima a produção de uvas para os próximos anos com base em dados históricos.
 
-    - Utiliza modelos de séries temporais (ex: regressão, ARIMA, LSTM)
+    - Ajusta tendência linear + termo autorregressivo para cada produto, todos de uma vez
+    - O modelo é recalculado apenas quando a ingestão altera os dados de produção
     - Ideal para planejamento agrícola e dimensionamento de oferta
 
-    **Parâmetro:**
+    **Parâmetros:**
     - `anos`: número de anos a prever (padrão: 5)
+    - `produto` (opcional): nome ou parte do nome do produto
 
     🔒 (futuramente protegido por autenticação)
     """
-    return {"em_desenvolvimento": True}
+    return await responder_com_cache_async(request, lambda: _em_thread(_prever_producao, anos, produto))
+
+def _escapar_like(termo: str) -> str:
+    """Trata `%` e `_` digitados pelo usuário como texto, não como curingas do LIKE."""
+    return termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _tendencia_exportacao(db: Session, pais: str):
+    resumos = (
+        db.query(ResumoSerie)
+        .filter(ResumoSerie.tabela == "exportacao", ResumoSerie.nome.ilike(f"%{_escapar_like(pais)}%", escape="\\"))
+        .order_by(ResumoSerie.nome, ResumoSerie.categoria)
+        .all()
+    )
+    if not resumos:
+        raise HTTPException(status_code=404, detail=f"Nenhuma exportação encontrada para '{pais}'.")
+
+    resultado = []
+    for r in resumos:
+        serie = (
+            db.query(MetricaComercio)
+            .filter(
+                MetricaComercio.categoria == r.categoria,
+                MetricaComercio.pais == r.chave,
+                MetricaComercio.ano > r.ano_final - 10,
+                MetricaComercio.quantidade_exportacao.isnot(None),
+            )
+            .order_by(MetricaComercio.ano)
+            .all()
+        )
+        ultimo = serie[-1] if serie else None
+        resultado.append({
+            "pais": r.nome,
+            "categoria": r.categoria,
+            "periodo": {"ano_inicial": r.ano_inicial, "ano_final": r.ano_final},
+            "quantidade_total": r.quantidade_total,
+            "valor_total_usd": r.valor_total,
+            "quantidade_ultimo_ano": r.quantidade_ultimo_ano,
+            "variacao_ultimo_ano": r.variacao_ultimo_ano,
+            "cagr": r.cagr,
+            "tendencia": _tendencia(r.cagr),
+            "preco_medio_usd": ultimo.preco_exportacao if ultimo else None,
+            "preco_medio_5_anos_usd": ultimo.preco_5_anos_exportacao if ultimo else None,
+            "participacao_ultimo_ano": ultimo.participacao_exportacao if ultimo else None,
+            "saldo_comercial_usd": ultimo.saldo_usd if ultimo else None,
+            "ultimos_anos": [
+                {
+                    "ano": s.ano,
+                    "quantidade": s.quantidade_exportacao,
+                    "valor_usd": s.valor_exportacao,
+                    "preco_usd": s.preco_exportacao,
+                    "participacao": s.participacao_exportacao,
+                    "media_5_anos": s.media_5_anos_exportacao,
+                    "saldo_usd": s.saldo_usd,
+                }
+                for s in serie
+            ],
+        })
+    return resultado
 
 @router.get("/exportacao/tendencias", summary="Análise de tendências de exportação por país")
-def analisar_tendencia_exportacao(pais: str = Query(..., min_length=2)):
+async def analisar_tendencia_exportacao(request: Request, pais: str = Query(..., min_length=2)):
     """
     Analisa o comportamento das exportações para determinado país.
 
-    - Calcula crescimento médio, padrão de sazonalidade e tendência
+    - Calcula crescimento médio (CAGR), variação no último ano e tendência, por categoria de produto
+    - Preço médio (US$ por unidade), participação do país no total exportado, média móvel de
+      5 anos e saldo comercial com o país, lidos de `metricas_comercio`
     - Útil para direcionar políticas comerciais
 
     **Parâmetro:**
@@ -30,34 +164,206 @@ def analisar_tendencia_exportacao(pais: str = Query(..., min_length=2)):
 
     🔒 (futuramente protegido por autenticação)
     """
-    return {"em_desenvolvimento": True}
+    return await responder_com_cache_async(request, lambda: _em_thread(_tendencia_exportacao, pais))
+
+def _ranking_regioes(db: Session, ano: int):
+    itens = (
+        db.query(SerieAnual)
+        .filter(SerieAnual.tabela == "comercializacao", SerieAnual.ano == ano, SerieAnual.raiz == 1)
+        .order_by(SerieAnual.quantidade.desc())
+        .all()
+    )
+    if not itens:
+        raise HTTPException(status_code=404, detail=f"Sem dados de comercialização para {ano}.")
+
+    total = sum(i.quantidade or 0 for i in itens)
+    return {
+        "ano": ano,
+        "total": total,
+        "ranking": [
+            {
+                "posicao": posicao,
+                "produto": i.nome,
+                "volume": i.quantidade,
+                "participacao": (i.quantidade or 0) / total if total else None,
+                "variacao_anual": i.variacao_anual,
+            }
+            for posicao, i in enumerate(itens, start=1)
+        ],
+    }
 
 @router.get("/comercializacao/ranking-regioes", summary="Ranking de regiões por comercialização")
-def ranking_regioes(ano: int = Query(..., ge=1970, le=2100)):
+async def ranking_regioes(request: Request, ano: int = Query(..., ge=1970, le=2100)):
     """
-    Lista as regiões com maior volume comercializado em um ano específico.
+    Lista os produtos com maior volume comercializado em um ano específico.
 
-    - Permite análise geográfica da distribuição de mercado
-    - Suporta dashboards regionais
+    - Os dados de comercialização da Embrapa não são regionalizados: o ranking é feito
+      pelos grupos de produtos (ex: VINHO DE MESA, SUCO DE UVAS), com a participação de cada um
+    - Suporta dashboards de distribuição de mercado
 
     **Parâmetro:**
     - `ano`: ano de referência para análise
 
     🔒 (futuramente protegido por autenticação)
     """
-    return {"em_desenvolvimento": True}
+    return await responder_com_cache_async(request, lambda: _em_thread(_ranking_regioes, ano))
+
+def _alerta_estoque(db: Session, produto: str):
+    termo = sem_acentos(produto).strip().replace(" ", "_")
+    categorias = [
+        c for (c,) in db.query(ResumoAnual.categoria).filter(ResumoAnual.tabela == "importacao").distinct()
+        if termo in c
+    ]
+    if not categorias:
+        raise HTTPException(status_code=404, detail=f"Produto '{produto}' não encontrado nas importações.")
+
+    alertas = []
+    for categoria in sorted(categorias):
+        # Totais da categoria (país "") nos dois últimos anos com importações
+        totais = (
+            db.query(MetricaComercio)
+            .filter(
+                MetricaComercio.categoria == categoria,
+                MetricaComercio.pais == "",
+                MetricaComercio.quantidade_importacao.isnot(None),
+            )
+            .order_by(MetricaComercio.ano.desc())
+            .limit(2)
+            .all()
+        )
+        if not totais:
+            alertas.append({
+                "categoria": categoria,
+                "ano": None,
+                "recomendacao": "sem_dados",
+                "mensagem": "Sem importações registradas para esta categoria.",
+            })
+            continue
+        ultimo, anterior = totais[0], totais[1] if len(totais) > 1 else None
+        variacao = (
+            (ultimo.quantidade_importacao - anterior.quantidade_importacao) / anterior.quantidade_importacao
+            if anterior and anterior.quantidade_importacao else None
+        )
+
+        if variacao is not None and variacao > LIMIAR_ALERTA_ESTOQUE:
+            recomendacao = "aumentar"
+            mensagem = "Importações em alta: considere ampliar o estoque para acompanhar a demanda."
+        elif variacao is not None and variacao < -LIMIAR_ALERTA_ESTOQUE:
+            recomendacao = "reduzir"
+            mensagem = "Importações em queda: considere reduzir o estoque ou a produção."
+        else:
+            recomendacao = "manter"
+            mensagem = "Importações estáveis: mantenha o nível atual de estoque."
+
+        alertas.append({
+            "categoria": categoria,
+            "ano": ultimo.ano,
+            "quantidade_ultimo_ano": ultimo.quantidade_importacao,
+            "media_anos_anteriores": anterior.media_5_anos_importacao if anterior else None,
+            "variacao_ultimo_ano": variacao,
+            "cagr_5_anos": ultimo.cagr_5_anos_importacao,
+            "preco_medio_usd": ultimo.preco_importacao,
+            "preco_medio_5_anos_usd": ultimo.preco_5_anos_importacao,
+            "saldo_comercial_usd": ultimo.saldo_usd,
+            "recomendacao": recomendacao,
+            "mensagem": mensagem,
+        })
+    return alertas
 
 @router.get("/importacao/alerta-estoque", summary="Recomendação de estoque para vinícolas")
-def alerta_estoque(produto: str = Query(..., min_length=3)):
+async def alerta_estoque(request: Request, produto: str = Query(..., min_length=3)):
     """
     Gera recomendações de ajuste de estoque com base nas tendências de importação.
 
-    - Monitora volume de importações e projeções de mercado
+    - Monitora volume de importações (último ano, média e CAGR dos últimos 5 anos), preço médio
+      e saldo comercial da categoria, pré-calculados na ingestão (`metricas_comercio`)
     - Ajuda vinícolas a otimizarem sua produção e armazenagem
 
     **Parâmetro:**
-    - `produto`: tipo de vinho ou item a monitorar
+    - `produto`: tipo de vinho ou item a monitorar (ex: `espumantes`, `vinhos de mesa`, `suco`)
+
+    🔒 (futuramente protegido por autenticação)
+    """
+    return await responder_com_cache_async(request, lambda: _em_thread(_alerta_estoque, produto))
+
+def _no_arvore(no: NoArvore, total: Optional[TotalArvore]) -> dict:
+    return {
+        "chave": no.chave,
+        "nome": no.nome,
+        "control": no.control,
+        "nivel": no.nivel,
+        "filhos": no.filhos,
+        "quantidade": total.quantidade if total else None,
+        "soma_filhos": total.soma_filhos if total else None,
+        "total": total.total if total else None,
+    }
+
+def _arvore(db: Session, tipo: str, categoria: Optional[str], chave: str, ano: Optional[int]):
+    if categoria is None:
+        categorias = [c for (c,) in db.query(NoArvore.categoria).filter(NoArvore.tabela == tipo, NoArvore.nivel == 0)]
+        if len(categorias) != 1:
+            raise HTTPException(status_code=400, detail=f"Informe a categoria: {categorias}.")
+        categoria = categorias[0]
+
+    no = (
+        db.query(NoArvore)
+        .filter(NoArvore.tabela == tipo, NoArvore.categoria == categoria, NoArvore.chave == chave)
+        .one_or_none()
+    )
+    if no is None:
+        raise HTTPException(status_code=404, detail=f"Nó '{chave}' não encontrado em {tipo}/{categoria}.")
+    if ano is None:
+        ano = (
+            db.query(TotalArvore.ano)
+            .filter(TotalArvore.tabela == tipo, TotalArvore.categoria == categoria, TotalArvore.chave == "")
+            .order_by(TotalArvore.ano.desc())
+            .limit(1)
+            .scalar()
+        )
+
+    totais = {
+        t.chave: t
+        for t in db.query(TotalArvore).filter(
+            TotalArvore.tabela == tipo, TotalArvore.categoria == categoria, TotalArvore.ano == ano,
+            (TotalArvore.chave == chave) | (TotalArvore.pai == chave),
+        )
+    }
+    filhos = (
+        db.query(NoArvore)
+        .filter(NoArvore.tabela == tipo, NoArvore.categoria == categoria, NoArvore.pai == chave)
+        .all()
+    )
+    return {
+        "tipo": tipo,
+        "categoria": categoria,
+        "ano": ano,
+        **_no_arvore(no, totais.get(chave)),
+        "itens": [_no_arvore(f, totais.get(f.chave)) for f in sorted(filhos, key=lambda f: int(f.chave))],
+    }
+
+@router.get("/{tipo}/arvore", summary="Totais de um nó da árvore de itens e de seus filhos")
+async def arvore(
+    tipo: str,
+    request: Request,
+    categoria: Optional[str] = Query(None),
+    no: str = Query("", description="chave do nó (`id_original`); vazio para a categoria"),
+    ano: Optional[int] = Query(None, ge=1970, le=2100),
+):
+    """
+    Navega pela hierarquia de itens definida pela coluna `control` (ex: VINHO DE MESA →
+    Tinto, Branco, Rosado), com os totais pré-calculados na ingestão para cada nó e ano.
+
+    - Sem `no`, retorna o total da categoria e os itens de primeiro nível; com a `chave` de
+      um item, retorna o item e seus subitens
+    - `total` é o valor do CSV ou, na falta dele, a soma dos filhos (`soma_filhos`)
+    - Sem `ano`, usa o último ano disponível
+
+    **Parâmetros:**
+    - `tipo`: `producao`, `comercializacao` ou `processamento`
+    - `categoria`: obrigatória nos conjuntos com mais de uma categoria (ex: `viniferas` em processamento)
 
     🔒 (futuramente protegido por autenticação)
     """
-    return {"em_desenvolvimento": True}
\ No newline at end of file
+    if tipo not in TABELAS_ARVORE:
+        raise HTTPException(status_code=404, detail=f"Tipo deve ser um de {TABELAS_ARVORE}.")
+    return await responder_com_cache_async(request, lambda: _em_thread(_arvore, tipo, categoria, no, ano))
@@ -1,8 +1,10 @@
+import hashlib
+import hmac
 from fastapi import APIRouter, HTTPException, Depends, status
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from fastapi.security import OAuth2PasswordRequestForm
-from app.database import SessionLocal
+from app.database import get_db
 from app.models import Usuario
 from app.utils import create_access_token, verify_token
 from app.config import settings
@@ -12,12 +14,15 @@ router = APIRouter()
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "admin123"
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Último token emitido para cada usuário aprovado: username -> (digest da senha, token, validade).
+# Enquanto o token vale, /status-acesso responde sem consultar nem gravar no banco. O dicionário é
+# do processo: com vários workers, uma rejeição avaliada num deles não chegaria aos outros, então
+# o status volta a ser lido do banco a cada chamada.
+_tokens_emitidos = {}
+_CACHE_TOKENS_ATIVO = settings.WEB_CONCURRENCY <= 1
+
+def _digest_senha(senha: str) -> bytes:
+    return hashlib.sha256(senha.encode()).digest()
 
 @router.post("/solicitar-acesso")
 def solicitar_acesso(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
@@ -77,6 +82,7 @@ def avaliar_acesso(username: str, status_aprovacao: str, admin: OAuth2PasswordRe
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
     
     usuario.status = status_aprovacao
+    _tokens_emitidos.pop(username, None)
     if status_aprovacao == "aprovado":
         token = create_access_token(data={"sub": usuario.username})
         usuario.ultimo_token = token
@@ -103,6 +109,10 @@ def status_acesso(form: OAuth2PasswordRequestForm = Depends(), db: Session = Dep
     password=1234
     ```
     """
+    emitido = _tokens_emitidos.get(form.username) if _CACHE_TOKENS_ATIVO else None
+    if emitido and emitido[2] > datetime.utcnow() and hmac.compare_digest(emitido[0], _digest_senha(form.password)):
+        return {"status": "aprovado", "access_token": emitido[1], "token_type": "bearer"}
+
     usuario = db.query(Usuario).filter_by(username=form.username).first()
     if not usuario or usuario.senha != form.password:
         raise HTTPException(status_code=401, detail="Credenciais inválidas.")
@@ -117,6 +127,9 @@ def status_acesso(form: OAuth2PasswordRequestForm = Depends(), db: Session = Dep
             usuario.ultimo_token = token
             usuario.data_token = datetime.utcnow()
             db.commit()
+        validade = usuario.data_token + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        if _CACHE_TOKENS_ATIVO:
+            _tokens_emitidos[usuario.username] = (_digest_senha(form.password), usuario.ultimo_token, validade)
         return {
             "status": "aprovado",
             "access_token": usuario.ultimo_token,
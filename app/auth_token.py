@@ -1,15 +1,47 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from app.config import settings
 from app.utils import verify_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="status-acesso")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+# Tokens já verificados: digest do token -> (payload, exp). Evita refazer o HMAC e a
+# decodificação do mesmo token a cada requisição; a entrada vale só até o `exp` do token.
+_tokens_verificados = OrderedDict()
+_trava_tokens = threading.Lock()
+
+def _verificar_com_cache(token: str):
+    if settings.TOKENS_CACHE_TAMANHO <= 0:
+        return verify_token(token)
+
+    chave = hashlib.sha256(token.encode()).digest()
+    agora = time.time()
+    with _trava_tokens:
+        entrada = _tokens_verificados.get(chave)
+        if entrada is not None:
+            if entrada[1] > agora:
+                _tokens_verificados.move_to_end(chave)
+                return entrada[0]
+            del _tokens_verificados[chave]
+
     payload = verify_token(token)
+    if payload and "exp" in payload:
+        with _trava_tokens:
+            _tokens_verificados[chave] = (payload, payload["exp"])
+            while len(_tokens_verificados) > settings.TOKENS_CACHE_TAMANHO:
+                _tokens_verificados.popitem(last=False)
+    return payload
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    payload = _verificar_com_cache(token)
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido ou expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return payload.get("sub")
\ No newline at end of file
+    return payload.get("sub")
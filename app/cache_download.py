@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as upsert
+from app.config import settings
+from app.cliente_http import sessao as sessao_padrao
+from app.database import engine, engine_leitura
+from app.models import ArquivoIngerido
+
+def _caminhos(url: str):
+    chave = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    base = os.path.join(settings.CACHE_DOWNLOAD_DIR, chave)
+    return base + ".bin", base + ".json"
+
+def ler_metadados(url: str) -> dict:
+    _, caminho_meta = _caminhos(url)
+    if not os.path.exists(caminho_meta):
+        return {}
+    with open(caminho_meta, encoding="utf-8") as f:
+        return json.load(f)
+
+def _gravar_metadados(url: str, meta: dict):
+    _, caminho_meta = _caminhos(url)
+    temporario = caminho_meta + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(temporario, caminho_meta)
+
+def baixar(url: str, sessao=None) -> dict:
+    """
+    Baixa `url` usando o cache local em disco.
+
+    - Envia `If-None-Match` / `If-Modified-Since` quando já existe uma cópia em cache;
+      uma resposta 304 reaproveita os bytes locais.
+    - Retorna o conteúdo bruto, seu SHA-256 e se veio do cache; `ja_ingerido` diz se esse
+      conteúdo já está no banco.
+    """
+    caminho_bin, _ = _caminhos(url)
+    meta = ler_metadados(url)
+    cabecalhos = {}
+    if meta and os.path.exists(caminho_bin):
+        if meta.get("etag"):
+            cabecalhos["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            cabecalhos["If-Modified-Since"] = meta["last_modified"]
+
+    response = (sessao or sessao_padrao).get(url, headers=cabecalhos, timeout=settings.HTTP_TIMEOUT)
+    if response.status_code == 304:
+        with open(caminho_bin, "rb") as f:
+            conteudo = f.read()
+        do_cache = True
+    else:
+        response.raise_for_status()
+        conteudo = response.content
+        os.makedirs(settings.CACHE_DOWNLOAD_DIR, exist_ok=True)
+        temporario = caminho_bin + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(conteudo)
+        os.replace(temporario, caminho_bin)
+        meta.update({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "sha256": hashlib.sha256(conteudo).hexdigest(),
+        })
+        _gravar_metadados(url, meta)
+        do_cache = False
+
+    return {
+        "conteudo": conteudo,
+        "sha256": meta["sha256"],
+        "do_cache": do_cache,
+    }
+
+def ja_ingerido(url: str, sha256: str) -> bool:
+    """
+    Se o conteúdo com este hash foi o último gravado no banco. O registro fica no próprio banco
+    (`arquivos_ingeridos`), não no cache em disco: com um banco novo ou trocado, tudo é reprocessado.
+    """
+    with engine_leitura.connect() as conn:
+        ingerido = conn.execute(select(ArquivoIngerido.sha256).where(ArquivoIngerido.url == url)).scalar()
+    return ingerido == sha256
+
+def marcar_ingerido(url: str, sha256: str):
+    """Registra que o conteúdo com este hash já foi processado e gravado no banco."""
+    from app.persistencia import trava_escrita
+
+    agora = datetime.utcnow()
+    stmt = upsert(ArquivoIngerido).values(url=url, sha256=sha256, ingerido_em=agora)
+    with trava_escrita, engine.begin() as conn:
+        conn.execute(stmt.on_conflict_do_update(index_elements=["url"], set_={"sha256": sha256, "ingerido_em": agora}))
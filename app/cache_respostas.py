@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from app.config import settings
+from app.database import diretorio_dados
+from app.metricas import medir_etapa, registrar_etapa
+
+class CacheRespostas:
+    """
+    Cache LRU em memória, com validade (TTL), das respostas já serializadas dos endpoints de consulta.
+
+    - Cada entrada guarda o corpo JSON e o ETag, para que requisições condicionais
+      (`If-None-Match`) recebam 304 sem consultar o banco nem serializar nada.
+    - `invalidar()` descarta tudo e avança a geração: uma resposta calculada antes da
+      invalidação não é gravada depois dela (evita guardar dados antigos de uma ingestão em curso).
+    """
+
+    # Operações só em memória: podem rodar direto no event loop
+    bloqueante = False
+
+    def __init__(self, tamanho_maximo: int, ttl: float):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self.geracao = 0
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+        self.contadores = {"acertos": 0, "falhas": 0, "remocoes": 0, "expiradas": 0, "nao_modificadas": 0, "invalidacoes": 0}
+
+    def obter(self, chave):
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] < time.monotonic():
+                del self._entradas[chave]
+                self.contadores["expiradas"] += 1
+                entrada = None
+            if entrada is None:
+                self.contadores["falhas"] += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.contadores["acertos"] += 1
+            return entrada[1], entrada[2]
+
+    def gravar(self, chave, corpo: bytes, etag: str, geracao: int):
+        with self._trava:
+            if geracao != self.geracao or self.tamanho_maximo <= 0:
+                return
+            self._entradas[chave] = (time.monotonic() + self.ttl, corpo, etag)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.tamanho_maximo:
+                self._entradas.popitem(last=False)
+                self.contadores["remocoes"] += 1
+
+    def contar(self, contador: str):
+        with self._trava:
+            self.contadores[contador] += 1
+
+    def invalidar(self):
+        with self._trava:
+            self._entradas.clear()
+            self.geracao += 1
+            self.contadores["invalidacoes"] += 1
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            consultas = self.contadores["acertos"] + self.contadores["falhas"]
+            return {
+                "backend": "memoria",
+                "entradas": len(self._entradas),
+                "tamanho_maximo": self.tamanho_maximo,
+                "ttl_s": self.ttl,
+                "geracao": self.geracao,
+                **self.contadores,
+                "taxa_acerto": self.contadores["acertos"] / consultas if consultas else None,
+            }
+
+class CacheRespostasCompartilhado:
+    """
+    Mesmo cache, num arquivo SQLite compartilhado por todos os processos (workers do uvicorn)
+    que usam o mesmo banco: uma resposta calculada por um worker é servida pelos demais.
+
+    - A geração fica no próprio arquivo, então `invalidar()` num worker vale para todos.
+    - A validade usa o relógio de parede (o monotônico não é comparável entre processos).
+    - Acima de `tamanho_maximo`, saem as entradas gravadas há mais tempo (FIFO): uma leitura
+      não reordena as entradas, para que os acertos não precisem escrever no arquivo.
+    - Os contadores de acertos/falhas são do processo; entradas e geração, do arquivo.
+    """
+
+    # Leituras e escritas no arquivo, que podem esperar pela trava de outro worker (busy_timeout)
+    bloqueante = True
+
+    def __init__(self, caminho: str, tamanho_maximo: int, ttl: float):
+        self.caminho = caminho
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self._local = threading.local()
+        self._trava = threading.Lock()
+        self.contadores = {"acertos": 0, "falhas": 0, "remocoes": 0, "expiradas": 0, "nao_modificadas": 0, "invalidacoes": 0}
+
+    def _conexao(self) -> sqlite3.Connection:
+        # Uma conexão por thread; o esquema é criado pela primeira conexão de qualquer processo
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+                                      isolation_level=None, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=OFF")  # conteúdo descartável: pode ser recalculado
+            conexao.execute("CREATE TABLE IF NOT EXISTS respostas (chave TEXT PRIMARY KEY, corpo BLOB, etag TEXT, expira_em REAL)")
+            conexao.execute("CREATE TABLE IF NOT EXISTS estado (id INTEGER PRIMARY KEY CHECK (id = 1), geracao INTEGER NOT NULL)")
+            conexao.execute("INSERT OR IGNORE INTO estado (id, geracao) VALUES (1, 0)")
+            self._local.conexao = conexao
+        return conexao
+
+    def _contar(self, *contadores):
+        with self._trava:
+            for contador in contadores:
+                self.contadores[contador] += 1
+
+    @property
+    def geracao(self) -> int:
+        return self._conexao().execute("SELECT geracao FROM estado").fetchone()[0]
+
+    def obter(self, chave):
+        chave = json.dumps(chave)
+        conexao = self._conexao()
+        entrada = conexao.execute("SELECT corpo, etag, expira_em FROM respostas WHERE chave = ?", (chave,)).fetchone()
+        if entrada is not None and entrada[2] < time.time():
+            conexao.execute("DELETE FROM respostas WHERE chave = ? AND expira_em = ?", (chave, entrada[2]))
+            self._contar("expiradas", "falhas")
+            return None
+        if entrada is None:
+            self._contar("falhas")
+            return None
+        self._contar("acertos")
+        return entrada[0], entrada[1]
+
+    def gravar(self, chave, corpo: bytes, etag: str, geracao: int):
+        if self.tamanho_maximo <= 0:
+            return
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            # Só grava se ninguém invalidou o cache desde que a resposta começou a ser calculada
+            gravada = conexao.execute(
+                "INSERT OR REPLACE INTO respostas (chave, corpo, etag, expira_em) "
+                "SELECT ?, ?, ?, ? FROM estado WHERE geracao = ?",
+                (json.dumps(chave), corpo, etag, time.time() + self.ttl, geracao),
+            ).rowcount
+            excedentes = 0
+            if gravada:
+                excedentes = conexao.execute(
+                    "DELETE FROM respostas WHERE rowid IN (SELECT rowid FROM respostas ORDER BY rowid "
+                    "LIMIT max((SELECT COUNT(*) FROM respostas) - ?, 0))",
+                    (self.tamanho_maximo,),
+                ).rowcount
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        if excedentes:
+            with self._trava:
+                self.contadores["remocoes"] += excedentes
+
+    def contar(self, contador: str):
+        self._contar(contador)
+
+    def invalidar(self):
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            conexao.execute("DELETE FROM respostas")
+            conexao.execute("UPDATE estado SET geracao = geracao + 1")
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        self._contar("invalidacoes")
+
+    def estatisticas(self) -> dict:
+        entradas = self._conexao().execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+        with self._trava:
+            consultas = self.contadores["acertos"] + self.contadores["falhas"]
+            return {
+                "backend": "sqlite",
+                "arquivo": self.caminho,
+                "entradas": entradas,
+                "tamanho_maximo": self.tamanho_maximo,
+                "ttl_s": self.ttl,
+                "geracao": self.geracao,
+                **self.contadores,
+                "taxa_acerto": self.contadores["acertos"] / consultas if consultas else None,
+            }
+
+def criar_cache():
+    """Cache do processo (`memoria`, padrão com um worker) ou compartilhado entre os workers (`sqlite`)."""
+    if settings.CACHE_RESPOSTAS_BACKEND == "sqlite":
+        caminho = settings.CACHE_RESPOSTAS_ARQUIVO or os.path.join(diretorio_dados(), ".cache_respostas.sqlite")
+        return CacheRespostasCompartilhado(caminho, settings.CACHE_RESPOSTAS_TAMANHO, settings.CACHE_RESPOSTAS_TTL)
+    return CacheRespostas(settings.CACHE_RESPOSTAS_TAMANHO, settings.CACHE_RESPOSTAS_TTL)
+
+cache = criar_cache()
+
+def chave_requisicao(request: Request):
+    """Rota + parâmetros de consulta em ordem alfabética, ignorando parâmetros vazios."""
+    parametros = sorted((k, v) for k, v in request.query_params.multi_items() if v != "")
+    return request.url.path, tuple(parametros)
+
+def _etag_confere(request: Request, etag: str) -> bool:
+    enviados = request.headers.get("if-none-match")
+    if not enviados:
+        return False
+    return enviados.strip() == "*" or etag in [e.strip().removeprefix("W/") for e in enviados.split(",")]
+
+def _serializar(dados):
+    corpo = json.dumps(jsonable_encoder(dados), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return corpo, f'"{hashlib.sha1(corpo).hexdigest()}"'
+
+def _responder(request: Request, corpo: bytes, etag: str) -> Response:
+    # Dados autenticados: só o próprio cliente guarda, sempre revalidando pelo ETag
+    cabecalhos = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_confere(request, etag):
+        cache.contar("nao_modificadas")
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(content=corpo, media_type="application/json", headers=cabecalhos)
+
+def responder_com_cache(request: Request, produzir) -> Response:
+    """
+    Devolve a resposta de `produzir()` (qualquer valor serializável em JSON) usando o cache.
+    Deve ser chamada depois das dependências de autenticação, que continuam valendo em cada acesso.
+    """
+    chave = chave_requisicao(request)
+    entrada = cache.obter(chave)
+    registrar_etapa("cache", descricao="falha" if entrada is None else "acerto")
+    if entrada is None:
+        geracao = cache.geracao
+        with medir_etapa("consulta"):
+            entrada = _serializar(produzir())
+        cache.gravar(chave, *entrada, geracao)
+    return _responder(request, *entrada)
+
+async def _no_cache(funcao, *args):
+    """Operação do cache fora do event loop quando ela faz E/S (cache compartilhado em SQLite)."""
+    if cache.bloqueante:
+        return await run_in_threadpool(funcao, *args)
+    return funcao(*args)
+
+async def responder_com_cache_async(request: Request, produzir) -> Response:
+    """Versão de `responder_com_cache` para endpoints `async`: `produzir()` retorna um awaitable."""
+    chave = chave_requisicao(request)
+    entrada = await _no_cache(cache.obter, chave)
+    registrar_etapa("cache", descricao="falha" if entrada is None else "acerto")
+    if entrada is None:
+        geracao = await _no_cache(lambda: cache.geracao)
+        with medir_etapa("consulta"):
+            entrada = _serializar(await produzir())
+        await _no_cache(cache.gravar, chave, *entrada, geracao)
+    return _responder(request, *entrada)
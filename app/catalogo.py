@@ -0,0 +1,136 @@
+import os
+import re
+import unicodedata
+from html.parser import HTMLParser
+from io import BytesIO
+import numpy as np
+import pandas as pd
+from app.cache_download import baixar
+from app.config import settings
+
+DOWNLOAD_BASE = settings.EMBRAPA_BASE_URL
+
+# Categoria gravada nas linhas de cada arquivo conhecido. Arquivos novos que
+# surgirem no site são ingeridos com o próprio nome como categoria.
+CATEGORIAS = {
+    "producao.csv": "geral",
+    "comercio.csv": "geral",
+    "processaviniferas.csv": "viniferas",
+    "processaamericanas.csv": "americanas_e_hibridas",
+    "processamesa.csv": "uvas_de_mesa",
+    "processasemclass.csv": "sem_classificacao",
+    "impvinhos.csv": "vinhos_de_mesa",
+    "impespumantes.csv": "espumantes",
+    "impfrescas.csv": "uvas_frescas",
+    "imppassas.csv": "uvas_passas",
+    "impsuco.csv": "suco_de_uva",
+    "expvinho.csv": "vinhos_de_mesa",
+    "expespumantes.csv": "espumantes",
+    "expuva.csv": "uvas_frescas",
+    "expsuco.csv": "suco_de_uva",
+}
+
+def sem_acentos(texto: str) -> str:
+    """Minúsculas sem acentos (ex: "Viníferas" -> "viniferas"), para comparar nomes de abas e arquivos."""
+    return unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("ascii")
+
+def decodificar(conteudo: bytes) -> str:
+    try:
+        return conteudo.decode("utf-8")
+    except UnicodeDecodeError:
+        return conteudo.decode("latin1")
+
+def categoria_do_arquivo(href: str) -> str:
+    nome = os.path.basename(sem_acentos(href))
+    if nome in CATEGORIAS:
+        return CATEGORIAS[nome]
+    return re.sub(r"[^a-z0-9]+", "_", os.path.splitext(nome)[0]).strip("_")
+
+class _ExtratorLinks(HTMLParser):
+    """
+    Percorre o HTML uma única vez, sem montar a árvore do documento, guardando apenas
+    os botões de sub-aba (`subopcao`) e os links `<a href>` com seu texto.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.subopcoes = []
+        self.links = []
+        self._link = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self._link = [href, []]
+        elif tag == "button":
+            atributos = dict(attrs)
+            if atributos.get("name") == "subopcao" and atributos.get("value"):
+                self.subopcoes.append(atributos["value"])
+
+    def handle_data(self, data):
+        if self._link is not None:
+            self._link[1].append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._link is not None:
+            self.links.append((self._link[0], "".join(self._link[1])))
+            self._link = None
+
+def _ler_pagina(url: str) -> _ExtratorLinks:
+    extrator = _ExtratorLinks()
+    extrator.feed(decodificar(baixar(url)["conteudo"]))
+    extrator.close()
+    return extrator
+
+def descobrir_arquivos(opcao: str, palavras: list) -> list:
+    """
+    Lista todos os arquivos CSV de uma aba do site da Embrapa, incluindo os de cada
+    sub-aba (botões `subopcao`, ex: Viníferas, Espumantes, Uvas frescas).
+
+    Retorna uma lista de dicts com `arquivo`, `categoria` e `url_download`.
+    """
+    url_aba = f"{DOWNLOAD_BASE}index.php?opcao={opcao}"
+    pagina = _ler_pagina(url_aba)
+    paginas = [pagina] + [_ler_pagina(f"{url_aba}&subopcao={sub}") for sub in pagina.subopcoes]
+
+    arquivos = {}
+    for pagina in paginas:
+        for href, texto in pagina.links:
+            normalizado = href.lower()
+            if ".csv" not in normalizado:
+                continue
+            normalizado, texto = sem_acentos(href), sem_acentos(texto)
+            if any(p in texto or p in normalizado for p in palavras):
+                arquivos.setdefault(href, {
+                    "arquivo": os.path.basename(href),
+                    "categoria": categoria_do_arquivo(href),
+                    "url_download": DOWNLOAD_BASE + href,
+                })
+    return list(arquivos.values())
+
+def repetir_coluna(coluna: pd.Series, vezes: int):
+    """
+    Repete a coluna inteira `vezes` vezes (np.tile), como no formato longo (uma linha por item e ano).
+    Colunas de texto viram categóricas: repete-se só os códigos, e cada nome fica uma vez na memória.
+    """
+    if pd.api.types.is_numeric_dtype(coluna):
+        return np.tile(coluna.to_numpy(), vezes)
+    categorica = pd.Categorical(coluna)
+    return pd.Categorical.from_codes(np.tile(categorica.codes, vezes), categorica.categories)
+
+def ler_csv(conteudo: bytes) -> pd.DataFrame:
+    """
+    Lê um CSV da Embrapa, que pode vir separado por `;` ou por tabulação, direto dos bytes baixados.
+
+    Os arquivos são UTF-8 (com recuo para latin1 se não forem), lidos pelo parser em C sem
+    passar por uma cópia decodificada em `str`.
+    """
+    cabecalho = conteudo[:conteudo.find(b"\n")]
+    sep = "\t" if cabecalho.count(b"\t") > cabecalho.count(b";") else ";"
+    try:
+        df = pd.read_csv(BytesIO(conteudo), sep=sep, encoding="utf-8")
+    except UnicodeDecodeError:
+        df = pd.read_csv(BytesIO(conteudo), sep=sep, encoding="latin1")
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
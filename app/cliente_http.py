@@ -0,0 +1,28 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.config import settings
+
+def criar_sessao() -> requests.Session:
+    """
+    Sessão HTTP com pool de conexões keep-alive e novas tentativas com backoff exponencial
+    para falhas transitórias do site da Embrapa.
+    """
+    tentativas = Retry(
+        total=settings.HTTP_TENTATIVAS,
+        backoff_factor=settings.HTTP_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+    )
+    adaptador = HTTPAdapter(
+        pool_connections=settings.INGESTAO_CONCORRENCIA,
+        pool_maxsize=settings.INGESTAO_CONCORRENCIA,
+        max_retries=tentativas,
+    )
+    sessao = requests.Session()
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+    return sessao
+
+# Sessão compartilhada por todas as ingestões do processo
+sessao = criar_sessao()
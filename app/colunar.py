@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import threading
+from typing import Optional
+from sqlalchemy import select
+from app.cache_respostas import cache as cache_respostas
+from app.config import settings
+from app.consultas import TABELAS
+from app.database import engine_leitura
+from app.models import VersaoDados
+
+logger = logging.getLogger(__name__)
+
+class TabelaColunar:
+    """
+    Uma tabela de dados em memória, em colunas NumPy, ordenada por (ano, id) como as respostas da API.
+
+    - colunas de texto (`produto`, `cultivar`, `pais`, `control`, `categoria`) são codificadas por
+      dicionário: um vetor de códigos int32 e a lista de valores distintos
+    - `_inicio_ano[a - ano_minimo]` é a posição da primeira linha do ano `a`, então o filtro por
+      ano é só um recorte, e os demais filtros comparam códigos inteiros dentro dele
+    """
+
+    def __init__(self, tipo: str, df):
+        # numpy/pandas são importados na carga da cópia, não na subida da API
+        import numpy as np
+        import pandas as pd
+
+        self.tipo = tipo
+        self.colunas = [c.name for c in TABELAS[tipo]["modelo"].__table__.columns]
+        self.filtro = TABELAS[tipo]["filtro"]
+        df = df.sort_values(["ano", "id"], kind="stable").reset_index(drop=True)
+        self.linhas = len(df)
+
+        self._valores = {}   # coluna -> vetor NumPy (códigos, no caso das colunas de texto)
+        self._nulos = {}     # coluna -> máscara de nulos (colunas numéricas com NULL)
+        self._distintos = {}  # coluna de texto -> vetor de objetos com os valores distintos (+ None no fim)
+        self._codigos = {}   # coluna de texto -> {valor: código}
+        for coluna in self.colunas:
+            serie = df[coluna]
+            if TABELAS[tipo]["modelo"].__table__.c[coluna].type.python_type is str:
+                codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+                # O código -1 (NULL) aponta para o None acrescentado no fim da lista
+                self._distintos[coluna] = np.array([*distintos.tolist(), None], dtype=object)
+                self._codigos[coluna] = {valor: codigo for codigo, valor in enumerate(distintos.tolist())}
+                self._valores[coluna] = codigos.astype(np.int32)
+            else:
+                nulos = serie.isna().to_numpy()
+                inteiro = TABELAS[tipo]["modelo"].__table__.c[coluna].type.python_type is int
+                self._valores[coluna] = serie.fillna(0).to_numpy(dtype=np.int64 if inteiro else np.float64)
+                if nulos.any():
+                    self._nulos[coluna] = nulos
+
+        anos = self._valores["ano"]
+        self.ano_minimo = int(anos[0]) if self.linhas else 0
+        ano_maximo = int(anos[-1]) if self.linhas else -1
+        self._inicio_ano = np.searchsorted(anos, np.arange(self.ano_minimo, ano_maximo + 2))
+
+    def _recorte_ano(self, ano: Optional[int]):
+        if ano is None:
+            return 0, self.linhas
+        posicao = ano - self.ano_minimo
+        if posicao < 0 or posicao >= len(self._inicio_ano) - 1:
+            return 0, 0
+        return int(self._inicio_ano[posicao]), int(self._inicio_ano[posicao + 1])
+
+    def _registros(self, linhas) -> list:
+        colunas = []
+        for coluna in self.colunas:
+            valores = self._valores[coluna][linhas]
+            if coluna in self._distintos:
+                colunas.append(self._distintos[coluna][valores].tolist())
+            elif coluna in self._nulos:
+                colunas.append([None if nulo else v for v, nulo in zip(valores.tolist(), self._nulos[coluna][linhas].tolist())])
+            else:
+                colunas.append(valores.tolist())
+        return [dict(zip(self.colunas, linha)) for linha in zip(*colunas)]
+
+    def consultar(self, ano=None, filtro=None, limite: int = 100, offset: int = 0, categoria=None) -> dict:
+        """Mesmo resultado de `consultas.consultar_tabela`, sem SQL nem objetos do ORM."""
+        import numpy as np
+
+        inicio, fim = self._recorte_ano(ano)
+        mascara = None
+        for coluna, valor in ((self.filtro, filtro), ("categoria", categoria)):
+            if not valor:
+                continue
+            codigo = self._codigos[coluna].get(valor)
+            if codigo is None:
+                inicio = fim = 0
+                mascara = None
+                break
+            condicao = self._valores[coluna][inicio:fim] == codigo
+            mascara = condicao if mascara is None else mascara & condicao
+
+        if mascara is None:
+            total = fim - inicio
+            linhas = np.arange(min(inicio + offset, fim), min(inicio + offset + limite, fim))
+        else:
+            selecionadas = np.flatnonzero(mascara)
+            total = len(selecionadas)
+            linhas = selecionadas[offset:offset + limite] + inicio
+
+        return {"total": total, "limite": limite, "offset": offset, "registros": self._registros(linhas)}
+
+class CopiaColunar:
+    """
+    Cópia em memória de todas as tabelas de dados, carregada na subida da API e trocada por
+    inteiro (uma atribuição) quando a `versao_dados` de alguma tabela muda: as consultas em
+    andamento terminam na cópia antiga e as seguintes já leem a nova, sem travas na leitura.
+    """
+
+    def __init__(self):
+        self._tabelas = {}
+        self._versoes = {}
+        self._trava_recarga = threading.Lock()
+        self._tarefa = None
+
+    @property
+    def carregada(self) -> bool:
+        return bool(self._tabelas)
+
+    def consultar(self, tipo: str, ano=None, filtro=None, limite: int = 100, offset: int = 0, categoria=None):
+        """Resultado da consulta em memória, ou None se a cópia não estiver carregada."""
+        tabela = self._tabelas.get(tipo)
+        if tabela is None:
+            return None
+        return tabela.consultar(ano, filtro, limite, offset, categoria)
+
+    def recarregar(self, forcar: bool = False) -> list:
+        """Reconstrói as tabelas cuja versão mudou no banco (todas, com `forcar`); retorna as recarregadas."""
+        import pandas as pd
+
+        with self._trava_recarga, engine_leitura.connect() as conn:
+            # Uma única transação de leitura: versões e linhas do mesmo instante do banco (WAL)
+            versoes = dict(conn.execute(select(VersaoDados.tabela, VersaoDados.versao)).all())
+            mudaram = [
+                tipo for tipo in TABELAS
+                if forcar or tipo not in self._tabelas or versoes.get(tipo, 0) != self._versoes.get(tipo)
+            ]
+            if not mudaram:
+                return []
+            novas = dict(self._tabelas)
+            for tipo in mudaram:
+                modelo = TABELAS[tipo]["modelo"]
+                novas[tipo] = TabelaColunar(tipo, pd.read_sql(select(modelo.__table__), conn))
+            self._tabelas, self._versoes = novas, {tipo: versoes.get(tipo, 0) for tipo in TABELAS}
+
+        # Respostas guardadas antes da troca podem ter vindo da cópia anterior
+        cache_respostas.invalidar()
+        logger.info("Cópia colunar recarregada: %s", ", ".join(mudaram))
+        return mudaram
+
+    async def iniciar(self):
+        # A carga roda em segundo plano: até terminar, as consultas vão ao banco
+        self._tarefa = asyncio.create_task(self._acompanhar())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    async def _acompanhar(self):
+        # Ingestões de outros processos (CLI, outros workers) aparecem em até COLUNAR_VERIFICACAO_S
+        while True:
+            try:
+                await asyncio.to_thread(self.recarregar)
+            except Exception:
+                logger.exception("Falha ao recarregar a cópia colunar")
+            await asyncio.sleep(settings.COLUNAR_VERIFICACAO_S)
+
+copia = CopiaColunar()
@@ -4,5 +4,35 @@ class Settings:
     SECRET_KEY = os.getenv("SECRET_KEY", "segredo-super-seguro")
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = 30
+    DB_POOL_TAMANHO = int(os.getenv("DB_POOL_TAMANHO", "8"))
+    DB_POOL_EXTRA = int(os.getenv("DB_POOL_EXTRA", "8"))
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "65536"))
+    SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    EMBRAPA_BASE_URL = os.getenv("EMBRAPA_BASE_URL", "http://vitibrasil.cnpuv.embrapa.br/")
+    CACHE_DOWNLOAD_DIR = os.getenv("CACHE_DOWNLOAD_DIR", "./.cache_embrapa")
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+    HTTP_TENTATIVAS = int(os.getenv("HTTP_TENTATIVAS", "3"))
+    HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+    INGESTAO_CONCORRENCIA = int(os.getenv("INGESTAO_CONCORRENCIA", "5"))
+    CACHE_RESPOSTAS_TAMANHO = int(os.getenv("CACHE_RESPOSTAS_TAMANHO", "512"))
+    EXPORTACAO_LOTE = int(os.getenv("EXPORTACAO_LOTE", "5000"))
+    TOKENS_CACHE_TAMANHO = int(os.getenv("TOKENS_CACHE_TAMANHO", "1024"))
+    CACHE_RESPOSTAS_TTL = float(os.getenv("CACHE_RESPOSTAS_TTL", "3600"))
+    # Com mais de um worker (WEB_CONCURRENCY), o cache de respostas passa a ser compartilhado
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+    CACHE_RESPOSTAS_BACKEND = os.getenv("CACHE_RESPOSTAS_BACKEND", "sqlite" if WEB_CONCURRENCY > 1 else "memoria")
+    CACHE_RESPOSTAS_ARQUIVO = os.getenv("CACHE_RESPOSTAS_ARQUIVO", "")
+    AGENDADOR_ATIVO = os.getenv("AGENDADOR_ATIVO", "1") == "1"
+    INGESTAO_INTERVALO_HORAS = float(os.getenv("INGESTAO_INTERVALO_HORAS", "24"))
+    AGENDADOR_JITTER = float(os.getenv("AGENDADOR_JITTER", "0.1"))
+    AGENDADOR_ATRASO_INICIAL_S = float(os.getenv("AGENDADOR_ATRASO_INICIAL_S", "60"))
+    AGENDADOR_RETENTATIVA_S = float(os.getenv("AGENDADOR_RETENTATIVA_S", "1800"))
+    COLUNAR_ATIVO = os.getenv("COLUNAR_ATIVO", "1") == "1"
+    COLUNAR_VERIFICACAO_S = float(os.getenv("COLUNAR_VERIFICACAO_S", "30"))
+    MIGRACOES_NA_SUBIDA = os.getenv("MIGRACOES_NA_SUBIDA", "1") == "1"
+    PREVISAO_HORIZONTE_MAXIMO = 20
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -0,0 +1,85 @@
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models import Producao, Comercializacao, Processamento, Importacao, Exportacao
+
+# Tabela persistida e coluna de filtro textual de cada conjunto de dados
+TABELAS = {
+    "producao": {"modelo": Producao, "filtro": "produto"},
+    "comercializacao": {"modelo": Comercializacao, "filtro": "produto"},
+    "processamento": {"modelo": Processamento, "filtro": "cultivar"},
+    "importacao": {"modelo": Importacao, "filtro": "pais"},
+    "exportacao": {"modelo": Exportacao, "filtro": "pais"},
+}
+
+# Conjuntos de produtos/cultivares, cuja coluna `control` define a árvore de itens
+TABELAS_ARVORE = ["producao", "comercializacao", "processamento"]
+
+def registro_para_dict(registro) -> dict:
+    return {col.name: getattr(registro, col.name) for col in registro.__table__.columns}
+
+def montar_consulta(
+    tipo: str,
+    ano: Optional[int] = None,
+    filtro: Optional[str] = None,
+    limite: int = 100,
+    offset: int = 0,
+    categoria: Optional[str] = None,
+):
+    """Monta as consultas (total, página de registros) de um conjunto de dados; usadas pelos caminhos síncrono e assíncrono."""
+    modelo = TABELAS[tipo]["modelo"]
+    coluna_filtro = getattr(modelo, TABELAS[tipo]["filtro"])
+
+    condicoes = []
+    if ano is not None:
+        condicoes.append(modelo.ano == ano)
+    if filtro:
+        condicoes.append(coluna_filtro == filtro)
+    if categoria:
+        condicoes.append(modelo.categoria == categoria)
+
+    total = select(func.count(modelo.id)).where(*condicoes)
+    registros = select(modelo).where(*condicoes).order_by(modelo.ano, modelo.id).offset(offset).limit(limite)
+    return total, registros
+
+def _resultado(total, registros, limite: int, offset: int) -> dict:
+    return {
+        "total": total,
+        "limite": limite,
+        "offset": offset,
+        "registros": [registro_para_dict(r) for r in registros],
+    }
+
+def consultar_tabela(
+    db: Session,
+    tipo: str,
+    ano: Optional[int] = None,
+    filtro: Optional[str] = None,
+    limite: int = 100,
+    offset: int = 0,
+    categoria: Optional[str] = None,
+):
+    """
+    Consulta os registros já persistidos de um conjunto de dados, sem acessar o site da Embrapa.
+
+    - `ano`: filtra por ano exato
+    - `filtro`: valor exato da coluna textual do conjunto (`produto`, `cultivar` ou `pais`)
+    - `categoria`: arquivo de origem dentro da aba (ex: `espumantes`, `uvas_de_mesa`)
+    - `limite` / `offset`: paginação dos resultados, ordenados por `ano` e `id`
+    """
+    total, registros = montar_consulta(tipo, ano, filtro, limite, offset, categoria)
+    return _resultado(db.execute(total).scalar(), db.execute(registros).scalars().all(), limite, offset)
+
+async def consultar_tabela_async(
+    db: AsyncSession,
+    tipo: str,
+    ano: Optional[int] = None,
+    filtro: Optional[str] = None,
+    limite: int = 100,
+    offset: int = 0,
+    categoria: Optional[str] = None,
+):
+    """Mesma consulta de `consultar_tabela`, por uma sessão assíncrona (não bloqueia o event loop)."""
+    total, registros = montar_consulta(tipo, ano, filtro, limite, offset, categoria)
+    return _resultado((await db.execute(total)).scalar(), (await db.execute(registros)).scalars().all(), limite, offset)
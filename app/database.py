@@ -1,9 +1,116 @@
-from sqlalchemy import create_engine
+import os
+from contextlib import ExitStack, contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app.config import settings
 
-DATABASE_URL = "sqlite:///./dados_embrapa.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dados_embrapa.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def _configurar_sqlite(conexao, somente_leitura: bool):
+    """
+    Pragmas aplicados a cada nova conexão SQLite do pool.
+
+    - WAL: a ingestão grava sem bloquear os leitores (e vice-versa)
+    - synchronous=NORMAL: seguro com WAL, sem fsync a cada commit
+    - cache_size / mmap_size: páginas quentes em memória e leitura mapeada do arquivo
+    - busy_timeout: espera o lock em vez de falhar com "database is locked"
+    """
+    cursor = conexao.cursor()
+    if not somente_leitura:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_BYTES}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    if somente_leitura:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+def criar_engine(url: str = DATABASE_URL, somente_leitura: bool = False):
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_size=settings.DB_POOL_TAMANHO, max_overflow=settings.DB_POOL_EXTRA, pool_pre_ping=True)
+
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=settings.DB_POOL_TAMANHO,
+        max_overflow=settings.DB_POOL_EXTRA,
+    )
+    event.listen(engine, "connect", lambda conexao, _: _configurar_sqlite(conexao, somente_leitura))
+    return engine
+
+def criar_engine_async(url: str = DATABASE_URL):
+    """Engine assíncrono somente leitura (driver aiosqlite) dos endpoints de consulta."""
+    if not url.startswith("sqlite"):
+        return create_async_engine(url, pool_size=settings.DB_POOL_TAMANHO, max_overflow=settings.DB_POOL_EXTRA)
+
+    engine = create_async_engine(
+        url.replace("sqlite://", "sqlite+aiosqlite://", 1),
+        pool_size=settings.DB_POOL_TAMANHO,
+        max_overflow=settings.DB_POOL_EXTRA,
+    )
+    event.listen(engine.sync_engine, "connect", lambda conexao, _: _configurar_sqlite(conexao, True))
+    return engine
+
+# Engine de escrita (ingestão, migrações, autenticação), engine somente leitura (análises, exportação)
+# e engine assíncrono somente leitura (endpoints de consulta)
+engine = criar_engine()
+engine_leitura = criar_engine(somente_leitura=True)
+engine_async = criar_engine_async()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLeitura = sessionmaker(autocommit=False, autoflush=False, bind=engine_leitura)
+SessionAsync = async_sessionmaker(engine_async, expire_on_commit=False)
 
 Base = declarative_base()
+
+try:
+    import fcntl
+except ImportError:  # Windows: apenas a coordenação dentro do processo
+    fcntl = None
+
+def diretorio_dados() -> str:
+    """Diretório do arquivo do banco SQLite (ou, com outro banco, o do cache de downloads): travas e cache compartilhado."""
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        return os.path.dirname(os.path.abspath(url.database))
+    return settings.CACHE_DOWNLOAD_DIR
+
+@contextmanager
+def trava_entre_processos(*nomes):
+    """
+    Travas de arquivo (`.<nome>.lock`, no diretório do banco) compartilhadas pelos processos que
+    usam o mesmo banco (workers do uvicorn, CLI). São obtidas em ordem alfabética, evitando
+    deadlock entre processos que pedem conjuntos sobrepostos.
+    """
+    if fcntl is None:
+        yield
+        return
+    diretorio = diretorio_dados()
+    os.makedirs(diretorio, exist_ok=True)
+    with ExitStack() as pilha:
+        for nome in sorted(nomes):
+            arquivo = pilha.enter_context(open(os.path.join(diretorio, f".{nome}.lock"), "w"))
+            fcntl.flock(arquivo, fcntl.LOCK_EX)
+            pilha.callback(fcntl.flock, arquivo, fcntl.LOCK_UN)
+        yield
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_db_leitura():
+    db = SessionLeitura()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_db_async():
+    async with SessionAsync() as db:
+        yield db
@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Float, Integer, select
+from app.auth_token import get_current_user
+from app.config import settings
+from app.consultas import TABELAS
+from app.database import engine_leitura
+
+router = APIRouter()
+
+FORMATOS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+def paginas(tipo: str, categoria=None, ano_inicial=None, ano_final=None, tamanho: int = None):
+    """
+    Percorre a tabela inteira em páginas ordenadas por `id`, com paginação por chave
+    (`id > último id lido`) em vez de OFFSET: cada página custa o mesmo, do início ao fim.
+    Cada página usa uma conexão própria, para não segurar uma transação de leitura
+    aberta (e a ingestão bloqueada) durante todo o download.
+    """
+    tabela = TABELAS[tipo]["modelo"].__table__
+    query = select(tabela).order_by(tabela.c.id).limit(tamanho or settings.EXPORTACAO_LOTE)
+    if categoria:
+        query = query.where(tabela.c.categoria == categoria)
+    if ano_inicial is not None:
+        query = query.where(tabela.c.ano >= ano_inicial)
+    if ano_final is not None:
+        query = query.where(tabela.c.ano <= ano_final)
+
+    ultimo_id = None
+    while True:
+        with engine_leitura.connect() as conn:
+            pagina = query if ultimo_id is None else query.where(tabela.c.id > ultimo_id)
+            linhas = conn.execute(pagina).all()
+        if not linhas:
+            return
+        yield linhas
+        ultimo_id = linhas[-1].id
+
+def _ndjson(colunas, paginas_):
+    for linhas in paginas_:
+        yield "".join(
+            json.dumps(dict(zip(colunas, linha)), ensure_ascii=False) + "\n" for linha in linhas
+        ).encode("utf-8")
+
+def _csv(colunas, paginas_):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    for linhas in paginas_:
+        escritor.writerows(linhas)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+class _Saida:
+    """Destino do ParquetWriter que acumula os bytes escritos até serem enviados ao cliente."""
+
+    def __init__(self):
+        self.partes = []
+        self.closed = False
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drenar(self) -> bytes:
+        dados, self.partes = b"".join(self.partes), []
+        return dados
+
+def _parquet(tabela, paginas_):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tipos = {Integer: pa.int64(), Float: pa.float64()}
+    esquema = pa.schema([
+        (c.name, next((t for tipo, t in tipos.items() if isinstance(c.type, tipo)), pa.string()))
+        for c in tabela.columns
+    ])
+    saida = _Saida()
+    # Cada página vira um row group: a memória fica limitada ao tamanho da página
+    with pq.ParquetWriter(pa.PythonFile(saida, mode="w"), esquema, compression="zstd") as escritor:
+        for linhas in paginas_:
+            escritor.write_table(pa.Table.from_pylist([dict(linha._mapping) for linha in linhas], schema=esquema))
+            yield saida.drenar()
+    yield saida.drenar()
+
+@router.get("/exportar/{tipo}", summary="Exporta um conjunto de dados completo")
+def exportar(
+    tipo: str,
+    formato: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    categoria: Optional[str] = None,
+    ano_inicial: Optional[int] = Query(None, ge=1970, le=2100),
+    ano_final: Optional[int] = Query(None, ge=1970, le=2100),
+    usuario: str = Depends(get_current_user),
+):
+    """
+    Baixa o histórico completo de um conjunto de dados, sem o limite de paginação dos endpoints de consulta.
+
+    - A resposta é transmitida aos poucos, página a página, com uso de memória constante
+      independentemente do tamanho da tabela.
+    - Formatos: `ndjson` (um registro JSON por linha), `csv` ou `parquet`.
+    - Filtros opcionais: `categoria`, `ano_inicial` e `ano_final`.
+
+    **Parâmetro de caminho:**
+    - `tipo`: `producao`, `comercializacao`, `processamento`, `importacao` ou `exportacao`
+
+    🔒 Este endpoint requer autenticação via token JWT.
+    """
+    if tipo not in TABELAS:
+        raise HTTPException(status_code=404, detail=f"Tipo deve ser um de {list(TABELAS)}.")
+    if formato == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Exportação em Parquet requer o pacote pyarrow.")
+
+    tabela = TABELAS[tipo]["modelo"].__table__
+    colunas = [c.name for c in tabela.columns]
+    dados = paginas(tipo, categoria, ano_inicial, ano_final)
+    if formato == "ndjson":
+        corpo = _ndjson(colunas, dados)
+    elif formato == "csv":
+        corpo = _csv(colunas, dados)
+    else:
+        corpo = _parquet(tabela, dados)
+
+    media_type, extensao = FORMATOS[formato]
+    return StreamingResponse(
+        corpo,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{tipo}.{extensao}"'},
+    )
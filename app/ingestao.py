@@ -0,0 +1,181 @@
+import argparse
+import importlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from sqlalchemy import bindparam, insert, update
+from app.colunar import copia as copia_colunar
+from app.config import settings
+from app.database import engine, trava_entre_processos
+from app.metricas import arquivos_ingestao
+from app.models import ExecucaoIngestao
+
+logger = logging.getLogger(__name__)
+
+# Módulo com as funções de descoberta e processamento de arquivos de cada conjunto de dados.
+# Importado só na primeira ingestão: traz pandas e requests, que a API não precisa para subir.
+MODULOS = {
+    "producao": "app.scraper",
+    "processamento": "app.scraper",
+    "comercializacao": "app.scraper",
+    "importacao": "app.scraper_import_export",
+    "exportacao": "app.scraper_import_export",
+}
+TIPOS = list(MODULOS.keys())
+
+def _modulo(tipo: str):
+    return importlib.import_module(MODULOS[tipo])
+
+# Ingestões em andamento neste processo: tipo -> Future com o resultado
+_em_andamento = {}
+_trava_em_andamento = threading.Lock()
+
+def _processar(tipo: str, arquivo: dict, forcar: bool, execucao_id: int = None):
+    from app.resumos import atualizar_resumos_pendentes
+
+    inicio = time.perf_counter()
+    try:
+        resultado = _modulo(tipo).processar_arquivo(tipo, arquivo, forcar, execucao_id)
+        resultado.pop("registros", None)
+        atualizar_resumos_pendentes(tipo)
+        arquivos_ingestao.incrementar(tipo, "inalterado" if resultado.get("inalterado") else "gravado")
+    except Exception as e:
+        logger.exception("Falha na ingestão de %s (%s)", arquivo.get("arquivo"), tipo)
+        arquivos_ingestao.incrementar(tipo, "erro")
+        resultado = {**arquivo, "erro": str(e)}
+    resultado["duracao_s"] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+def _executar(tipos, forcar: bool, execucoes: dict):
+    resultados = {tipo: {"arquivos": []} for tipo in tipos}
+    with ThreadPoolExecutor(max_workers=settings.INGESTAO_CONCORRENCIA) as executor:
+        descobertas = {executor.submit(_modulo(tipo).listar_arquivos, tipo): tipo for tipo in tipos}
+        processamentos = {}
+        for futuro in as_completed(descobertas):
+            tipo = descobertas[futuro]
+            try:
+                arquivos = futuro.result()
+            except Exception as e:
+                logger.exception("Falha ao listar os arquivos de %s", tipo)
+                arquivos_ingestao.incrementar(tipo, "erro")
+                resultados[tipo]["erro"] = str(e)
+                continue
+            if not arquivos:
+                resultados[tipo]["erro"] = f"Nenhum arquivo .csv compatível encontrado para {tipo}"
+            for arquivo in arquivos:
+                processamentos[executor.submit(_processar, tipo, arquivo, forcar, execucoes[tipo])] = tipo
+
+        for futuro in as_completed(processamentos):
+            resultados[processamentos[futuro]]["arquivos"].append(futuro.result())
+
+    for resultado in resultados.values():
+        resultado["arquivos"].sort(key=lambda a: a["categoria"])
+    return resultados
+
+def _abrir_execucoes(tipos, origem: str, iniciado_em: datetime) -> dict:
+    """Cria, antes de gravar, a linha de cada conjunto em `execucoes_ingestao`; o id marca as alterações da execução."""
+    from app.persistencia import trava_escrita
+
+    with trava_escrita, engine.begin() as conn:
+        return {
+            tipo: conn.execute(
+                insert(ExecucaoIngestao).values(tipo=tipo, origem=origem, iniciado_em=iniciado_em, sucesso=0)
+            ).inserted_primary_key[0]
+            for tipo in tipos
+        }
+
+def _registrar_execucoes(resultados: dict, execucoes: dict, iniciado_em: datetime, finalizado_em: datetime):
+    from app.persistencia import trava_escrita
+
+    linhas = []
+    for tipo, resultado in resultados.items():
+        arquivos = resultado["arquivos"]
+        gravacoes = [a.get("gravacao") or {} for a in arquivos]
+        erros = [resultado["erro"]] if "erro" in resultado else [f"{a['categoria']}: {a['erro']}" for a in arquivos if "erro" in a]
+        linhas.append({
+            "_id": execucoes[tipo],
+            "finalizado_em": finalizado_em,
+            "duracao_s": (finalizado_em - iniciado_em).total_seconds(),
+            "sucesso": int(not erros),
+            "arquivos": len(arquivos),
+            **{c: sum(g.get(c, 0) for g in gravacoes) for c in ("inseridos", "atualizados", "removidos", "inalterados")},
+            "erro": "; ".join(erros) or None,
+        })
+    with trava_escrita, engine.begin() as conn:
+        conn.execute(update(ExecucaoIngestao).where(ExecucaoIngestao.id == bindparam("_id")), linhas)
+
+def atualizar_todos(tipos=None, forcar: bool = False, origem: str = "admin"):
+    """
+    Executa a ingestão dos conjuntos de dados: descobre todos os CSVs de cada aba do site
+    da Embrapa (inclusive sub-abas), baixa, transforma com pandas e persiste no banco.
+
+    - Descoberta e arquivos são processados em paralelo (no máximo `INGESTAO_CONCORRENCIA`
+      ao mesmo tempo), compartilhando o pool de conexões HTTP; cada arquivo é gravado
+      assim que seu download termina.
+    - Um CSV idêntico ao da última ingestão é pulado, a menos que `forcar` seja verdadeiro.
+    - Single-flight: chamadas simultâneas para o mesmo conjunto compartilham uma única
+      ingestão em andamento e recebem o mesmo resultado; entre processos, uma trava de
+      arquivo no diretório do banco serializa a ingestão de cada conjunto.
+    - Cada execução fica registrada em `execucoes_ingestao` (sucesso, duração, contagens), e as
+      linhas que ela alterou, em `alteracoes_dados` com o `execucao_id` correspondente.
+
+    Retorna, por conjunto, o resumo de cada arquivo (categoria, contagem de registros gravados, duração).
+    """
+    tipos = list(dict.fromkeys(tipos or TIPOS))
+    proprios, alheios = {}, {}
+    with _trava_em_andamento:
+        for tipo in tipos:
+            if tipo in _em_andamento:
+                alheios[tipo] = _em_andamento[tipo]
+            else:
+                proprios[tipo] = _em_andamento[tipo] = Future()
+
+    try:
+        if proprios:
+            # Uma trava de arquivo por conjunto: outros processos (workers, CLI) esperam esta ingestão
+            with trava_entre_processos(*(f"ingestao_{tipo}" for tipo in proprios)):
+                iniciado_em = datetime.utcnow()
+                execucoes = _abrir_execucoes(proprios, origem, iniciado_em)
+                resultados = _executar(list(proprios), forcar, execucoes)
+                _registrar_execucoes(resultados, execucoes, iniciado_em, datetime.utcnow())
+            if copia_colunar.carregada:
+                # A cópia em memória da API deste processo passa a refletir a ingestão de imediato
+                try:
+                    copia_colunar.recarregar()
+                except Exception:
+                    logger.exception("Falha ao recarregar a cópia colunar após a ingestão")
+            for tipo, futuro in proprios.items():
+                futuro.set_result(resultados[tipo])
+    except BaseException as e:
+        for futuro in proprios.values():
+            if not futuro.done():
+                futuro.set_exception(e)
+        raise
+    finally:
+        with _trava_em_andamento:
+            for tipo in proprios:
+                _em_andamento.pop(tipo, None)
+
+    return {tipo: (proprios.get(tipo) or alheios[tipo]).result() for tipo in tipos}
+
+def atualizar(tipo: str, forcar: bool = False, origem: str = "admin"):
+    if tipo not in MODULOS:
+        return {"erro": f"Tipo '{tipo}' inválido. Opções disponíveis: {TIPOS}"}
+    return atualizar_todos([tipo], forcar, origem)[tipo]
+
+if __name__ == "__main__":
+    # Uso: python -m app.ingestao [producao comercializacao ...]
+    parser = argparse.ArgumentParser(description="Atualiza a base local com os dados da Embrapa.")
+    parser.add_argument("tipos", nargs="*", help=f"conjuntos a atualizar, entre {TIPOS} (padrão: todos)")
+    parser.add_argument("--forcar", action="store_true", help="reprocessa mesmo que o CSV não tenha mudado")
+    args = parser.parse_args()
+    invalidos = [t for t in args.tipos if t not in TIPOS]
+    if invalidos:
+        parser.error(f"tipos inválidos: {invalidos}")
+
+    from app.migracoes import inicializar_banco
+    inicializar_banco()
+    print(json.dumps(atualizar_todos(args.tipos, args.forcar, origem="cli"), ensure_ascii=False, indent=2))
@@ -0,0 +1,214 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi import APIRouter, Response
+from starlette.datastructures import MutableHeaders
+from app.database import engine, engine_async, engine_leitura
+
+router = APIRouter()
+
+# Limites dos histogramas, em segundos
+LIMITES_REQUISICAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_INGESTAO = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _rotulos(rotulos: tuple) -> str:
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in rotulos) + "}"
+
+class Contador:
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, rotulos
+        self._valores = {}
+        self._trava = threading.Lock()
+
+    def incrementar(self, *valores, quantidade: float = 1):
+        with self._trava:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        with self._trava:
+            for valores, total in sorted(self._valores.items()):
+                linhas.append(f"{self.nome}{_rotulos(tuple(zip(self.rotulos, valores)))} {total:g}")
+        return linhas
+
+class Histograma:
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), limites: tuple = LIMITES_REQUISICAO):
+        self.nome, self.ajuda, self.rotulos, self.limites = nome, ajuda, rotulos, limites
+        self._series = {}  # valores dos rótulos -> [contagem por faixa..., soma, total]
+        self._trava = threading.Lock()
+
+    def observar(self, segundos: float, *valores):
+        faixa = bisect.bisect_left(self.limites, segundos)
+        with self._trava:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [0] * (len(self.limites) + 3)
+            serie[faixa] += 1
+            serie[-2] += segundos
+            serie[-1] += 1
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        with self._trava:
+            series = sorted((valores, list(serie)) for valores, serie in self._series.items())
+        for valores, serie in series:
+            rotulos = tuple(zip(self.rotulos, valores))
+            acumulado = 0
+            for limite, contagem in zip((*self.limites, "+Inf"), serie[:-2]):
+                acumulado += contagem
+                linhas.append(f"{self.nome}_bucket{_rotulos((*rotulos, ('le', limite)))} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_rotulos(rotulos)} {serie[-2]:.6f}")
+            linhas.append(f"{self.nome}_count{_rotulos(rotulos)} {serie[-1]}")
+        return linhas
+
+requisicoes = Histograma(
+    "api_requisicao_segundos", "Duração das requisições HTTP por rota", ("metodo", "rota", "status")
+)
+etapas_ingestao = Histograma(
+    "ingestao_etapa_segundos", "Duração de cada etapa da ingestão por arquivo (download, leitura, formato_longo, gravacao)",
+    ("tipo", "etapa"), LIMITES_INGESTAO,
+)
+registros_ingestao = Contador(
+    "ingestao_registros_total", "Registros processados pela ingestão por resultado (inserido, atualizado, removido, inalterado, descartado)",
+    ("tipo", "resultado"),
+)
+arquivos_ingestao = Contador(
+    "ingestao_arquivos_total", "Arquivos processados pela ingestão por resultado (gravado, inalterado, erro)", ("tipo", "resultado")
+)
+METRICAS = [requisicoes, etapas_ingestao, registros_ingestao, arquivos_ingestao]
+
+# Etapas da requisição atual, devolvidas no cabeçalho Server-Timing
+_etapas_requisicao: ContextVar = ContextVar("etapas_requisicao", default=None)
+
+def registrar_etapa(nome: str, segundos: float = None, descricao: str = None):
+    etapas = _etapas_requisicao.get()
+    if etapas is not None:
+        etapas.append((nome, segundos, descricao))
+
+@contextmanager
+def medir_etapa(nome: str):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar_etapa(nome, time.perf_counter() - inicio)
+
+@contextmanager
+def medir_etapa_ingestao(tipo: str, etapa: str):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapas_ingestao.observar(time.perf_counter() - inicio, tipo, etapa)
+
+def registrar_gravacao(tipo: str, gravacao: dict):
+    for chave, resultado in (("inseridos", "inserido"), ("atualizados", "atualizado"), ("removidos", "removido"),
+                             ("inalterados", "inalterado"), ("descartados", "descartado")):
+        if gravacao.get(chave):
+            registros_ingestao.incrementar(tipo, resultado, quantidade=gravacao[chave])
+
+def _formatar_server_timing(etapas: list, total: float) -> str:
+    partes = []
+    for nome, segundos, descricao in [*etapas, ("app", total, None)]:
+        parte = nome
+        if segundos is not None:
+            parte += f";dur={segundos * 1000:.1f}"
+        if descricao:
+            parte += f';desc="{descricao}"'
+        partes.append(parte)
+    return ", ".join(partes)
+
+def _rota(scope) -> str:
+    """
+    Caminho com os parâmetros no lugar dos valores (ex: /exportar/{tipo}), para que a cardinalidade
+    do rótulo fique limitada ao número de rotas; requisições sem rota correspondente são agrupadas.
+    """
+    if "endpoint" not in scope:
+        return "nao_encontrada"
+    caminho = scope["path"]
+    for nome, valor in scope.get("path_params", {}).items():
+        caminho = caminho.replace(f"/{valor}", f"/{{{nome}}}", 1)
+    return caminho
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI: mede cada requisição HTTP (histograma por método, rota e status) e
+    acrescenta à resposta o cabeçalho `Server-Timing` com as etapas registradas durante ela
+    (ex: `cache;desc="acerto"`, `consulta;dur=3.2`) e o tempo total no servidor (`app`).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        etapas = []
+        token = _etapas_requisicao.set(etapas)
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                cabecalhos = MutableHeaders(scope=mensagem)
+                cabecalhos.append("Server-Timing", _formatar_server_timing(etapas, time.perf_counter() - inicio))
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _etapas_requisicao.reset(token)
+            requisicoes.observar(time.perf_counter() - inicio, scope["method"], _rota(scope), status)
+
+def _metricas_cache() -> list:
+    from app.cache_respostas import cache  # cache_respostas importa este módulo
+
+    estatisticas = cache.estatisticas()
+    linhas = [
+        "# HELP cache_respostas_entradas Entradas no cache de respostas",
+        "# TYPE cache_respostas_entradas gauge",
+        f"cache_respostas_entradas {estatisticas['entradas']}",
+        "# HELP cache_respostas_eventos_total Eventos do cache de respostas",
+        "# TYPE cache_respostas_eventos_total counter",
+    ]
+    for evento in ("acertos", "falhas", "remocoes", "expiradas", "nao_modificadas", "invalidacoes"):
+        linhas.append(f'cache_respostas_eventos_total{{evento="{evento}"}} {estatisticas[evento]}')
+    consultas = estatisticas["acertos"] + estatisticas["falhas"]
+    linhas += [
+        "# HELP cache_respostas_taxa_acerto Fração das consultas atendidas pelo cache desde o início do processo",
+        "# TYPE cache_respostas_taxa_acerto gauge",
+        f"cache_respostas_taxa_acerto {estatisticas['acertos'] / consultas if consultas else 0:.4f}",
+    ]
+    return linhas
+
+def _metricas_pools() -> list:
+    linhas = [
+        "# HELP db_pool_conexoes Conexões de cada pool do SQLAlchemy por estado",
+        "# TYPE db_pool_conexoes gauge",
+    ]
+    for nome, pool in (("escrita", engine.pool), ("leitura", engine_leitura.pool), ("async", engine_async.sync_engine.pool)):
+        if not hasattr(pool, "checkedout"):
+            continue
+        for estado, valor in (("em_uso", pool.checkedout()), ("livres", pool.checkedin()), ("extras", max(pool.overflow(), 0)), ("tamanho", pool.size())):
+            linhas.append(f'db_pool_conexoes{{engine="{nome}",estado="{estado}"}} {valor}')
+    return linhas
+
+def exportar() -> str:
+    """Todas as métricas no formato de texto do Prometheus."""
+    linhas = [linha for metrica in METRICAS for linha in metrica.exportar()]
+    return "\n".join([*linhas, *_metricas_cache(), *_metricas_pools()]) + "\n"
+
+@router.get("/metrics", summary="Métricas no formato do Prometheus", include_in_schema=False)
+def metricas():
+    return Response(exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
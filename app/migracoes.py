@@ -0,0 +1,137 @@
+from sqlalchemy import inspect, text
+from app.database import Base, engine, trava_entre_processos
+import app.models  # noqa: F401  (registra os modelos no Base)
+
+def _recriar_tabela(conn, nome: str, colunas_extras: dict):
+    """
+    Recria a tabela `nome` a partir do modelo atual, copiando as linhas existentes.
+    O SQLite não permite alterar restrições de uma tabela existente, por isso a troca
+    é feita por renomeação + cópia. `colunas_extras` informa o valor das colunas novas.
+    """
+    tabela = Base.metadata.tables[nome]
+    antiga = f"_{nome}_antiga"
+    conn.execute(text(f"ALTER TABLE {nome} RENAME TO {antiga}"))
+    for indice in inspect(conn).get_indexes(antiga):
+        conn.execute(text(f"DROP INDEX IF EXISTS {indice['name']}"))
+    tabela.create(conn)
+
+    existentes = {c["name"] for c in inspect(conn).get_columns(antiga)}
+    destino = [c.name for c in tabela.columns if c.name in existentes or c.name in colunas_extras]
+    origem = [c if c in existentes else f":{c}" for c in destino]
+    conn.execute(
+        text(f"INSERT INTO {nome} ({', '.join(destino)}) SELECT {', '.join(origem)} FROM {antiga}"),
+        {c: v for c, v in colunas_extras.items() if c not in existentes},
+    )
+    conn.execute(text(f"DROP TABLE {antiga}"))
+
+def _adicionar_categoria(conn):
+    # Linhas anteriores ao catálogo vieram de um único arquivo por aba
+    categorias = {
+        "producao": "geral",
+        "comercializacao": "geral",
+        "processamento": "viniferas",
+        "importacao": "vinhos_de_mesa",
+        "exportacao": "vinhos_de_mesa",
+    }
+    for nome, categoria in categorias.items():
+        colunas = {c["name"] for c in inspect(conn).get_columns(nome)}
+        if "categoria" not in colunas:
+            _recriar_tabela(conn, nome, {"categoria": categoria})
+
+def _resumos_vencidos(conn):
+    # As tabelas materializadas são recalculadas uma única vez, no fim de `aplicar_migracoes`
+    return True
+
+def _criar_indices(conn):
+    # Índices declarados nos modelos que ainda não existem num banco criado antes deles
+    for tabela in Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(conn, checkfirst=True)
+
+def _adicionar_removidos(conn):
+    colunas = {c["name"] for c in inspect(conn).get_columns("execucoes_ingestao")}
+    if "removidos" not in colunas:
+        conn.execute(text("ALTER TABLE execucoes_ingestao ADD COLUMN removidos INTEGER"))
+
+def _texto_corrigido(valor: str) -> str:
+    # Texto UTF-8 que foi lido como latin1 (ex: "AfeganistÃ£o" -> "Afeganistão"); os demais ficam iguais
+    try:
+        return valor.encode("latin1").decode("utf-8")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return valor
+
+def _corrigir_codificacao(conn):
+    # Os CSVs da Embrapa são UTF-8, mas eram decodificados como latin1 antes da leitura direta dos bytes
+    from app.persistencia import ESQUEMAS
+    corrigidos = False
+    for nome, esquema in ESQUEMAS.items():
+        tabela = Base.metadata.tables[nome]
+        for coluna in ("control", "produto", "cultivar", "pais"):
+            if coluna not in esquema["colunas"].values():
+                continue
+            valores = conn.execute(text(f"SELECT DISTINCT {coluna} FROM {nome} WHERE {coluna} IS NOT NULL")).scalars()
+            for valor in valores.all():
+                corrigido = _texto_corrigido(valor)
+                if corrigido != valor:
+                    conn.execute(tabela.update().where(tabela.c[coluna] == valor).values({coluna: corrigido}))
+                    corrigidos = True
+    return corrigidos
+
+def _adicionar_ultima_alteracao(conn):
+    colunas = {c["name"] for c in inspect(conn).get_columns("versao_dados")}
+    if "ultima_alteracao" not in colunas:
+        conn.execute(text("ALTER TABLE versao_dados ADD COLUMN ultima_alteracao INTEGER NOT NULL DEFAULT 0"))
+    # Os resumos já refletem tudo o que está registrado até aqui
+    from app.resumos import _marcar_consumidas
+    from app.persistencia import ESQUEMAS
+    for tabela in ESQUEMAS:
+        _marcar_consumidas(conn, tabela)
+
+def _detalhar_alteracoes(conn):
+    colunas = {c["name"] for c in inspect(conn).get_columns("alteracoes_dados")}
+    for coluna, tipo in (("valor_usd_anterior", "FLOAT"), ("valor_usd", "FLOAT"),
+                         ("execucao_id", "INTEGER REFERENCES execucoes_ingestao (id)")):
+        if coluna not in colunas:
+            conn.execute(text(f"ALTER TABLE alteracoes_dados ADD COLUMN {coluna} {tipo}"))
+    _criar_indices(conn)
+
+# (versão, descrição, função). Novas migrações entram sempre no fim da lista. Uma função que
+# retorna verdadeiro deixa as tabelas materializadas vencidas: elas são recalculadas uma vez só,
+# depois de todas as migrações pendentes.
+MIGRACOES = [
+    (1, "coluna categoria e chaves únicas por categoria", _adicionar_categoria),
+    (2, "tabelas materializadas dos endpoints analíticos", _resumos_vencidos),
+    (3, "índices compostos para os filtros por produto/cultivar/control/país", _criar_indices),
+    (4, "contagem de removidos no histórico de ingestões", _adicionar_removidos),
+    (5, "textos gravados com a codificação errada (UTF-8 lido como latin1)", _corrigir_codificacao),
+    (6, "árvore de itens pelo control e totais por nó e ano", _resumos_vencidos),
+    (7, "métricas de importação x exportação por país e ano", _resumos_vencidos),
+    (8, "última alteração de dados já refletida nos resumos", _adicionar_ultima_alteracao),
+    (9, "valor em US$ e execução de ingestão no registro de alterações", _detalhar_alteracoes),
+]
+
+def aplicar_migracoes(bind=None):
+    with (bind or engine).begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_versao (versao INTEGER NOT NULL)"))
+        atual = conn.execute(text("SELECT MAX(versao) FROM schema_versao")).scalar() or 0
+        vencidos = False
+        for versao, _, migracao in MIGRACOES:
+            if versao > atual:
+                vencidos = bool(migracao(conn)) or vencidos
+                conn.execute(text("INSERT INTO schema_versao (versao) VALUES (:v)"), {"v": versao})
+        if vencidos:
+            from app.resumos import reconstruir_resumos
+            reconstruir_resumos(conn)
+
+def inicializar_banco(bind=None):
+    """
+    Cria as tabelas que ainda não existem e aplica as migrações pendentes. Vários workers
+    subindo ao mesmo tempo migram um de cada vez; os seguintes não encontram nada pendente.
+    """
+    with trava_entre_processos("migracoes"):
+        Base.metadata.create_all(bind=bind or engine)
+        aplicar_migracoes(bind)
+
+if __name__ == "__main__":
+    # Uso: python -m app.migracoes
+    inicializar_banco()
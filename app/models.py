@@ -1,13 +1,19 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint, Index
 from datetime import datetime
 from app.database import Base
 
 class Producao(Base):
     __tablename__ = "producao"
-    __table_args__ = (UniqueConstraint('id_original', 'ano', name='_producao_uc'),)
+    __table_args__ = (
+        UniqueConstraint('categoria', 'id_original', 'ano', name='_producao_uc'),
+        Index('ix_producao_produto_ano', 'produto', 'ano'),
+        Index('ix_producao_control_ano', 'control', 'ano'),
+        Index('ix_producao_categoria_ano', 'categoria', 'ano'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     id_original = Column(Integer)
+    categoria = Column(String, nullable=False, default="geral")
     control = Column(String)
     produto = Column(String)
     ano = Column(Integer, index=True)
@@ -15,10 +21,16 @@ class Producao(Base):
 
 class Comercializacao(Base):
     __tablename__ = "comercializacao"
-    __table_args__ = (UniqueConstraint('id_original', 'ano', name='_comercializacao_uc'),)
+    __table_args__ = (
+        UniqueConstraint('categoria', 'id_original', 'ano', name='_comercializacao_uc'),
+        Index('ix_comercializacao_produto_ano', 'produto', 'ano'),
+        Index('ix_comercializacao_control_ano', 'control', 'ano'),
+        Index('ix_comercializacao_categoria_ano', 'categoria', 'ano'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     id_original = Column(Integer)
+    categoria = Column(String, nullable=False, default="geral")
     control = Column(String)
     produto = Column(String)
     ano = Column(Integer, index=True)
@@ -26,10 +38,16 @@ class Comercializacao(Base):
 
 class Processamento(Base):
     __tablename__ = "processamento"
-    __table_args__ = (UniqueConstraint('id_original', 'ano', name='_processamento_uc'),)
+    __table_args__ = (
+        UniqueConstraint('categoria', 'id_original', 'ano', name='_processamento_uc'),
+        Index('ix_processamento_cultivar_ano', 'cultivar', 'ano'),
+        Index('ix_processamento_control_ano', 'control', 'ano'),
+        Index('ix_processamento_categoria_ano', 'categoria', 'ano'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     id_original = Column(Integer)
+    categoria = Column(String, nullable=False, default="viniferas")  # viniferas, americanas_e_hibridas, uvas_de_mesa, sem_classificacao
     control = Column(String)
     cultivar = Column(String)
     ano = Column(Integer, index=True)
@@ -37,9 +55,15 @@ class Processamento(Base):
 
 class Importacao(Base):
     __tablename__ = "importacao"
-    __table_args__ = (UniqueConstraint('pais', 'ano', name='_importacao_uc'),)
+    __table_args__ = (
+        UniqueConstraint('categoria', 'pais', 'ano', name='_importacao_uc'),
+        # Cobre as séries "todos os anos de um país" sem voltar à tabela
+        Index('ix_importacao_pais_ano', 'pais', 'ano', 'quantidade', 'valor_usd'),
+        Index('ix_importacao_categoria_ano', 'categoria', 'ano'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
+    categoria = Column(String, nullable=False, default="vinhos_de_mesa")  # vinhos_de_mesa, espumantes, uvas_frescas, uvas_passas, suco_de_uva
     pais = Column(String)
     ano = Column(Integer, index=True)
     quantidade = Column(Float)
@@ -47,20 +71,199 @@ class Importacao(Base):
 
 class Exportacao(Base):
     __tablename__ = "exportacao"
-    __table_args__ = (UniqueConstraint('pais', 'ano', name='_exportacao_uc'),)
+    __table_args__ = (
+        UniqueConstraint('categoria', 'pais', 'ano', name='_exportacao_uc'),
+        # Cobre as séries "todos os anos de um país" sem voltar à tabela
+        Index('ix_exportacao_pais_ano', 'pais', 'ano', 'quantidade', 'valor_usd'),
+        Index('ix_exportacao_categoria_ano', 'categoria', 'ano'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
+    categoria = Column(String, nullable=False, default="vinhos_de_mesa")  # vinhos_de_mesa, espumantes, uvas_frescas, suco_de_uva
     pais = Column(String)
     ano = Column(Integer, index=True)
     quantidade = Column(Float)
     valor_usd = Column(Float)
 
+# Tabelas materializadas para os endpoints analíticos, recalculadas após cada ingestão (app/resumos.py)
+class ResumoAnual(Base):
+    __tablename__ = "resumo_anual"
+    __table_args__ = (UniqueConstraint('tabela', 'categoria', 'ano', name='_resumo_anual_uc'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tabela = Column(String, nullable=False)
+    categoria = Column(String, nullable=False)
+    ano = Column(Integer, nullable=False)
+    total = Column(Float)
+    valor_usd = Column(Float, nullable=True)
+    variacao_anual = Column(Float, nullable=True)
+
+class SerieAnual(Base):
+    __tablename__ = "serie_anual"
+    __table_args__ = (
+        UniqueConstraint('tabela', 'categoria', 'chave', 'ano', name='_serie_anual_uc'),
+        Index('ix_serie_anual_tabela_ano', 'tabela', 'ano'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tabela = Column(String, nullable=False)
+    categoria = Column(String, nullable=False)
+    chave = Column(String, nullable=False)  # id_original (produtos/cultivares) ou país
+    nome = Column(String)
+    raiz = Column(Integer, default=1)  # 1 para itens de primeiro nível (ex: VINHO DE MESA), 0 para subitens (ex: vm_Tinto)
+    ano = Column(Integer, nullable=False)
+    quantidade = Column(Float)
+    valor_usd = Column(Float, nullable=True)
+    variacao_anual = Column(Float, nullable=True)
+
+class ResumoSerie(Base):
+    __tablename__ = "resumo_serie"
+    __table_args__ = (
+        UniqueConstraint('tabela', 'categoria', 'chave', name='_resumo_serie_uc'),
+        Index('ix_resumo_serie_tabela_nome', 'tabela', 'nome'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tabela = Column(String, nullable=False)
+    categoria = Column(String, nullable=False)
+    chave = Column(String, nullable=False)
+    nome = Column(String)
+    ano_inicial = Column(Integer)
+    ano_final = Column(Integer)
+    quantidade_total = Column(Float)
+    valor_total = Column(Float, nullable=True)
+    quantidade_ultimo_ano = Column(Float)
+    variacao_ultimo_ano = Column(Float, nullable=True)
+    cagr = Column(Float, nullable=True)  # taxa de crescimento anual composta
+
+class NoArvore(Base):
+    """
+    Hierarquia de itens das tabelas com `control` (produção, comercialização, processamento), uma
+    árvore por categoria: o nó da categoria (chave ""), os itens de primeiro nível (ex: VINHO DE MESA)
+    e seus subitens (ex: vm_Tinto), que seguem o item pai na ordem do CSV.
+    """
+    __tablename__ = "arvore_itens"
+    __table_args__ = (UniqueConstraint('tabela', 'categoria', 'chave', name='_arvore_itens_uc'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tabela = Column(String, nullable=False)
+    categoria = Column(String, nullable=False)
+    chave = Column(String, nullable=False)  # id_original; "" para o nó da categoria
+    pai = Column(String, nullable=True)  # chave do nó pai; nulo para o nó da categoria
+    nivel = Column(Integer, nullable=False)  # 0 categoria, 1 item de primeiro nível, 2 subitem
+    nome = Column(String)
+    control = Column(String)
+    filhos = Column(Integer, nullable=False, default=0)
+
+class TotalArvore(Base):
+    """Totais de cada nó da árvore por ano: o informado no CSV, a soma dos filhos e o consolidado."""
+    __tablename__ = "totais_arvore"
+    __table_args__ = (
+        UniqueConstraint('tabela', 'categoria', 'chave', 'ano', name='_totais_arvore_uc'),
+        Index('ix_totais_arvore_pai', 'tabela', 'categoria', 'pai', 'ano'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tabela = Column(String, nullable=False)
+    categoria = Column(String, nullable=False)
+    chave = Column(String, nullable=False)
+    pai = Column(String, nullable=True)
+    ano = Column(Integer, nullable=False)
+    quantidade = Column(Float, nullable=True)  # valor do próprio nó no CSV (nulo no nó da categoria)
+    soma_filhos = Column(Float, nullable=True)  # nulo nos nós sem filhos
+    total = Column(Float)  # quantidade informada ou, na falta dela, a soma dos filhos
+
+class MetricaComercio(Base):
+    """
+    Importação e exportação de cada país lado a lado, por categoria e ano, com as métricas derivadas.
+    A linha com país "" traz o total da categoria (todos os países).
+    """
+    __tablename__ = "metricas_comercio"
+    __table_args__ = (UniqueConstraint('categoria', 'pais', 'ano', name='_metricas_comercio_uc'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    categoria = Column(String, nullable=False)
+    pais = Column(String, nullable=False)
+    ano = Column(Integer, nullable=False)
+    quantidade_importacao = Column(Float, nullable=True)
+    valor_importacao = Column(Float, nullable=True)
+    quantidade_exportacao = Column(Float, nullable=True)
+    valor_exportacao = Column(Float, nullable=True)
+    preco_importacao = Column(Float, nullable=True)  # US$ por unidade de quantidade (kg/litro)
+    preco_exportacao = Column(Float, nullable=True)
+    saldo_usd = Column(Float)  # exportação - importação
+    saldo_quantidade = Column(Float)
+    participacao_importacao = Column(Float, nullable=True)  # fração da quantidade da categoria no ano
+    participacao_exportacao = Column(Float, nullable=True)
+    media_5_anos_importacao = Column(Float, nullable=True)  # média móvel da quantidade, 5 anos até `ano`
+    media_5_anos_exportacao = Column(Float, nullable=True)
+    preco_5_anos_importacao = Column(Float, nullable=True)  # valor / quantidade somados nos 5 anos
+    preco_5_anos_exportacao = Column(Float, nullable=True)
+    cagr_5_anos_importacao = Column(Float, nullable=True)
+    cagr_5_anos_exportacao = Column(Float, nullable=True)
+
+class VersaoDados(Base):
+    __tablename__ = "versao_dados"
+
+    tabela = Column(String, primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)  # incrementada a cada alteração nos dados da tabela
+    ultima_alteracao = Column(Integer, nullable=False, default=0)  # maior id de alteracoes_dados já refletido nos resumos
+    atualizado_em = Column(DateTime, default=datetime.utcnow)
+
+class ExecucaoIngestao(Base):
+    """Histórico de ingestões: uma linha por conjunto de dados e execução (agendador, admin ou CLI)."""
+    __tablename__ = "execucoes_ingestao"
+    __table_args__ = (Index('ix_execucoes_ingestao_tipo_inicio', 'tipo', 'iniciado_em'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tipo = Column(String, nullable=False)
+    origem = Column(String)  # agendador, admin, cli
+    iniciado_em = Column(DateTime, nullable=False)
+    finalizado_em = Column(DateTime)
+    duracao_s = Column(Float)
+    sucesso = Column(Integer, nullable=False, default=0)
+    arquivos = Column(Integer)
+    inseridos = Column(Integer)
+    atualizados = Column(Integer)
+    inalterados = Column(Integer)
+    removidos = Column(Integer)
+    erro = Column(String, nullable=True)
+
+class ArquivoIngerido(Base):
+    """Hash do último conteúdo de cada CSV gravado no banco: um CSV idêntico não é reprocessado."""
+    __tablename__ = "arquivos_ingeridos"
+
+    url = Column(String, primary_key=True)
+    sha256 = Column(String, nullable=False)
+    ingerido_em = Column(DateTime, default=datetime.utcnow)
+
+class AlteracaoDados(Base):
+    """Registro das linhas inseridas, atualizadas e removidas em cada gravação das tabelas de dados."""
+    __tablename__ = "alteracoes_dados"
+    __table_args__ = (
+        Index('ix_alteracoes_dados_tabela_id', 'tabela', 'id'),
+        Index('ix_alteracoes_dados_execucao', 'execucao_id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tabela = Column(String, nullable=False)
+    categoria = Column(String, nullable=False)
+    chave = Column(String, nullable=False)  # id_original (produtos/cultivares) ou país
+    ano = Column(Integer, nullable=False)
+    operacao = Column(String, nullable=False)  # inserido, atualizado, removido
+    quantidade_anterior = Column(Float, nullable=True)
+    quantidade = Column(Float, nullable=True)
+    valor_usd_anterior = Column(Float, nullable=True)  # só importação/exportação
+    valor_usd = Column(Float, nullable=True)
+    execucao_id = Column(Integer, ForeignKey("execucoes_ingestao.id"), nullable=True)  # nula fora de `atualizar_todos`
+    registrado_em = Column(DateTime, nullable=False)
+
 class Usuario(Base):
     __tablename__ = "usuarios"
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     senha = Column(String)
-    status = Column(String, default="pendente")  # pendente, aprovado, rejeitado
+    status = Column(String, default="pendente", index=True)  # pendente, aprovado, rejeitado
     ultimo_token = Column(String, nullable=True)
-    data_token = Column(DateTime, nullable=True, default=datetime.utcnow)
\ No newline at end of file
+    data_token = Column(DateTime, nullable=True, default=datetime.utcnow)
@@ -0,0 +1,189 @@
+import threading
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from app.database import engine
+from app.models import AlteracaoDados, Producao, Comercializacao, Processamento, Importacao, Exportacao
+
+TAMANHO_LOTE = 5000
+
+# Ingestões concorrentes gravam uma de cada vez: o SQLite aceita um único escritor
+trava_escrita = threading.Lock()
+
+# Mapeamento das colunas do DataFrame "derretido" para as colunas de cada tabela
+ESQUEMAS = {
+    "producao": {
+        "modelo": Producao,
+        "chave": ["categoria", "id_original", "ano"],
+        "colunas": {"categoria": "categoria", "id": "id_original", "control": "control", "produto": "produto", "ano": "ano", "quantidade": "producao_toneladas"},
+    },
+    "comercializacao": {
+        "modelo": Comercializacao,
+        "chave": ["categoria", "id_original", "ano"],
+        "colunas": {"categoria": "categoria", "id": "id_original", "control": "control", "produto": "produto", "ano": "ano", "quantidade": "volume_comercializado"},
+    },
+    "processamento": {
+        "modelo": Processamento,
+        "chave": ["categoria", "id_original", "ano"],
+        "colunas": {"categoria": "categoria", "id": "id_original", "control": "control", "cultivar": "cultivar", "ano": "ano", "quantidade": "volume_processado_litros"},
+    },
+    "importacao": {
+        "modelo": Importacao,
+        "chave": ["categoria", "pais", "ano"],
+        "colunas": {"categoria": "categoria", "pais": "pais", "ano": "ano", "quantidade": "quantidade", "valor_usd": "valor_usd"},
+    },
+    "exportacao": {
+        "modelo": Exportacao,
+        "chave": ["categoria", "pais", "ano"],
+        "colunas": {"categoria": "categoria", "pais": "pais", "ano": "ano", "quantidade": "quantidade", "valor_usd": "valor_usd"},
+    },
+}
+
+def preparar_registros(df: pd.DataFrame, tipo: str) -> pd.DataFrame:
+    """
+    Converte o DataFrame "derretido" (uma linha por item e ano) para as colunas e tipos da tabela de destino.
+    Linhas sem chave válida são descartadas.
+    """
+    esquema = ESQUEMAS[tipo]
+    df = df.rename(columns={"Produto": "produto"})
+    tabela = esquema["modelo"].__table__
+
+    dados = pd.DataFrame({destino: df[origem] for origem, destino in esquema["colunas"].items()})
+    for nome in dados.columns:
+        tipo_coluna = tabela.c[nome].type.python_type
+        if tipo_coluna is str:
+            dados[nome] = dados[nome].astype(str)
+        else:
+            dados[nome] = pd.to_numeric(dados[nome], errors="coerce")
+
+    if "pais" in dados.columns:
+        dados["pais"] = dados["pais"].str.strip()
+    dados = dados.dropna(subset=esquema["chave"])
+    for nome in esquema["chave"]:
+        if tabela.c[nome].type.python_type is int:
+            dados[nome] = dados[nome].astype(int)
+    return dados
+
+def _colunas_valor(tipo: str) -> list:
+    esquema = ESQUEMAS[tipo]
+    return [c for c in esquema["colunas"].values() if c not in esquema["chave"]]
+
+def _hash_valores(dados: pd.DataFrame, tipo: str):
+    """Hash (uint64) das colunas de valor de cada linha, com tipos normalizados dos dois lados da comparação."""
+    tabela = ESQUEMAS[tipo]["modelo"].__table__
+    normalizado = pd.DataFrame({
+        c: dados[c].fillna("").astype(str) if tabela.c[c].type.python_type is str else dados[c].astype("float64")
+        for c in _colunas_valor(tipo)
+    })
+    return pd.util.hash_pandas_object(normalizado, index=False).to_numpy()
+
+def calcular_diferencas(novos: pd.DataFrame, atuais: pd.DataFrame, tipo: str):
+    """
+    Compara, por chave, as linhas vindas do CSV (`novos`, já em `preparar_registros`) com as
+    gravadas (`atuais`, com `id`) das mesmas categorias, num único merge vetorizado.
+
+    Retorna (inserir, atualizar, remover): linhas com chave nova; linhas cujo hash dos valores
+    mudou (com o `id` da linha gravada e os valores anteriores em `<coluna>_atual`); e linhas
+    gravadas que saíram do CSV.
+    """
+    chave = ESQUEMAS[tipo]["chave"]
+    novos = novos.drop_duplicates(chave, keep="last")
+    novos = novos.assign(_hash=_hash_valores(novos, tipo))
+    atuais = atuais.assign(_hash=_hash_valores(atuais, tipo))
+    juncao = novos.merge(atuais, on=chave, how="outer", suffixes=("", "_atual"), indicator=True)
+
+    inserir = juncao[juncao["_merge"] == "left_only"]
+    ambos = juncao[juncao["_merge"] == "both"]
+    atualizar = ambos[ambos["_hash"] != ambos["_hash_atual"]]
+    remover = juncao[juncao["_merge"] == "right_only"]
+    return inserir, atualizar, remover
+
+def _sem_nulos(dados: pd.DataFrame) -> list:
+    return dados.astype(object).where(dados.notna(), None).to_dict(orient="records")
+
+def _registrar_alteracoes(conn, tipo: str, operacao: str, linhas: pd.DataFrame, registrado_em: datetime, execucao_id=None):
+    if linhas.empty:
+        return
+    esquema = ESQUEMAS[tipo]
+    # (coluna do log, coluna da tabela): quantidade sempre; valor em US$ em importação/exportação
+    valores = [("quantidade", esquema["colunas"]["quantidade"])]
+    if "valor_usd" in esquema["colunas"]:
+        valores.append(("valor_usd", esquema["colunas"]["valor_usd"]))
+    registros = pd.DataFrame({
+        "tabela": tipo,
+        "categoria": linhas["categoria"],
+        "chave": linhas[esquema["chave"][1]].astype(str),
+        "ano": linhas["ano"].astype(int),
+        "operacao": operacao,
+        "execucao_id": execucao_id,
+        "registrado_em": registrado_em,
+    })
+    for destino, coluna in valores:
+        registros[f"{destino}_anterior"] = linhas[f"{coluna}_atual"] if operacao != "inserido" else None
+        registros[destino] = linhas[coluna] if operacao != "removido" else None
+    conn.execute(insert(AlteracaoDados), _sem_nulos(registros))
+
+def gravar_incremental(df: pd.DataFrame, tipo: str, tamanho_lote: int = TAMANHO_LOTE, bind=None, execucao_id=None):
+    """
+    Grava o DataFrame na tabela do `tipo` aplicando apenas as diferenças em relação ao que já
+    está no banco, para as categorias presentes no DataFrame (o CSV é a fonte completa delas):
+
+    - chaves novas são inseridas
+    - linhas com algum valor diferente (hash por chave) são atualizadas
+    - linhas que não estão mais no CSV são removidas
+
+    Cada alteração fica registrada em `alteracoes_dados`, com a execução de ingestão
+    (`execucao_id`) que a gravou, e é consumida pelos resumos (`atualizar_resumos_pendentes`).
+    Retorna a contagem de registros inseridos, atualizados, removidos, inalterados e descartados
+    (linhas do CSV sem chave válida ou repetidas).
+    """
+    esquema = ESQUEMAS[tipo]
+    tabela = esquema["modelo"].__table__
+    valores = _colunas_valor(tipo)
+    novos = preparar_registros(df, tipo).drop_duplicates(esquema["chave"], keep="last")
+    descartados = len(df) - len(novos)  # sem chave válida ou repetidos no CSV
+    categorias = novos["categoria"].unique().tolist()
+
+    with trava_escrita, (bind or engine).begin() as conn:
+        consulta = select(tabela.c.id, *[tabela.c[c] for c in esquema["colunas"].values()])
+        atuais = pd.read_sql(consulta.where(tabela.c.categoria.in_(categorias)), conn).astype(
+            {c: "int64" for c in esquema["chave"] if tabela.c[c].type.python_type is int}
+        )
+        inserir, atualizar, remover = calcular_diferencas(novos, atuais, tipo)
+
+        colunas = list(esquema["colunas"].values())
+        for inicio in range(0, len(inserir), tamanho_lote):
+            conn.execute(insert(tabela), _sem_nulos(inserir[colunas].iloc[inicio:inicio + tamanho_lote]))
+        if len(atualizar):
+            stmt = update(tabela).where(tabela.c.id == bindparam("_id"))
+            mudancas = atualizar[valores].assign(_id=atualizar["id"].astype(int))
+            for inicio in range(0, len(mudancas), tamanho_lote):
+                conn.execute(stmt, _sem_nulos(mudancas.iloc[inicio:inicio + tamanho_lote]))
+        ids = remover["id"].astype(int).tolist()
+        for inicio in range(0, len(ids), tamanho_lote):
+            conn.execute(delete(tabela).where(tabela.c.id.in_(ids[inicio:inicio + tamanho_lote])))
+
+        agora = datetime.utcnow()
+        for operacao, linhas in (("inserido", inserir), ("atualizado", atualizar), ("removido", remover)):
+            _registrar_alteracoes(conn, tipo, operacao, linhas, agora, execucao_id)
+
+    return {
+        "inseridos": len(inserir),
+        "atualizados": len(atualizar),
+        "removidos": len(remover),
+        "inalterados": len(novos) - len(inserir) - len(atualizar),
+        "descartados": descartados,
+    }
+
+def alteracoes_desde(conn, tabela: str, ultimo_id: int = 0) -> pd.DataFrame:
+    """
+    Alterações registradas numa tabela de dados após `ultimo_id` (exclusivo), em ordem.
+    Um consumidor guarda o maior `id` que já processou e pede só o que veio depois.
+    """
+    consulta = (
+        select(AlteracaoDados)
+        .where(AlteracaoDados.tabela == tabela, AlteracaoDados.id > ultimo_id)
+        .order_by(AlteracaoDados.id)
+    )
+    return pd.read_sql(consulta, conn)
@@ -0,0 +1,101 @@
+import threading
+import numpy as np
+import pandas as pd
+from app.config import settings
+from app.models import SerieAnual
+from app.resumos import versao_dados
+
+# Anos mais recentes usados no ajuste e horizonte máximo pré-calculado
+JANELA_AJUSTE = 20
+HORIZONTE_MAXIMO = settings.PREVISAO_HORIZONTE_MAXIMO
+
+_cache = {}
+_trava_cache = threading.Lock()
+
+def montar_matriz(serie: pd.DataFrame):
+    """
+    Converte a série longa (categoria, chave, ano, quantidade) em uma matriz (séries x anos), com NaN
+    nos anos ausentes. Cada série é um par (categoria, chave): o mesmo `id_original` em categorias
+    diferentes é outro item, e um par repetido no mesmo ano levanta ValueError em vez de ser somado.
+    """
+    matriz = serie.pivot(index=["categoria", "chave"], columns="ano", values="quantidade")
+    return matriz.index.to_numpy(), matriz.columns.to_numpy(dtype=int), matriz.to_numpy(dtype="float64")
+
+def ajustar_em_lote(y: np.ndarray, anos: np.ndarray):
+    """
+    Ajusta, para todas as séries de uma vez, o modelo
+
+        y[t] = a + b * t + c * y[t-1]
+
+    (tendência linear + termo autorregressivo de ordem 1) por mínimos quadrados.
+    As equações normais de todas as séries são montadas com `einsum` e resolvidas num único
+    `np.linalg.solve` em lote. Cada série é normalizada pela sua média para o sistema ficar
+    bem condicionado; anos ausentes (NaN) são ignorados.
+
+    Retorna os coeficientes (séries x 3) e a escala de cada série.
+    """
+    y = y[:, -JANELA_AJUSTE:]
+    t = (anos[-JANELA_AJUSTE:] - anos[-1]).astype("float64")
+    escala = np.nanmean(np.abs(y), axis=1)
+    escala = np.where(np.isfinite(escala) & (escala > 0), escala, 1.0)
+    yn = y / escala[:, None]
+
+    alvo, defasado = yn[:, 1:], yn[:, :-1]
+    validos = np.isfinite(alvo) & np.isfinite(defasado)
+    alvo = np.where(validos, alvo, 0.0)
+    defasado = np.where(validos, defasado, 0.0)
+
+    # X: (séries x anos x 3) = [1, t, y[t-1]], com linhas inválidas zeradas
+    X = np.stack([validos * 1.0, validos * t[None, 1:], defasado], axis=2)
+    XtX = np.einsum("pti,ptj->pij", X, X) + 1e-8 * np.eye(3)
+    Xty = np.einsum("pti,pt->pi", X, alvo)
+    coeficientes = np.linalg.solve(XtX, Xty[..., None])[..., 0]
+    # Mantém o termo autorregressivo estável para previsões longas
+    coeficientes[:, 2] = np.clip(coeficientes[:, 2], -0.99, 0.99)
+    return coeficientes, escala
+
+def prever_em_lote(coeficientes: np.ndarray, escala: np.ndarray, ultimo_valor: np.ndarray, horizonte: int):
+    """Projeta todas as séries `horizonte` anos à frente, de forma recursiva (séries x horizonte)."""
+    previsoes = np.empty((len(coeficientes), horizonte))
+    anterior = np.nan_to_num(ultimo_valor / escala)
+    for h in range(1, horizonte + 1):
+        atual = coeficientes[:, 0] + coeficientes[:, 1] * h + coeficientes[:, 2] * anterior
+        atual = np.maximum(atual, 0.0)
+        previsoes[:, h - 1] = atual
+        anterior = atual
+    return previsoes * escala[:, None]
+
+def _treinar(db):
+    linhas = (
+        db.query(SerieAnual.categoria, SerieAnual.chave, SerieAnual.nome, SerieAnual.raiz, SerieAnual.ano, SerieAnual.quantidade)
+        .filter(SerieAnual.tabela == "producao")
+        .all()
+    )
+    serie = pd.DataFrame(linhas, columns=["categoria", "chave", "nome", "raiz", "ano", "quantidade"])
+    if serie.empty:
+        return None
+
+    chaves, anos, y = montar_matriz(serie)
+    coeficientes, escala = ajustar_em_lote(y, anos)
+    ultimo_valor = pd.DataFrame(y).ffill(axis=1).to_numpy()[:, -1]
+    info = serie.drop_duplicates(["categoria", "chave"], keep="last").set_index(["categoria", "chave"]).loc[chaves]
+    return {
+        "chaves": chaves,
+        "nomes": info["nome"].to_numpy(),
+        "raiz": info["raiz"].to_numpy() == 1,
+        "ano_inicial": int(anos[max(0, len(anos) - JANELA_AJUSTE)]),
+        "ultimo_ano": int(anos[-1]),
+        "previsoes": prever_em_lote(coeficientes, escala, ultimo_valor, HORIZONTE_MAXIMO),
+    }
+
+def obter_modelo(db):
+    """
+    Modelo de previsão da produção, ajustado uma única vez por versão dos dados: enquanto
+    nenhuma ingestão alterar a tabela de produção, as previsões pré-calculadas são reaproveitadas.
+    """
+    versao = versao_dados(db, "producao")
+    with _trava_cache:
+        if _cache.get("versao") != versao:
+            _cache["modelo"] = _treinar(db)
+            _cache["versao"] = versao
+        return versao, _cache["modelo"]
@@ -0,0 +1,272 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as upsert
+from app.database import engine
+from app.models import AlteracaoDados, MetricaComercio, NoArvore, ResumoAnual, SerieAnual, ResumoSerie, TotalArvore, VersaoDados
+from app.persistencia import ESQUEMAS, alteracoes_desde, trava_escrita
+from app.consultas import TABELAS
+from app.cache_respostas import cache as cache_respostas
+
+# Subitens da hierarquia da Embrapa têm o control prefixado (ex: vm_Tinto, ti_Merlot);
+# somar tudo contaria o mesmo volume duas vezes (item de primeiro nível + subitens).
+PADRAO_SUBITEM = r"^[a-z]{2}_"
+
+# Conjuntos cruzados por (categoria, país, ano) nas métricas de comércio exterior
+TABELAS_COMERCIO = ("importacao", "exportacao")
+
+def _carregar(conn, tabela: str, categorias=None) -> pd.DataFrame:
+    """
+    Lê a tabela de dados no formato (categoria, chave, nome, raiz, ano, quantidade, valor_usd),
+    com a coluna `control` nas tabelas de produtos/cultivares.
+    """
+    esquema = ESQUEMAS[tabela]
+    modelo = esquema["modelo"]
+    colunas = list(esquema["colunas"].values())
+    query = select(*[modelo.__table__.c[c] for c in colunas])
+    if categorias:
+        query = query.where(modelo.categoria.in_(categorias))
+    df = pd.read_sql(query, conn)
+
+    if "pais" in df.columns:
+        return pd.DataFrame({
+            "categoria": df["categoria"],
+            "chave": df["pais"],
+            "nome": df["pais"],
+            "raiz": 1,
+            "ano": df["ano"],
+            "quantidade": df["quantidade"],
+            "valor_usd": df["valor_usd"],
+        })
+
+    nome, quantidade = TABELAS[tabela]["filtro"], colunas[-1]  # produto/cultivar e a coluna de volume
+    control = df["control"].fillna("").astype(str)
+    return pd.DataFrame({
+        "categoria": df["categoria"],
+        "chave": df["id_original"].astype(str),
+        "nome": df[nome].astype(str).str.strip(),
+        "raiz": (~control.str.match(PADRAO_SUBITEM)).astype(int),
+        "ano": df["ano"],
+        "quantidade": df[quantidade],
+        "valor_usd": np.nan,
+        "control": df["control"],
+    })
+
+def _variacao(df: pd.DataFrame, coluna: str, grupos: list) -> pd.Series:
+    """Variação relativa em relação à linha anterior do mesmo grupo (df ordenado por ano)."""
+    anterior = df.groupby(grupos)[coluna].shift(1)
+    return ((df[coluna] - anterior) / anterior).where(anterior > 0)
+
+def calcular_resumos(df: pd.DataFrame):
+    """
+    Calcula, de forma vetorizada, as três tabelas materializadas:
+
+    - série anual por item (produto/cultivar/país) com a variação em relação ao ano anterior
+    - totais por categoria e ano (apenas itens de primeiro nível)
+    - resumo de cada série: acumulados, último ano e CAGR
+    """
+    serie = df.sort_values(["categoria", "chave", "ano"]).reset_index(drop=True)
+    serie["variacao_anual"] = _variacao(serie, "quantidade", ["categoria", "chave"])
+
+    anual = (
+        serie[serie["raiz"] == 1]
+        .groupby(["categoria", "ano"], as_index=False)
+        .agg(total=("quantidade", "sum"), valor_usd=("valor_usd", lambda v: v.sum(min_count=1)))
+    )
+    anual["variacao_anual"] = _variacao(anual, "total", ["categoria"])
+
+    chaves = ["categoria", "chave"]
+    totais = serie.groupby(chaves).agg(
+        quantidade_total=("quantidade", "sum"),
+        valor_total=("valor_usd", lambda v: v.sum(min_count=1)),
+    )
+    ultimos = serie.drop_duplicates(chaves, keep="last").set_index(chaves)[
+        ["nome", "ano", "quantidade", "variacao_anual"]
+    ].rename(columns={"ano": "ano_final", "quantidade": "quantidade_ultimo_ano", "variacao_anual": "variacao_ultimo_ano"})
+    primeiros = serie[serie["quantidade"] > 0].drop_duplicates(chaves).set_index(chaves)[
+        ["ano", "quantidade"]
+    ].rename(columns={"ano": "ano_inicial", "quantidade": "quantidade_inicial"})
+    resumo = ultimos.join(totais).join(primeiros).reset_index()
+    periodo = resumo["ano_final"] - resumo["ano_inicial"]
+    razao = resumo["quantidade_ultimo_ano"] / resumo["quantidade_inicial"]
+    resumo["cagr"] = (razao ** (1 / periodo) - 1).where(periodo > 0)
+    resumo = resumo.drop(columns=["quantidade_inicial"])
+
+    return anual, serie, resumo
+
+def calcular_arvore(df: pd.DataFrame):
+    """
+    Monta a árvore de itens de cada categoria e os totais de cada nó por ano.
+
+    - o subitem (control prefixado) pertence ao último item de primeiro nível que o antecede
+      no CSV (ordem do `id_original`): o prefixo sozinho não identifica o pai, já que se repete
+      entre itens (ex: vm_Tinto sob VINHO DE MESA e sob VINHO FINO DE MESA)
+    - o total de um item é o valor informado no CSV ou, na falta dele, a soma dos subitens; o da
+      categoria é a soma dos itens de primeiro nível, sem contar os subitens duas vezes
+    """
+    itens = df.drop_duplicates(["categoria", "chave"], keep="last").copy()
+    itens = itens.assign(ordem=itens["chave"].astype(int)).sort_values(["categoria", "ordem"])
+    item_anterior = itens["chave"].where(itens["raiz"] == 1).groupby(itens["categoria"]).ffill()
+    subitem = (itens["raiz"] == 0) & item_anterior.notna()
+    itens["pai"] = item_anterior.where(subitem, "")
+    itens["nivel"] = np.where(subitem, 2, 1)
+
+    nos = pd.concat([
+        pd.DataFrame({"categoria": itens["categoria"].unique(), "chave": "", "pai": None, "nivel": 0}).assign(
+            nome=lambda d: d["categoria"], control=None
+        ),
+        itens[["categoria", "chave", "pai", "nivel", "nome", "control"]],
+    ], ignore_index=True)
+    filhos = nos.groupby(["categoria", "pai"]).size().rename("filhos").rename_axis(["categoria", "chave"])
+    nos = nos.join(filhos, on=["categoria", "chave"]).fillna({"filhos": 0}).astype({"filhos": int})
+
+    valores = df[["categoria", "chave", "ano", "quantidade"]].merge(itens[["categoria", "chave", "pai", "nivel"]])
+    subitens = valores[valores["nivel"] == 2].assign(soma_filhos=np.nan, total=lambda d: d["quantidade"])
+    soma_subitens = (
+        subitens.groupby(["categoria", "pai", "ano"], as_index=False)["total"].sum()
+        .rename(columns={"pai": "chave", "total": "soma_filhos"})
+    )
+    primeiro_nivel = (
+        valores[valores["nivel"] == 1][["categoria", "chave", "ano", "quantidade"]]
+        .merge(soma_subitens, on=["categoria", "chave", "ano"], how="outer")
+        .assign(pai="")
+    )
+    primeiro_nivel["total"] = primeiro_nivel["quantidade"].fillna(primeiro_nivel["soma_filhos"])
+    categorias = (
+        primeiro_nivel.groupby(["categoria", "ano"], as_index=False)["total"].sum()
+        .assign(chave="", pai=None, quantidade=np.nan, soma_filhos=lambda d: d["total"])
+    )
+
+    colunas = ["categoria", "chave", "pai", "ano", "quantidade", "soma_filhos", "total"]
+    totais = pd.concat([categorias[colunas], primeiro_nivel[colunas], subitens[colunas]], ignore_index=True)
+    return nos, totais
+
+def _razao(numerador: pd.Series, denominador: pd.Series) -> pd.Series:
+    return (numerador / denominador).where(denominador > 0)
+
+def calcular_metricas_comercio(importacao: pd.DataFrame, exportacao: pd.DataFrame) -> pd.DataFrame:
+    """
+    Junta importação e exportação por (categoria, país, ano) e calcula, de forma vetorizada:
+
+    - preço médio (US$ por unidade de quantidade) e saldo comercial (exportação - importação)
+    - participação do país na quantidade da categoria no ano
+    - média móvel da quantidade, preço médio e CAGR dos 5 anos até o ano; nulos quando
+      a série do país não tem os 5 anos seguidos
+
+    Cada categoria ganha também uma linha por ano com país "" e os totais de todos os países.
+    """
+    chaves = ["categoria", "pais", "ano"]
+    fluxos = [
+        df.rename(columns={"chave": "pais", "quantidade": f"quantidade_{fluxo}", "valor_usd": f"valor_{fluxo}"})
+        .set_index(chaves)[[f"quantidade_{fluxo}", f"valor_{fluxo}"]]
+        for fluxo, df in zip(TABELAS_COMERCIO, (importacao, exportacao))
+    ]
+    paises = fluxos[0].join(fluxos[1], how="outer").reset_index()
+    volumes = [c for f in fluxos for c in f.columns]
+    totais = paises.groupby(["categoria", "ano"], as_index=False)[volumes].sum(min_count=1).assign(pais="")
+    m = pd.concat([totais, paises], ignore_index=True).sort_values(chaves, ignore_index=True)
+
+    grupos = m.groupby(["categoria", "pais"])
+    soma_5_anos = grupos[volumes].rolling(5, min_periods=5).sum().reset_index(level=[0, 1], drop=True)
+    seguidos = m["ano"] - grupos["ano"].shift(4) == 4
+    do_ano = m[["categoria", "ano"]].merge(totais, how="left")  # totais da categoria em cada linha
+    for fluxo in TABELAS_COMERCIO:
+        quantidade, valor = f"quantidade_{fluxo}", f"valor_{fluxo}"
+        m[f"preco_{fluxo}"] = _razao(m[valor], m[quantidade])
+        m[f"participacao_{fluxo}"] = _razao(m[quantidade], do_ano[quantidade])
+        m[f"media_5_anos_{fluxo}"] = (soma_5_anos[quantidade] / 5).where(seguidos)
+        m[f"preco_5_anos_{fluxo}"] = _razao(soma_5_anos[valor], soma_5_anos[quantidade]).where(seguidos)
+        inicial = grupos[quantidade].shift(5).where(m["ano"] - grupos["ano"].shift(5) == 5)
+        m[f"cagr_5_anos_{fluxo}"] = (_razao(m[quantidade], inicial) ** (1 / 5) - 1).where(inicial > 0)
+    m["saldo_usd"] = m["valor_exportacao"].fillna(0) - m["valor_importacao"].fillna(0)
+    m["saldo_quantidade"] = m["quantidade_exportacao"].fillna(0) - m["quantidade_importacao"].fillna(0)
+    return m
+
+def _registros(df: pd.DataFrame, tabela: str = None) -> list:
+    df = df.replace([np.inf, -np.inf], np.nan)
+    if tabela is not None:
+        df = df.assign(tabela=tabela)
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+def _incrementar_versao(conn, tabela: str):
+    agora = datetime.utcnow()
+    stmt = upsert(VersaoDados).values(tabela=tabela, versao=1, atualizado_em=agora)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=["tabela"],
+        set_={"versao": VersaoDados.versao + 1, "atualizado_em": agora},
+    ))
+
+def _marcar_consumidas(conn, tabela: str, ultimo_id: int = None):
+    """Registra até qual `id` de `alteracoes_dados` os resumos da tabela estão em dia (padrão: o maior registrado)."""
+    if ultimo_id is None:
+        consulta = select(func.max(AlteracaoDados.id)).where(AlteracaoDados.tabela == tabela)
+        ultimo_id = conn.execute(consulta).scalar() or 0
+    stmt = upsert(VersaoDados).values(tabela=tabela, versao=0, ultima_alteracao=ultimo_id)
+    conn.execute(stmt.on_conflict_do_update(index_elements=["tabela"], set_={"ultima_alteracao": ultimo_id}))
+
+def versao_dados(db, tabela: str) -> int:
+    """Versão atual dos dados de uma tabela, usada como chave de caches derivados."""
+    versao = db.query(VersaoDados.versao).filter(VersaoDados.tabela == tabela).scalar()
+    return versao or 0
+
+def _gravar_resumos(conn, tabela: str, categorias=None):
+    df = _carregar(conn, tabela, categorias)
+    anual, serie, resumo = calcular_resumos(df)
+    materializadas = [(ResumoAnual, anual), (SerieAnual, serie), (ResumoSerie, resumo)]
+    if "control" in df.columns:
+        materializadas += zip((NoArvore, TotalArvore), calcular_arvore(df))
+    for modelo, dados in materializadas:
+        remocao = delete(modelo).where(modelo.tabela == tabela)
+        if categorias:
+            remocao = remocao.where(modelo.categoria.in_(categorias))
+        conn.execute(remocao)
+        colunas = [c.name for c in modelo.__table__.columns if c.name != "id"]
+        registros = _registros(dados[[c for c in colunas if c != "tabela"]], tabela)
+        if registros:
+            conn.execute(insert(modelo), registros)
+    _incrementar_versao(conn, tabela)
+
+def _gravar_metricas_comercio(conn, categorias=None):
+    metricas = calcular_metricas_comercio(
+        _carregar(conn, "importacao", categorias), _carregar(conn, "exportacao", categorias)
+    )
+    remocao = delete(MetricaComercio)
+    if categorias:
+        remocao = remocao.where(MetricaComercio.categoria.in_(categorias))
+    conn.execute(remocao)
+    colunas = [c.name for c in MetricaComercio.__table__.columns if c.name != "id"]
+    registros = _registros(metricas[colunas])
+    if registros:
+        conn.execute(insert(MetricaComercio), registros)
+
+def atualizar_resumos_pendentes(tabela: str, bind=None) -> list:
+    """
+    Recalcula as fatias das categorias com alterações em `alteracoes_dados` ainda não refletidas
+    nos resumos (após `VersaoDados.ultima_alteracao`) e avança essa marca na mesma transação.
+    Alterações gravadas por uma ingestão que falhou antes de atualizar os resumos são
+    recuperadas na seguinte. Retorna as categorias recalculadas.
+    """
+    with trava_escrita, (bind or engine).begin() as conn:
+        consulta = select(VersaoDados.ultima_alteracao).where(VersaoDados.tabela == tabela)
+        alteracoes = alteracoes_desde(conn, tabela, conn.execute(consulta).scalar() or 0)
+        if alteracoes.empty:
+            return []
+        categorias = sorted(alteracoes["categoria"].unique().tolist())
+        _gravar_resumos(conn, tabela, categorias)
+        if tabela in TABELAS_COMERCIO:
+            _gravar_metricas_comercio(conn, categorias)
+        _marcar_consumidas(conn, tabela, int(alteracoes["id"].max()))
+    cache_respostas.invalidar()
+    return categorias
+
+def reconstruir_resumos(conn):
+    for tabela in ESQUEMAS:
+        _gravar_resumos(conn, tabela)
+        _marcar_consumidas(conn, tabela)
+    _gravar_metricas_comercio(conn)
+
+if __name__ == "__main__":
+    # Uso: python -m app.resumos  (recalcula todas as tabelas materializadas)
+    with engine.begin() as conn:
+        reconstruir_resumos(conn)
@@ -1,77 +1,162 @@
-from fastapi import APIRouter, Depends
-from app.scraper import fetch_dados_embrapa
-from app.scraper_import_export import fetch_dados_import_export
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.agendador import agendador
+from app.colunar import copia as copia_colunar
+from app.database import get_db_async
+from app.consultas import consultar_tabela_async
+from app.cache_respostas import responder_com_cache_async
+from app.metricas import registrar_etapa
 from app.auth import router as auth_router
 from app.auth_token import get_current_user
 from app.analytics import router as analytics_router
+from app.admin import router as admin_router
+from app.exportar import router as exportar_router
+from app.agregacoes import router as agregacoes_router
+from app.metricas import router as metricas_router
 
 
 router = APIRouter()
 
-# Endpoints protegidos por JWT
-@router.get("/producao", summary="Extrai dados de produção")
-def producao(usuario: str = Depends(get_current_user)):
+async def _consultar(db: AsyncSession, tipo: str, ano, filtro, limite: int, offset: int, categoria):
+    # Da cópia colunar em memória quando carregada (lifespan da API); senão, do banco
+    resultado = copia_colunar.consultar(tipo, ano, filtro, limite, offset, categoria)
+    if resultado is not None:
+        registrar_etapa("origem", descricao="memoria")
+        return resultado
+    registrar_etapa("origem", descricao="banco")
+    return await consultar_tabela_async(db, tipo, ano, filtro, limite, offset, categoria)
+
+# Endpoints protegidos por JWT; assíncronos, para que as leituras não ocupem o pool de threads
+@router.get("/producao", summary="Consulta dados de produção")
+async def producao(
+    request: Request,
+    ano: Optional[int] = Query(None, ge=1970, le=2100),
+    produto: Optional[str] = None,
+    categoria: Optional[str] = None,
+    limite: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db_async),
+    usuario: str = Depends(get_current_user),
+):
     """
-    Extrai os dados históricos de produção vitivinícola do Brasil diretamente do site da Embrapa.
+    Consulta os dados históricos de produção vitivinícola do Brasil já persistidos na base.
 
-    - Realiza scraping do arquivo mais recente disponível.
-    - Persiste os dados no banco SQLite, evitando duplicações.
-    - Retorna os 100 primeiros registros processados como exemplo.
+    - Os dados são carregados do site da Embrapa pela ingestão (`/admin/atualizar`), e não a cada chamada.
+    - Permite filtrar por `ano`, `produto` e `categoria` (arquivo de origem, ex: `geral`).
+    - Resultados paginados com `limite` e `offset`.
 
     🔒 Este endpoint requer autenticação via token JWT.
     """
-    return fetch_dados_embrapa("producao")
-
-@router.get("/comercializacao", summary="Extrai dados de comercialização")
-def comercializacao(usuario: str = Depends(get_current_user)):
+    agendador.revalidar_se_desatualizado("producao")
+    return await responder_com_cache_async(
+        request, lambda: _consultar(db, "producao", ano, produto, limite, offset, categoria)
+    )
+
+@router.get("/comercializacao", summary="Consulta dados de comercialização")
+async def comercializacao(
+    request: Request,
+    ano: Optional[int] = Query(None, ge=1970, le=2100),
+    produto: Optional[str] = None,
+    categoria: Optional[str] = None,
+    limite: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db_async),
+    usuario: str = Depends(get_current_user),
+):
     """
     Retorna dados de comercialização de uvas e derivados no Brasil, conforme publicações da Embrapa.
 
     - Inclui histórico de volumes por produto e ano.
-    - Evita duplicidade na base de dados.
-    - Retorna amostra com até 100 registros.
+    - Permite filtrar por `ano`, `produto` e `categoria` (arquivo de origem, ex: `geral`).
+    - Resultados paginados com `limite` e `offset`.
 
     🔒 É necessário um token JWT válido para acessar este endpoint.
     """
-    return fetch_dados_embrapa("comercializacao")
-
-@router.get("/processamento", summary="Extrai dados de processamento")
-def processamento(usuario: str = Depends(get_current_user)):
+    agendador.revalidar_se_desatualizado("comercializacao")
+    return await responder_com_cache_async(
+        request, lambda: _consultar(db, "comercializacao", ano, produto, limite, offset, categoria)
+    )
+
+@router.get("/processamento", summary="Consulta dados de processamento")
+async def processamento(
+    request: Request,
+    ano: Optional[int] = Query(None, ge=1970, le=2100),
+    cultivar: Optional[str] = None,
+    categoria: Optional[str] = None,
+    limite: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db_async),
+    usuario: str = Depends(get_current_user),
+):
     """
     Consulta os dados de processamento de uvas por cultivar no Brasil, extraídos da base da Embrapa.
 
-    - O sistema coleta o arquivo `ProcessaViniferas.csv` e transforma em estrutura relacional.
     - Cada linha representa o volume processado por ano e variedade.
+    - Permite filtrar por `ano`, `cultivar` e `categoria` (arquivo de origem, ex: `uvas_de_mesa`).
+    - Resultados paginados com `limite` e `offset`.
 
     🔒 Acesso restrito a usuários autenticados com token JWT.
     """
-    return fetch_dados_embrapa("processamento")
-
-@router.get("/importacao", summary="Extrai dados de importação")
-def importacao(usuario: str = Depends(get_current_user)):
+    agendador.revalidar_se_desatualizado("processamento")
+    return await responder_com_cache_async(
+        request, lambda: _consultar(db, "processamento", ano, cultivar, limite, offset, categoria)
+    )
+
+@router.get("/importacao", summary="Consulta dados de importação")
+async def importacao(
+    request: Request,
+    ano: Optional[int] = Query(None, ge=1970, le=2100),
+    pais: Optional[str] = None,
+    categoria: Optional[str] = None,
+    limite: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db_async),
+    usuario: str = Depends(get_current_user),
+):
     """
     Apresenta os dados de importação de vinhos por país e por ano, conforme informações da Embrapa.
 
     - Inclui quantidade e valor em dólares por país.
-    - Realiza parsing de arquivos com colunas duplicadas por ano.
-    - Persistência controlada por `pais` e `ano`.
+    - Permite filtrar por `ano`, `pais` e `categoria` (arquivo de origem, ex: `espumantes`).
+    - Resultados paginados com `limite` e `offset`.
 
     🔒 Necessário fornecer token JWT no cabeçalho da requisição.
     """
-    return fetch_dados_import_export("importacao")
-
-@router.get("/exportacao", summary="Extrai dados de exportação")
-def exportacao(usuario: str = Depends(get_current_user)):
+    agendador.revalidar_se_desatualizado("importacao")
+    return await responder_com_cache_async(
+        request, lambda: _consultar(db, "importacao", ano, pais, limite, offset, categoria)
+    )
+
+@router.get("/exportacao", summary="Consulta dados de exportação")
+async def exportacao(
+    request: Request,
+    ano: Optional[int] = Query(None, ge=1970, le=2100),
+    pais: Optional[str] = None,
+    categoria: Optional[str] = None,
+    limite: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db_async),
+    usuario: str = Depends(get_current_user),
+):
     """
     Exibe os dados de exportação de vinhos por país, consolidados pela Embrapa ao longo dos anos.
 
-    - O endpoint carrega o arquivo `expvinho.csv` e trata valores em `quantidade` e `USD`.
-    - Cada país aparece com o respectivo volume exportado por ano.
+    - Cada país aparece com o respectivo volume exportado (`quantidade`) e valor (`valor_usd`) por ano.
+    - Permite filtrar por `ano`, `pais` e `categoria` (arquivo de origem, ex: `espumantes`).
+    - Resultados paginados com `limite` e `offset`.
 
     🔒 Este endpoint só pode ser acessado por usuários autenticados com JWT.
     """
-    return fetch_dados_import_export("exportacao")
+    agendador.revalidar_se_desatualizado("exportacao")
+    return await responder_com_cache_async(
+        request, lambda: _consultar(db, "exportacao", ano, pais, limite, offset, categoria)
+    )
 
 # Rotas abertas relacionadas à autenticação
 router.include_router(auth_router)
 router.include_router(analytics_router, prefix="/analytics")
+router.include_router(admin_router)
+router.include_router(exportar_router)
+router.include_router(agregacoes_router)
+router.include_router(metricas_router)
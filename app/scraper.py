@@ -1,15 +1,14 @@
 
-import requests
-from bs4 import BeautifulSoup
+import logging
 import pandas as pd
 import numpy as np
-from io import StringIO
-from sqlalchemy.exc import IntegrityError
-from app.database import SessionLocal
-from app.models import Producao, Processamento, Comercializacao
-from unidecode import unidecode
+from app.persistencia import gravar_incremental
+from app.cache_download import baixar, ja_ingerido, marcar_ingerido
+from app.catalogo import descobrir_arquivos, ler_csv, repetir_coluna
+from app.metricas import medir_etapa_ingestao, registrar_gravacao
+
+logger = logging.getLogger(__name__)
 
-DOWNLOAD_BASE = "http://vitibrasil.cnpuv.embrapa.br/"
 ABAS = {
     "producao": "opt_02",
     "processamento": "opt_03",
@@ -22,131 +21,102 @@ TIPOS_PALAVRAS = {
     "processamento": ["processa"]
 }
 
-def fetch_dados_embrapa(tipo: str):
+def clean_json(data):
+    for row in data:
+        for k, v in row.items():
+            if isinstance(v, float) and (np.isnan(v) or np.isinf(v)):
+                row[k] = None
+    return data
+
+def listar_arquivos(tipo: str):
+    return descobrir_arquivos(ABAS[tipo], TIPOS_PALAVRAS[tipo])
+
+def para_formato_longo(df: pd.DataFrame, tipo: str, nome_arquivo: str = "") -> pd.DataFrame:
+    """
+    Converte a tabela larga (uma coluna por ano) para o formato longo, com uma linha por item e ano,
+    com um reshape do NumPy: (itens x anos) -> (anos * itens). Valores ausentes, não numéricos ou
+    infinitos são descartados.
+    """
+    if tipo in ["producao", "comercializacao"]:
+        id_vars = ["id", "control"]
+        possiveis_colunas_produto = ["produto", "Produto"]
+
+        for col in possiveis_colunas_produto:
+            if col in df.columns:
+                id_vars.append(col)
+                break
+        else:
+            raise ValueError(f"Nenhuma coluna de produto encontrada no arquivo {nome_arquivo}.")
+
+    elif tipo == "processamento":
+        id_vars = ["id", "control", "cultivar"]
+
+    anos = [c for c in df.columns if c not in id_vars]
+    bloco = df[anos]
+    if all(pd.api.types.is_numeric_dtype(bloco[c]) for c in anos):
+        valores = bloco.to_numpy(dtype="float64")
+    else:
+        # Células com texto (ex: vazias ou "nd"): uma única conversão para a tabela inteira
+        valores = pd.to_numeric(pd.Series(bloco.to_numpy(dtype=object).ravel()), errors="coerce")
+        valores = valores.to_numpy(dtype="float64").reshape(bloco.shape)
+
+    # Mesma ordem do pd.melt: ano a ano, todos os itens de cada ano
+    quantidade = valores.T.ravel()
+    df_long = pd.DataFrame({
+        **{c: repetir_coluna(df[c], len(anos)) for c in id_vars},
+        "ano": np.repeat(np.array([int(a) for a in anos]), len(df)),
+        "quantidade": quantidade,
+    })
+    return df_long[np.isfinite(quantidade)].reset_index(drop=True)
+
+def processar_arquivo(tipo: str, arquivo: dict, forcar: bool = False, execucao_id=None):
+    """
+    Baixa um CSV da aba, transforma para o formato longo (uma linha por item e ano)
+    e grava no banco marcando as linhas com a `categoria` do arquivo.
+    """
+    resultado = dict(arquivo)
+    with medir_etapa_ingestao(tipo, "download"):
+        download = baixar(arquivo["url_download"])
+    if not forcar and ja_ingerido(arquivo["url_download"], download["sha256"]):
+        # CSV idêntico ao da última ingestão: nada a processar nem gravar
+        return {**resultado, "inalterado": True, "registros": []}
+
+    with medir_etapa_ingestao(tipo, "leitura"):
+        df = ler_csv(download["conteudo"])
+    with medir_etapa_ingestao(tipo, "formato_longo"):
+        df = para_formato_longo(df, tipo, arquivo["arquivo"])
+    df["categoria"] = arquivo["categoria"]
+    with medir_etapa_ingestao(tipo, "gravacao"):
+        gravacao = salvar_generico(df, tipo, execucao_id)
+    registrar_gravacao(tipo, gravacao)
+
+    marcar_ingerido(arquivo["url_download"], download["sha256"])
+    return {
+        **resultado,
+        "inalterado": False,
+        "gravacao": gravacao,
+        "registros": clean_json(df.head(100).to_dict(orient="records"))
+    }
+
+def fetch_dados_embrapa(tipo: str, forcar: bool = False):
     try:
         if tipo not in ABAS:
             return {"erro": f"Tipo '{tipo}' inválido. Opções disponíveis: {list(ABAS.keys())}"}
 
-        url = f"{DOWNLOAD_BASE}index.php?opcao={ABAS[tipo]}"
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, "html.parser")
-        links = soup.find_all("a", href=True)
-
-        matches = []
-        for link in links:
-            texto = unidecode(link.text.lower())
-            href = unidecode(link["href"].lower())
-            if ".csv" in href:
-                for palavra in TIPOS_PALAVRAS[tipo]:
-                    if palavra in texto or palavra in href:
-                        matches.append(link)
-
-        if not matches:
+        arquivos = listar_arquivos(tipo)
+        if not arquivos:
             return {"erro": f"Nenhum arquivo .csv compatível encontrado para {tipo}"}
 
-        arquivo = matches[0]
-        url_download = DOWNLOAD_BASE + arquivo["href"]
-        file_response = requests.get(url_download)
-        df = pd.read_csv(StringIO(file_response.content.decode("latin1")), sep=";")
-        df.columns = [col.strip() for col in df.columns]
-
-        if tipo in ["producao", "comercializacao"]:
-            id_vars = ["id", "control"]
-            possiveis_colunas_produto = ["produto", "Produto"]
-
-            for col in possiveis_colunas_produto:
-                if col in df.columns:
-                    id_vars.append(col)
-                    break
-            else:
-                return {"erro": "Nenhuma coluna de produto encontrada no arquivo."}
-
-            df = pd.melt(df, id_vars=id_vars, var_name="ano", value_name="quantidade")
-            df["quantidade"] = pd.to_numeric(df["quantidade"], errors="coerce")
-            df = df.replace([np.inf, -np.inf], np.nan)
-            df = df.dropna(subset=["quantidade"])
-            df["ano"] = df["ano"].astype(int)
-            salvar_generico(df, tipo)
-
-        elif tipo == "processamento":
-            df = pd.melt(
-                df,
-                id_vars=["id", "control", "cultivar"],
-                var_name="ano",
-                value_name="quantidade"
-            )
-            df["quantidade"] = pd.to_numeric(df["quantidade"], errors="coerce")
-            df = df.replace([np.inf, -np.inf], np.nan)
-            df = df.dropna(subset=["quantidade"])
-            df["ano"] = df["ano"].astype(int)
-            salvar_generico(df, tipo)
-
-        registros = df.head(100).to_dict(orient="records")
-        def clean_json(data):
-            for row in data:
-                for k, v in row.items():
-                    if isinstance(v, float) and (np.isnan(v) or np.isinf(v)):
-                        row[k] = None
-            return data
-
+        resultados = [processar_arquivo(tipo, arquivo, forcar) for arquivo in arquivos]
+        registros = [r for resultado in resultados for r in resultado.pop("registros")]
         return {
-            "arquivo": arquivo.text.strip(),
-            "url_download": url_download,
-            "registros": clean_json(registros)
+            "arquivos": resultados,
+            "registros": registros[:100]
         }
 
     except Exception as e:
+        logger.exception("Falha ao buscar os dados de %s", tipo)
         return {"erro": str(e)}
 
-def salvar_generico(df: pd.DataFrame, tipo: str):
-    session = SessionLocal()
-    for _, row in df.iterrows():
-        try:
-            ano = int(row.get("ano", 0))
-            id_original = int(row.get("id", 0))
-            control = str(row.get("control", ""))
-
-            if tipo == "producao":
-                exists = session.query(Producao).filter_by(id_original=id_original, ano=ano).first()
-                if not exists:
-                    registro = Producao(
-                        id_original=id_original,
-                        control=control,
-                        produto=str(row.get("produto", row.get("Produto", ""))),
-                        ano=ano,
-                        producao_toneladas=float(row.get("quantidade", 0.0))
-                    )
-                    session.add(registro)
-
-            elif tipo == "comercializacao":
-                exists = session.query(Comercializacao).filter_by(id_original=id_original, ano=ano).first()
-                if not exists:
-                    registro = Comercializacao(
-                        id_original=id_original,
-                        control=control,
-                        produto=str(row.get("produto", row.get("Produto", ""))),
-                        ano=ano,
-                        volume_comercializado=float(row.get("quantidade", 0.0))
-                    )
-                    session.add(registro)
-
-            elif tipo == "processamento":
-                exists = session.query(Processamento).filter_by(id_original=id_original, ano=ano).first()
-                if not exists:
-                    registro = Processamento(
-                        id_original=id_original,
-                        control=control,
-                        cultivar=str(row.get("cultivar", "")),
-                        ano=ano,
-                        volume_processado_litros=float(row.get("quantidade", 0.0))
-                    )
-                    session.add(registro)
-
-        except Exception:
-            continue
-    try:
-        session.commit()
-    except IntegrityError:
-        session.rollback()
-    finally:
-        session.close()
+def salvar_generico(df: pd.DataFrame, tipo: str, execucao_id=None):
+    return gravar_incremental(df, tipo, execucao_id=execucao_id)
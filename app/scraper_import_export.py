@@ -1,112 +1,109 @@
-
-import requests
-from bs4 import BeautifulSoup
+import logging
+import numpy as np
 import pandas as pd
-from io import StringIO
-from sqlalchemy.exc import IntegrityError
-from app.database import SessionLocal
-from app.models import Importacao, Exportacao
-from unidecode import unidecode
-
-DOWNLOAD_BASE = "http://vitibrasil.cnpuv.embrapa.br/"
-ARQUIVOS_ESPECIAIS = {
-    "importacao": "ImpVinhos.csv",
-    "exportacao": "expvinho.csv"
-}
+from app.persistencia import gravar_incremental
+from app.cache_download import baixar, ja_ingerido, marcar_ingerido
+from app.catalogo import descobrir_arquivos, ler_csv, repetir_coluna
+from app.metricas import medir_etapa_ingestao, registrar_gravacao
+
+logger = logging.getLogger(__name__)
+
 ABAS_ESPECIAIS = {
     "importacao": "opt_05",
     "exportacao": "opt_06"
 }
 
-def fetch_dados_import_export(tipo: str):
+# Prefixo dos arquivos de cada aba (ImpVinhos.csv, ImpEspumantes.csv, ExpVinho.csv, ExpSuco.csv...)
+PALAVRAS_ESPECIAIS = {
+    "importacao": ["imp"],
+    "exportacao": ["exp"]
+}
+
+def listar_arquivos(tipo: str):
+    return descobrir_arquivos(ABAS_ESPECIAIS[tipo], PALAVRAS_ESPECIAIS[tipo])
+
+def processar_arquivo(tipo: str, arquivo: dict, forcar: bool = False, execucao_id=None):
+    """
+    Baixa um CSV de importação/exportação, converte as colunas duplicadas por ano
+    para o formato longo e grava no banco marcando as linhas com a `categoria` do arquivo.
+    """
+    resultado = dict(arquivo)
+    with medir_etapa_ingestao(tipo, "download"):
+        download = baixar(arquivo["url_download"])
+    if not forcar and ja_ingerido(arquivo["url_download"], download["sha256"]):
+        # CSV idêntico ao da última ingestão: nada a processar nem gravar
+        return {**resultado, "inalterado": True, "registros": []}
+
+    with medir_etapa_ingestao(tipo, "leitura"):
+        df = ler_csv(download["conteudo"])
+    with medir_etapa_ingestao(tipo, "formato_longo"):
+        df_long = processar_tabela_ano_duplo(df)
+    df_long["categoria"] = arquivo["categoria"]
+    with medir_etapa_ingestao(tipo, "gravacao"):
+        gravacao = salvar_import_export(df_long, tipo, execucao_id)
+    registrar_gravacao(tipo, gravacao)
+
+    marcar_ingerido(arquivo["url_download"], download["sha256"])
+    return {
+        **resultado,
+        "inalterado": False,
+        "gravacao": gravacao,
+        "registros": df_long.head(100).to_dict(orient="records")
+    }
+
+def fetch_dados_import_export(tipo: str, forcar: bool = False):
     try:
         if tipo not in ABAS_ESPECIAIS:
             return {"erro": f"Tipo '{tipo}' inválido. Use 'importacao' ou 'exportacao'."}
 
-        url = f"{DOWNLOAD_BASE}index.php?opcao={ABAS_ESPECIAIS[tipo]}"
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        arquivo_desejado = ARQUIVOS_ESPECIAIS[tipo].lower()
-        links = soup.find_all("a", href=True)
-        arquivos = [link for link in links if arquivo_desejado in unidecode(link["href"].lower())]
-
+        arquivos = listar_arquivos(tipo)
         if not arquivos:
-            return {"erro": f"Arquivo {arquivo_desejado} não encontrado na página."}
-
-        url_download = DOWNLOAD_BASE + arquivos[0]["href"]
-        file_response = requests.get(url_download)
-
-        df = pd.read_csv(StringIO(file_response.content.decode("latin1")), sep="\t")
-        df.columns = [str(c).strip() for c in df.columns]
+            return {"erro": f"Nenhum arquivo .csv encontrado na página de {tipo}."}
 
-        registros = processar_tabela_ano_duplo(df, tipo)
+        resultados = [processar_arquivo(tipo, arquivo, forcar) for arquivo in arquivos]
+        registros = [r for resultado in resultados for r in resultado.pop("registros")]
         return {
-            "arquivo": arquivos[0].text.strip(),
-            "url_download": url_download,
+            "arquivos": resultados,
             "registros": registros[:100]
         }
 
     except Exception as e:
+        logger.exception("Falha ao buscar os dados de %s", tipo)
         return {"erro": str(e)}
 
-def processar_tabela_ano_duplo(df: pd.DataFrame, tipo: str):
-    try:
-        df_long = pd.DataFrame()
-        colunas = df.columns
-
-        for i in range(2, len(colunas), 2):
-            ano = colunas[i]
-            temp = pd.DataFrame({
-                "pais": df[colunas[1]],
-                "ano": int(ano),
-                "quantidade": pd.to_numeric(df[colunas[i]], errors="coerce"),
-                "valor_usd": pd.to_numeric(df[colunas[i + 1]], errors="coerce")
-            })
-            df_long = pd.concat([df_long, temp], ignore_index=True)
-
-        df_long = df_long.dropna(subset=["quantidade", "valor_usd"])
-        df_long = df_long.replace([float("inf"), float("-inf")], pd.NA)
-        df_long = df_long.dropna()
-        salvar_import_export(df_long, tipo)
-        return df_long.to_dict(orient="records")
-    except Exception as e:
-        return [{"erro": str(e)}]
-
-def salvar_import_export(df: pd.DataFrame, tipo: str):
-    session = SessionLocal()
-    for _, row in df.iterrows():
-        try:
-            pais = str(row.get("pais", "")).strip()
-            ano = int(row.get("ano", 0))
-
-            if tipo == "importacao":
-                exists = session.query(Importacao).filter_by(pais=pais, ano=ano).first()
-                if not exists:
-                    registro = Importacao(
-                        pais=pais,
-                        ano=ano,
-                        quantidade=float(row.get("quantidade", 0.0)),
-                        valor_usd=float(row.get("valor_usd", 0.0))
-                    )
-                    session.add(registro)
-
-            elif tipo == "exportacao":
-                exists = session.query(Exportacao).filter_by(pais=pais, ano=ano).first()
-                if not exists:
-                    registro = Exportacao(
-                        pais=pais,
-                        ano=ano,
-                        quantidade=float(row.get("quantidade", 0.0)),
-                        valor_usd=float(row.get("valor_usd", 0.0))
-                    )
-                    session.add(registro)
-
-        except Exception:
-            continue
-    try:
-        session.commit()
-    except IntegrityError:
-        session.rollback()
-    finally:
-        session.close()
+def processar_tabela_ano_duplo(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte a tabela com duas colunas por ano (quantidade e valor em US$) para o formato
+    longo, com uma linha por país e ano.
+
+    As colunas de cada ano vêm em pares, e o pandas renomeia a segunda ocorrência do cabeçalho
+    (`1970`, `1970.1`). Todos os pares são convertidos de uma vez com um reshape do NumPy:
+    (países x anos x 2) -> (anos * países, 2), na mesma ordem de antes (ano a ano).
+    """
+    colunas = df.columns[2:]
+    n_anos = len(colunas) // 2
+    colunas = colunas[:2 * n_anos]
+    anos = np.array([int(str(c).split(".")[0]) for c in colunas[::2]])
+
+    bloco = df[colunas]
+    # Só as colunas com texto (ex: células vazias ou "*") precisam de conversão
+    textuais = [c for c in colunas if not pd.api.types.is_numeric_dtype(bloco[c])]
+    if textuais:
+        bloco = bloco.copy()
+        for c in textuais:
+            bloco[c] = pd.to_numeric(bloco[c], errors="coerce")
+    valores = bloco.to_numpy(dtype="float64")
+    valores = valores.reshape(len(df), n_anos, 2).transpose(1, 0, 2).reshape(-1, 2)
+    paises = repetir_coluna(df[df.columns[1]], n_anos)
+
+    df_long = pd.DataFrame({
+        "pais": paises,
+        "ano": np.repeat(anos, len(df)),
+        "quantidade": valores[:, 0],
+        "valor_usd": valores[:, 1],
+    })
+    validos = np.isfinite(valores).all(axis=1) & pd.notna(paises)
+    return df_long[validos].reset_index(drop=True)
+
+def salvar_import_export(df: pd.DataFrame, tipo: str, execucao_id=None):
+    return gravar_incremental(df, tipo, execucao_id=execucao_id)
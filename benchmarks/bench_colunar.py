@@ -0,0 +1,82 @@
+"""
+Benchmark das consultas dos endpoints de dados: SQL pelo ORM (`consultar_tabela`) x cópia
+colunar em memória (`app.colunar`), sobre uma cópia do banco do projeto.
+
+Cada combinação de filtros (ano, filtro textual, categoria, paginação) é executada pelos dois
+caminhos; os resultados precisam ser idênticos.
+
+Uso: python -m benchmarks.bench_colunar [--banco dados_embrapa.db] [--repeticoes 5]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--banco", default="dados_embrapa.db")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    if not os.path.exists(args.banco):
+        sys.exit(f"banco não encontrado: {args.banco}")
+
+    # Trabalha numa cópia: o banco do projeto não é alterado (WAL, migrações)
+    copia_banco = os.path.join(tempfile.mkdtemp(), "bench_colunar.db")
+    shutil.copy(args.banco, copia_banco)
+    os.environ["DATABASE_URL"] = f"sqlite:///{copia_banco}"
+
+    from app.colunar import CopiaColunar
+    from app.consultas import TABELAS, consultar_tabela
+    from app.database import SessionLeitura
+    from app.migracoes import inicializar_banco
+
+    inicializar_banco()
+    copia = CopiaColunar()
+    inicio = time.perf_counter()
+    tracemalloc.start()
+    copia.recarregar(forcar=True)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"carga da cópia: {(time.perf_counter() - inicio) * 1000:.0f} ms, pico de {pico / 2**20:.1f} MiB")
+
+    print(f"{'':18} {'consultas':>9} {'µs SQL':>9} {'µs memória':>11} {'':>8}")
+    with SessionLeitura() as db:
+        for tipo, config in TABELAS.items():
+            tabela = copia._tabelas[tipo]
+            filtros = [v for v in tabela._distintos[config["filtro"]][:-1][:3]]
+            categorias = [v for v in tabela._distintos["categoria"][:-1][:2]]
+            anos = sorted({int(a) for a in tabela._valores["ano"]})
+            consultas = [
+                {},
+                {"offset": 500, "limite": 50},
+                {"ano": anos[-1]},
+                {"ano": anos[0], "limite": 1000},
+                {"ano": 1900},
+                {"filtro": "inexistente"},
+                *({"filtro": f} for f in filtros),
+                *({"categoria": c} for c in categorias),
+                *({"ano": anos[len(anos) // 2], "filtro": f, "categoria": c} for f in filtros for c in categorias),
+            ]
+
+            tempos_sql, tempos_memoria = [], []
+            for parametros in consultas:
+                parametros = {"limite": 100, "offset": 0, **parametros}
+                esperado = consultar_tabela(db, tipo, **parametros)
+                obtido = copia.consultar(tipo, **parametros)
+                assert obtido == esperado, f"{tipo} {parametros}: resultados diferentes"
+                for tempos, funcao in ((tempos_sql, lambda: consultar_tabela(db, tipo, **parametros)),
+                                       (tempos_memoria, lambda: copia.consultar(tipo, **parametros))):
+                    amostras = []
+                    for _ in range(args.repeticoes):
+                        t = time.perf_counter()
+                        funcao()
+                        amostras.append(time.perf_counter() - t)
+                    tempos.append(np.median(amostras))
+
+            sql, memoria = np.mean(tempos_sql) * 1e6, np.mean(tempos_memoria) * 1e6
+            print(f"{tipo:18} {len(consultas):>9} {sql:>9,.0f} {memoria:>11,.0f} {sql / memoria:>7.1f}x")
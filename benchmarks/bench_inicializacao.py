@@ -0,0 +1,108 @@
+"""
+Benchmark da subida da API: tempo de `import main` e tempo até a primeira resposta de um
+processo uvicorn novo (`GET /` e a primeira consulta de dados autenticada), como numa
+instância recém-criada pelo autoscaling.
+
+Cada rodada usa um processo Python novo; o banco de origem é copiado para um diretório
+temporário (nunca é alterado) e as migrações são aplicadas antes, para não entrarem na medida.
+
+Uso: python -m benchmarks.bench_inicializacao [--rodadas 5] [--banco dados_embrapa.db]
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Dependências pesadas que não precisam estar carregadas para a API responder
+PESADOS = ["pandas", "numpy", "requests", "pyarrow", "app.scraper", "app.resumos", "app.previsao"]
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def medir_import(ambiente: dict):
+    codigo = (
+        "import sys, time\n"
+        "inicio = time.perf_counter()\n"
+        "import main\n"
+        "print(time.perf_counter() - inicio)\n"
+        f"print(','.join(m for m in {PESADOS!r} if m in sys.modules))\n"
+    )
+    saida = subprocess.run([sys.executable, "-c", codigo], env=ambiente, cwd=RAIZ, capture_output=True, text=True, check=True)
+    segundos, carregados = saida.stdout.splitlines()
+    return float(segundos), carregados
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_resposta(url: str, cabecalhos: dict, limite: float = 60):
+    fim = time.perf_counter() + limite
+    while time.perf_counter() < fim:
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=cabecalhos), timeout=5) as resposta:
+                if resposta.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.005)
+    raise RuntimeError(f"sem resposta de {url}")
+
+
+def medir_primeira_resposta(ambiente: dict, token: str):
+    porta = porta_livre()
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta), "--log-level", "warning"],
+        env=ambiente, cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        esperar_resposta(f"http://127.0.0.1:{porta}/", {})
+        raiz = time.perf_counter() - inicio
+        esperar_resposta(f"http://127.0.0.1:{porta}/producao?ano=2000", {"Authorization": f"Bearer {token}"})
+        consulta = time.perf_counter() - inicio
+    finally:
+        processo.terminate()
+        processo.wait()
+    return raiz, consulta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rodadas", type=int, default=5)
+    parser.add_argument("--banco", default="dados_embrapa.db", help="banco de origem (é copiado, nunca alterado)")
+    args = parser.parse_args()
+
+    # Antes de importar o app: o banco usado é sempre uma cópia temporária
+    banco = os.path.join(tempfile.mkdtemp(), "bench_inicializacao.db")
+    shutil.copy(args.banco, banco)
+    os.environ["DATABASE_URL"] = f"sqlite:///{banco}"
+    os.environ["AGENDADOR_ATIVO"] = "0"
+    ambiente = {**os.environ, "PYTHONPATH": RAIZ}
+
+    from app.migracoes import inicializar_banco
+    from app.utils import create_access_token
+
+    inicializar_banco()
+    token = create_access_token({"sub": "inicializacao"})
+
+    imports, raizes, consultas = [], [], []
+    for _ in range(args.rodadas):
+        segundos, carregados = medir_import(ambiente)
+        imports.append(segundos)
+        raiz, consulta = medir_primeira_resposta(ambiente, token)
+        raizes.append(raiz)
+        consultas.append(consulta)
+
+    print(f"mediana de {args.rodadas} rodadas, processo novo a cada uma")
+    print(f"{'import main':32} {statistics.median(imports) * 1000:8.0f} ms")
+    print(f"{'primeira resposta (GET /)':32} {statistics.median(raizes) * 1000:8.0f} ms")
+    print(f"{'primeira consulta (/producao)':32} {statistics.median(consultas) * 1000:8.0f} ms")
+    print(f"carregados após o import: {carregados or 'nenhum'} (de {', '.join(PESADOS)})")
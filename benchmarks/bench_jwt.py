@@ -0,0 +1,68 @@
+"""
+Benchmark da autenticação: requisições/s num endpoint protegido por JWT, verificando o token
+a cada requisição (python-jose) x com o cache de tokens verificados de `get_current_user`.
+
+Uso: python -m benchmarks.bench_jwt [--requisicoes 3000] [--tokens 200]
+"""
+import argparse
+import time
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth_token import _tokens_verificados, _verificar_com_cache, get_current_user
+from app.config import settings
+from app.utils import create_access_token
+
+
+def criar_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/protegido")
+    def protegido(usuario: str = Depends(get_current_user)):
+        return {"usuario": usuario}
+
+    return app
+
+
+def medir(cliente: TestClient, cabecalhos: list, requisicoes: int) -> float:
+    inicio = time.perf_counter()
+    for i in range(requisicoes):
+        resposta = cliente.get("/protegido", headers=cabecalhos[i % len(cabecalhos)])
+        assert resposta.status_code == 200
+    return requisicoes / (time.perf_counter() - inicio)
+
+
+def medir_verificacao(tokens: list, chamadas: int) -> float:
+    inicio = time.perf_counter()
+    for i in range(chamadas):
+        _verificar_com_cache(tokens[i % len(tokens)])
+    return chamadas / (time.perf_counter() - inicio)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requisicoes", type=int, default=3000)
+    parser.add_argument("--tokens", type=int, default=200)
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": f"usuario_{i}"}) for i in range(args.tokens)]
+    cabecalhos = [{"Authorization": f"Bearer {t}"} for t in tokens]
+    cliente = TestClient(criar_app())
+    tamanho = settings.TOKENS_CACHE_TAMANHO
+
+    resultados = {}
+    for nome, tamanho_cache in (("sem cache", 0), ("com cache", tamanho)):
+        settings.TOKENS_CACHE_TAMANHO = tamanho_cache
+        _tokens_verificados.clear()
+        medir(cliente, cabecalhos, len(tokens))  # aquecimento (e preenchimento do cache)
+        resultados[nome] = (
+            medir(cliente, cabecalhos, args.requisicoes),
+            medir_verificacao(tokens, args.requisicoes * 10),
+        )
+
+    print(f"{args.requisicoes} requisições, {args.tokens} tokens distintos (cache de {tamanho})")
+    for nome, (http, verificacao) in resultados.items():
+        print(f"{nome:10}: {http:8.0f} req/s no endpoint | {verificacao:10.0f} verificações/s")
+    base = resultados["sem cache"]
+    print(f"ganho     : {resultados['com cache'][0] / base[0]:.2f}x req/s | {resultados['com cache'][1] / base[1]:.1f}x verificações/s")
@@ -0,0 +1,199 @@
+"""
+Benchmark da leitura na ingestão, por conjunto de dados: tempo e pico de memória (tracemalloc)
+da implementação anterior x leitura enxuta.
+
+- páginas de listagem: BeautifulSoup com `html.parser` + unidecode por link x extrator de links
+  em uma passada (`html.parser.HTMLParser`, sem montar a árvore)
+- CSVs: `.decode("latin1")` + `StringIO` + melt sobre a tabela inteira x `read_csv` direto dos
+  bytes, colunas de texto categóricas e reshape do NumPy com uma única conversão numérica
+
+Por padrão usa arquivos sintéticos com o formato dos da Embrapa; com `--cache`, usa os CSVs
+reais já baixados no cache da ingestão (`CACHE_DOWNLOAD_DIR`).
+
+A comparação com a implementação anterior requer `beautifulsoup4` e `unidecode`, que a API não usa mais.
+
+Uso: python -m benchmarks.bench_parsing [--repeticoes 20] [--cache ./.cache_embrapa]
+"""
+import argparse
+import glob
+import json
+import os
+import time
+import tracemalloc
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+from app.catalogo import _ExtratorLinks, decodificar, ler_csv
+from app.scraper import para_formato_longo
+from app.scraper_import_export import processar_tabela_ano_duplo
+
+ANOS = range(1970, 2024)
+PAISES = ["Alemanha", "África do Sul", "Bélgica", "Canadá", "Espanha", "Estados Unidos", "Japão", "México", "Paraguai", "Reino Unido"]
+CULTIVARES = ["Isabel", "Bordô", "Niágara Branca", "Cabernet Sauvignon", "Moscato Giallo", "Máximo", "Concord"]
+
+
+def gerar_larga(itens: int, coluna: str, nomes: list, rng) -> bytes:
+    linhas = [";".join(["id", "control", coluna, *map(str, ANOS)])]
+    for i in range(itens):
+        nome = f"{nomes[i % len(nomes)]} {i}"
+        valores = rng.integers(0, 10**8, len(ANOS)).astype(str)
+        valores[rng.random(len(ANOS)) < 0.02] = "nd"  # células não numéricas, como no arquivo real
+        linhas.append(";".join([str(i + 1), f"ti_{nome}" if i % 5 else nome.upper(), nome, *valores]))
+    return "\n".join(linhas).encode("utf-8")
+
+
+def gerar_ano_duplo(paises: int, rng) -> bytes:
+    linhas = ["\t".join(["Id", "País", *[str(a) for a in ANOS for _ in (0, 1)]])]
+    for i in range(paises):
+        valores = rng.integers(0, 10**6, 2 * len(ANOS)).astype(str)
+        valores[rng.random(2 * len(ANOS)) < 0.02] = ""
+        linhas.append("\t".join([str(i + 1), f"{PAISES[i % len(PAISES)]} {i}", *valores]))
+    return "\n".join(linhas).encode("utf-8")
+
+
+def gerar_pagina(links: int) -> bytes:
+    """Página de listagem com o formato da Embrapa: menu, botões de sub-aba, tabela de dados e o link do CSV."""
+    menu = "".join(f'<li><a href="index.php?opcao=opt_0{i % 7 + 1}">Aba número {i}</a></li>' for i in range(links))
+    botoes = "".join(f'<button type="submit" value="subopt_0{i}" name="subopcao" class="btn_sopt">Viníferas {i}</button>' for i in range(1, 6))
+    linhas = "".join(f'<tr><td class="tb_item">Produto {i}</td><td class="tb_item">{i * 1000:,}</td></tr>' for i in range(200))
+    return (
+        f'<html><head><meta charset="utf-8"><title>Banco de dados de uva, vinho e derivados</title></head><body>'
+        f'<ul class="menu">{menu}</ul><form>{botoes}</form><table class="tb_base tb_dados">{linhas}</table>'
+        f'<a href="download/Producao.csv" class="footer_content" target="_blank">DOWNLOAD</a></body></html>'
+    ).encode("utf-8")
+
+
+def links_antes(conteudo: bytes):
+    from bs4 import BeautifulSoup
+    from unidecode import unidecode
+
+    pagina = BeautifulSoup(conteudo, "html.parser")
+    subopcoes = [b["value"] for b in pagina.find_all("button", attrs={"name": "subopcao"}) if b.get("value")]
+    links = [(unidecode(a["href"].lower()), unidecode(a.text.lower())) for a in pagina.find_all("a", href=True)]
+    return subopcoes, [h for h, _ in links if ".csv" in h]
+
+
+def links_depois(conteudo: bytes):
+    extrator = _ExtratorLinks()
+    extrator.feed(decodificar(conteudo))
+    extrator.close()
+    return extrator.subopcoes, [h.lower() for h, _ in extrator.links if ".csv" in h.lower()]
+
+
+def ler_csv_antes(conteudo: bytes) -> pd.DataFrame:
+    texto = conteudo.decode("latin1")
+    cabecalho = texto.split("\n", 1)[0]
+    sep = "\t" if cabecalho.count("\t") > cabecalho.count(";") else ";"
+    df = pd.read_csv(StringIO(texto), sep=sep)
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def ano_duplo_antes(df: pd.DataFrame) -> pd.DataFrame:
+    colunas = df.columns[2:]
+    n_anos = len(colunas) // 2
+    colunas = colunas[:2 * n_anos]
+    anos = np.array([int(str(c).split(".")[0]) for c in colunas[::2]])
+    bloco = df[colunas].copy()
+    for c in [c for c in colunas if not pd.api.types.is_numeric_dtype(bloco[c])]:
+        bloco[c] = pd.to_numeric(bloco[c], errors="coerce")
+    valores = bloco.to_numpy(dtype="float64").reshape(len(df), n_anos, 2).transpose(1, 0, 2).reshape(-1, 2)
+    paises = np.tile(df[df.columns[1]].to_numpy(), n_anos)
+    df_long = pd.DataFrame({"pais": paises, "ano": np.repeat(anos, len(df)), "quantidade": valores[:, 0], "valor_usd": valores[:, 1]})
+    validos = np.isfinite(valores).all(axis=1) & pd.notna(paises)
+    return df_long[validos].reset_index(drop=True)
+
+
+def longo_antes(df: pd.DataFrame, tipo: str) -> pd.DataFrame:
+    if tipo in ("importacao", "exportacao"):
+        return ano_duplo_antes(df)
+    produto = "cultivar" if tipo == "processamento" else next(c for c in ("produto", "Produto") if c in df.columns)
+    id_vars = ["id", "control", produto]
+    df = pd.melt(df, id_vars=id_vars, var_name="ano", value_name="quantidade")
+    df["quantidade"] = pd.to_numeric(df["quantidade"], errors="coerce")
+    df = df.replace([np.inf, -np.inf], np.nan)
+    df = df.dropna(subset=["quantidade"])
+    df["ano"] = df["ano"].astype(int)
+    return df
+
+
+def longo_depois(df: pd.DataFrame, tipo: str) -> pd.DataFrame:
+    if tipo in ("importacao", "exportacao"):
+        return processar_tabela_ano_duplo(df)
+    return para_formato_longo(df, tipo)
+
+
+def medir(funcao, repeticoes: int):
+    """Mediana do tempo (ms) e pico de memória (KiB) de uma chamada."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, np.median(tempos) * 1000, pico / 1024
+
+
+def tipo_do_arquivo(nome: str):
+    nome = nome.lower()
+    for prefixo, tipo in (("producao", "producao"), ("comercio", "comercializacao"), ("processa", "processamento"), ("imp", "importacao"), ("exp", "exportacao")):
+        if nome.startswith(prefixo):
+            return tipo
+    return None
+
+
+def arquivos_do_cache(diretorio: str) -> list:
+    arquivos = []
+    for caminho in sorted(glob.glob(os.path.join(diretorio, "*.json"))):
+        with open(caminho, encoding="utf-8") as f:
+            nome = os.path.basename(json.load(f).get("url", ""))
+        tipo = tipo_do_arquivo(nome)
+        if tipo and nome.lower().endswith(".csv"):
+            with open(caminho[:-len(".json")] + ".bin", "rb") as f:
+                arquivos.append((nome, tipo, f.read()))
+    return arquivos
+
+
+def arquivos_sinteticos() -> list:
+    rng = np.random.default_rng(42)
+    return [
+        ("producao.csv", "producao", gerar_larga(60, "produto", ["Vinho de Mesa", "Suco", "Derivados"], rng)),
+        ("comercio.csv", "comercializacao", gerar_larga(60, "Produto", ["Vinho Fino de Mesa", "Espumantes", "Suco de Uva"], rng)),
+        ("processaviniferas.csv", "processamento", gerar_larga(160, "cultivar", CULTIVARES, rng)),
+        ("impvinhos.csv", "importacao", gerar_ano_duplo(140, rng)),
+        ("expvinho.csv", "exportacao", gerar_ano_duplo(140, rng)),
+    ]
+
+
+def linha(nome, t_antes, m_antes, t_depois, m_depois, extra=""):
+    print(f"{nome:24} {t_antes:9.2f} {t_depois:9.2f} {t_antes / t_depois:6.1f}x {m_antes:10,.0f} {m_depois:10,.0f} {extra}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--cache", help="diretório de cache da ingestão com os CSVs reais já baixados")
+    args = parser.parse_args()
+
+    arquivos = arquivos_do_cache(args.cache) if args.cache else arquivos_sinteticos()
+    if not arquivos:
+        raise SystemExit(f"nenhum CSV da Embrapa encontrado em {args.cache}")
+
+    print(f"{'':24} {'ms antes':>9} {'ms depois':>9} {'':>7} {'KiB antes':>10} {'KiB depois':>10}")
+    pagina = gerar_pagina(120)
+    (sub_a, csv_a), t_a, m_a = medir(lambda: links_antes(pagina), args.repeticoes)
+    (sub_d, csv_d), t_d, m_d = medir(lambda: links_depois(pagina), args.repeticoes)
+    assert (sub_a, csv_a) == (sub_d, csv_d), "os extratores encontraram links diferentes"
+    linha(f"página ({len(pagina) // 1024} KiB)", t_a, m_a, t_d, m_d)
+
+    for nome, tipo, conteudo in arquivos:
+        antes, t_a, m_a = medir(lambda: longo_antes(ler_csv_antes(conteudo), tipo), args.repeticoes)
+        depois, t_d, m_d = medir(lambda: longo_depois(ler_csv(conteudo), tipo), args.repeticoes)
+        assert len(antes) == len(depois), f"{nome}: {len(antes)} x {len(depois)} linhas"
+        ocupado = depois.memory_usage(deep=True).sum() / antes.memory_usage(deep=True).sum()
+        linha(f"{tipo} ({nome})", t_a, m_a, t_d, m_d, f"{len(depois)} linhas, DataFrame final com {ocupado:.0%} da memória")
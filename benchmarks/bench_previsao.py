@@ -0,0 +1,57 @@
+"""
+Benchmark do ajuste do modelo de previsão: uma regressão por série (np.linalg.lstsq em laço)
+x ajuste em lote de todas as séries (app.previsao.ajustar_em_lote).
+
+Uso: python -m benchmarks.bench_previsao [--series 45] [--anos 54] [--repeticoes 20]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.previsao import JANELA_AJUSTE, ajustar_em_lote
+
+
+def gerar_series(series: int, anos: int) -> np.ndarray:
+    rng = np.random.default_rng(42)
+    t = np.arange(anos)
+    base = rng.uniform(1e5, 1e8, (series, 1))
+    tendencia = rng.normal(0, 0.02, (series, 1)) * base * t
+    return np.abs(base + tendencia + rng.normal(0, 0.05, (series, anos)) * base)
+
+
+def ajustar_por_serie(y: np.ndarray, anos: np.ndarray):
+    y = y[:, -JANELA_AJUSTE:]
+    t = (anos[-JANELA_AJUSTE:] - anos[-1]).astype("float64")
+    coeficientes = np.empty((len(y), 3))
+    for i, serie in enumerate(y):
+        serie = serie / np.mean(np.abs(serie))
+        X = np.column_stack([np.ones(len(serie) - 1), t[1:], serie[:-1]])
+        coeficientes[i] = np.linalg.lstsq(X, serie[1:], rcond=None)[0]
+    coeficientes[:, 2] = np.clip(coeficientes[:, 2], -0.99, 0.99)
+    return coeficientes
+
+
+def medir(funcao, y, anos, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao(y, anos)
+    return resultado, (time.perf_counter() - inicio) / repeticoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--series", type=int, default=45)
+    parser.add_argument("--anos", type=int, default=54)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    y = gerar_series(args.series, args.anos)
+    anos = np.arange(1970, 1970 + args.anos)
+    por_serie, t_laco = medir(ajustar_por_serie, y, anos, args.repeticoes)
+    (em_lote, _), t_lote = medir(ajustar_em_lote, y, anos, args.repeticoes)
+
+    np.testing.assert_allclose(em_lote, por_serie, rtol=1e-4, atol=1e-4)  # diferença apenas da regularização 1e-8
+    print(f"{args.series} séries x {args.anos} anos (janela de {JANELA_AJUSTE} anos), coeficientes equivalentes")
+    print(f"lstsq por série : {t_laco * 1000:8.2f} ms")
+    print(f"ajuste em lote  : {t_lote * 1000:8.2f} ms  ({t_laco / t_lote:.1f}x)")
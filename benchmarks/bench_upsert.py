@@ -0,0 +1,112 @@
+"""
+Benchmark da gravação: inserção linha a linha (implementação anterior) x upsert em lote
+x diferença incremental (hash por chave, grava só o que mudou).
+
+Uso: python -m benchmarks.bench_upsert [--itens 60] [--anos 54]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_upsert.db")
+
+from sqlalchemy import func, or_, select  # noqa: E402
+from sqlalchemy.dialects.sqlite import insert  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models import AlteracaoDados, Producao  # noqa: E402
+from app.persistencia import ESQUEMAS, TAMANHO_LOTE, gravar_incremental, preparar_registros, trava_escrita  # noqa: E402
+
+
+def gerar_producao(itens: int, anos: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    ids = np.repeat(np.arange(1, itens + 1), anos)
+    return pd.DataFrame({
+        "id": ids,
+        "categoria": "geral",
+        "control": [f"ctl_{i}" for i in ids],
+        "produto": [f"Produto {i}" for i in ids],
+        "ano": np.tile(np.arange(1970, 1970 + anos), itens),
+        "quantidade": rng.uniform(0, 1e8, itens * anos),
+    })
+
+
+def salvar_linha_a_linha(df: pd.DataFrame):
+    session = SessionLocal()
+    for _, row in df.iterrows():
+        exists = session.query(Producao).filter_by(id_original=int(row["id"]), ano=int(row["ano"])).first()
+        if not exists:
+            session.add(Producao(
+                id_original=int(row["id"]),
+                control=str(row["control"]),
+                produto=str(row["produto"]),
+                ano=int(row["ano"]),
+                producao_toneladas=float(row["quantidade"]),
+            ))
+    session.commit()
+    session.close()
+
+
+def montar_upsert(tipo: str):
+    """
+    `INSERT ... ON CONFLICT (chave) DO UPDATE`, que só reescreve a linha quando algum valor mudou.
+    """
+    esquema = ESQUEMAS[tipo]
+    tabela = esquema["modelo"].__table__
+    valores = [c for c in esquema["colunas"].values() if c not in esquema["chave"]]
+
+    stmt = insert(tabela)
+    return stmt.on_conflict_do_update(
+        index_elements=esquema["chave"],
+        set_={c: stmt.excluded[c] for c in valores},
+        where=or_(*[tabela.c[c].is_distinct_from(stmt.excluded[c]) for c in valores]),
+    )
+
+
+def upsert_em_lote(df: pd.DataFrame, tipo: str, tamanho_lote: int = TAMANHO_LOTE):
+    """
+    Upsert em lote (implementação anterior à gravação incremental): envia todas as linhas do
+    CSV em executemany, numa única transação, sem remover as que saíram nem registrar alterações.
+    """
+    dados = preparar_registros(df, tipo)
+    registros = dados.astype(object).where(dados.notna(), None).to_dict(orient="records")
+    tabela = ESQUEMAS[tipo]["modelo"].__table__
+    stmt = montar_upsert(tipo)
+
+    modificados = 0
+    with trava_escrita, engine.begin() as conn:
+        antes = conn.execute(select(func.count()).select_from(tabela)).scalar()
+        for inicio in range(0, len(registros), tamanho_lote):
+            modificados += conn.execute(stmt, registros[inicio:inicio + tamanho_lote]).rowcount
+        depois = conn.execute(select(func.count()).select_from(tabela)).scalar()
+
+    inseridos = depois - antes
+    return {"inseridos": inseridos, "atualizados": modificados - inseridos, "inalterados": len(registros) - modificados}
+
+
+def medir(nome, funcao, df):
+    Base.metadata.drop_all(bind=engine, tables=[Producao.__table__])
+    Base.metadata.create_all(bind=engine, tables=[Producao.__table__, AlteracaoDados.__table__])
+    alterado = df.assign(quantidade=df["quantidade"].where(df.index % 100 != 0, df["quantidade"] + 1))
+    for rodada, dados in (("carga inicial", df), ("recarga", df), ("1% alterado", alterado)):
+        inicio = time.perf_counter()
+        resultado = funcao(dados)
+        duracao = time.perf_counter() - inicio
+        print(f"{nome:<15} {rodada:<14} {len(df) / duracao:>12,.0f} linhas/s  {resultado or ''}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--itens", type=int, default=60)
+    parser.add_argument("--anos", type=int, default=54)
+    args = parser.parse_args()
+
+    df = gerar_producao(args.itens, args.anos)
+    print(f"{len(df)} linhas ({args.itens} itens x {args.anos} anos)")
+    medir("linha a linha", salvar_linha_a_linha, df)
+    medir("upsert em lote", lambda d: upsert_em_lote(d, "producao"), df)
+    medir("incremental", lambda d: gravar_incremental(d, "producao"), df)
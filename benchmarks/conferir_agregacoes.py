@@ -0,0 +1,64 @@
+"""
+Conferência das agregações: a soma por categoria e ano de `/agregacoes/{tipo}` (nível padrão,
+itens de primeiro nível) precisa ser igual ao total da categoria em `totais_arvore`, em todos os
+conjuntos de produtos/cultivares. Falha (código de saída 1) na primeira divergência.
+
+O banco de origem é copiado para um diretório temporário (nunca é alterado).
+
+Uso: python -m benchmarks.conferir_agregacoes [--banco dados_embrapa.db]
+"""
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+import warnings
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--banco", default="dados_embrapa.db", help="banco de origem (é copiado, nunca alterado)")
+args = parser.parse_args()
+
+copia = os.path.join(tempfile.mkdtemp(), "conferir_agregacoes.db")
+shutil.copy(args.banco, copia)
+os.environ["DATABASE_URL"] = f"sqlite:///{copia}"
+os.environ["AGENDADOR_ATIVO"] = "0"
+warnings.filterwarnings("ignore")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from app.agregacoes import colunas_valor  # noqa: E402
+from app.consultas import TABELAS, TABELAS_ARVORE  # noqa: E402
+from app.database import SessionLeitura  # noqa: E402
+from app.migracoes import inicializar_banco  # noqa: E402
+from app.models import TotalArvore  # noqa: E402
+from app.utils import create_access_token  # noqa: E402
+
+inicializar_banco()
+cliente = TestClient(main.app)
+cabecalhos = {"Authorization": f"Bearer {create_access_token({'sub': 'conferencia'})}"}
+
+divergencias = 0
+with SessionLeitura() as db:
+    for tipo in TABELAS_ARVORE:
+        esperado = {
+            (t.categoria, t.ano): t.total
+            for t in db.query(TotalArvore).filter(TotalArvore.tabela == tipo, TotalArvore.chave == "")
+        }
+        resposta = cliente.get(
+            f"/agregacoes/{tipo}?agrupar=categoria&agrupar=ano&agregacao=soma&limite=10000", headers=cabecalhos
+        )
+        resposta.raise_for_status()
+        coluna = f"soma_{colunas_valor(TABELAS[tipo]['modelo'].__table__)[0].name}"
+        obtido = {(r["categoria"], r["ano"]): r[coluna] for r in resposta.json()["resultados"]}
+
+        for chave in sorted(esperado.keys() | obtido.keys()):
+            a, b = esperado.get(chave), obtido.get(chave)
+            if a is None or b is None or not math.isclose(a, b, rel_tol=1e-9):
+                print(f"{tipo} {chave}: totais_arvore={a} agregacoes={b}")
+                divergencias += 1
+        print(f"{tipo:16} {len(esperado):5} (categoria, ano) conferidos")
+
+print(f"{divergencias} divergências")
+sys.exit(1 if divergencias else 0)
@@ -0,0 +1,136 @@
+"""
+Teste de carga do caminho de leitura: endpoint de consulta síncrono (def + SQLAlchemy síncrono,
+limitado ao pool de threads do Starlette) x assíncrono (async def + aiosqlite), cada um num
+processo uvicorn com um único worker, sob centenas de requisições simultâneas.
+
+O cache de respostas é desligado para que toda requisição chegue ao banco, e o banco de origem
+é copiado para um diretório temporário (nunca é alterado).
+
+Uso: python -m benchmarks.load_async [--concorrencia 50 200 500] [--duracao 10] [--banco dados_embrapa.db]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+from fastapi import Depends, FastAPI, Query, Request
+from sqlalchemy.orm import Session
+
+if __name__ == "__main__":
+    # Antes de importar o app: o banco usado é sempre uma cópia temporária
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/load_async.db"
+    os.environ["CACHE_RESPOSTAS_TAMANHO"] = "0"  # toda requisição chega ao banco
+    os.environ["AGENDADOR_ATIVO"] = "0"  # sem ingestão concorrendo com a carga
+
+from app.auth_token import _verificar_com_cache, oauth2_scheme
+from app.cache_respostas import responder_com_cache
+from app.consultas import consultar_tabela
+from app.database import get_db_leitura
+from app.migracoes import inicializar_banco
+from app.utils import create_access_token
+
+# Versão síncrona do endpoint /producao, como era antes do caminho assíncrono
+app_sincrono = FastAPI()
+
+
+def usuario_sincrono(token: str = Depends(oauth2_scheme)):
+    return _verificar_com_cache(token)["sub"]
+
+
+@app_sincrono.get("/producao")
+def producao(
+    request: Request,
+    ano: Optional[int] = Query(None, ge=1970, le=2100),
+    produto: Optional[str] = None,
+    categoria: Optional[str] = None,
+    limite: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db_leitura),
+    usuario: str = Depends(usuario_sincrono),
+):
+    return responder_com_cache(request, lambda: consultar_tabela(db, "producao", ano, produto, limite, offset, categoria))
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor(aplicacao: str, ambiente: dict):
+    porta = porta_livre()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", aplicacao, "--port", str(porta), "--log-level", "warning"],
+        env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", porta), timeout=0.1).close()
+            return processo, f"http://127.0.0.1:{porta}"
+        except OSError:
+            time.sleep(0.1)
+    processo.terminate()
+    raise RuntimeError(f"uvicorn não iniciou para {aplicacao}")
+
+
+async def carga(url: str, token: str, concorrencia: int, duracao: float):
+    import httpx
+
+    latencias, erros = [], 0
+    fim = time.perf_counter() + duracao
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60, headers={"Authorization": f"Bearer {token}"}) as cliente:
+        async def usuario():
+            nonlocal erros
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                try:
+                    resposta = await cliente.get("/producao", params={"ano": random.randint(1970, 2023), "limite": 50})
+                except httpx.HTTPError:
+                    erros += 1
+                    continue
+                if resposta.status_code == 200:
+                    latencias.append(time.perf_counter() - inicio)
+                else:
+                    erros += 1
+
+        await asyncio.gather(*[usuario() for _ in range(concorrencia)])
+    latencias.sort()
+    return {
+        "req_s": len(latencias) / duracao,
+        "p50_ms": latencias[len(latencias) // 2] * 1000 if latencias else 0,
+        "p99_ms": latencias[int(len(latencias) * 0.99)] * 1000 if latencias else 0,
+        "erros": erros,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--duracao", type=float, default=10)
+    parser.add_argument("--banco", default="dados_embrapa.db", help="banco de origem (é copiado, nunca alterado)")
+    args = parser.parse_args()
+
+    shutil.copy(args.banco, os.environ["DATABASE_URL"].removeprefix("sqlite:///"))
+    ambiente = dict(os.environ)
+    inicializar_banco()
+    token = create_access_token({"sub": "carga"})
+
+    print(f"GET /producao?ano=<aleatório>&limite=50, {args.duracao:.0f}s por cenário, 1 worker uvicorn")
+    print(f"{'modo':10} {'concorrência':>12} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'erros':>6}")
+    for nome, aplicacao in (("síncrono", "benchmarks.load_async:app_sincrono"), ("assíncrono", "main:app")):
+        processo, url = iniciar_servidor(aplicacao, ambiente)
+        try:
+            for concorrencia in args.concorrencia:
+                r = asyncio.run(carga(url, token, concorrencia, args.duracao))
+                print(f"{nome:10} {concorrencia:12} {r['req_s']:8.0f} {r['p50_ms']:8.1f} {r['p99_ms']:9.1f} {r['erros']:6}")
+        finally:
+            processo.terminate()
+            processo.wait()
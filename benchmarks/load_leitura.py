@@ -0,0 +1,126 @@
+"""
+Teste de carga de leitura: vazão e latência dos endpoints de consulta enquanto uma ingestão
+grava no banco ao mesmo tempo, com o journal padrão do SQLite (DELETE) x WAL.
+
+Cada modo roda num processo próprio, com um banco temporário; a escrita roda em outro processo
+(como a CLI de ingestão ao lado da API), para não disputar o GIL com os leitores. Por padrão é uma
+ingestão sintética (gravação incremental + recálculo dos resumos, em ciclo); com `--ingestao` é a
+ingestão completa de `app.ingestao` (use EMBRAPA_BASE_URL para apontar para um servidor de teste).
+
+Uso: python -m benchmarks.load_leitura [--leitores 8] [--duracao 10] [--ingestao]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+
+def executar_modo(args):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/load_leitura.db"
+    os.environ["SQLITE_JOURNAL_MODE"] = args.modo
+
+    from app.consultas import consultar_tabela
+    from app.database import SessionLeitura, engine
+    from app.migracoes import inicializar_banco
+    from app.persistencia import gravar_incremental
+    from app.resumos import atualizar_resumos_pendentes
+    from benchmarks.bench_upsert import gerar_producao
+
+    inicializar_banco()
+    base = gerar_producao(args.itens, args.anos)
+    gravar_incremental(base, "producao")
+    atualizar_resumos_pendentes("producao")
+
+    parar = threading.Event()
+    parar_escrita = multiprocessing.Event()
+    ciclos = multiprocessing.Value("i", 0)
+    latencias, erros = [], []
+
+    def leitor(semente):
+        rng = np.random.default_rng(semente)
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            db = SessionLeitura()
+            try:
+                consultar_tabela(db, "producao", ano=int(rng.integers(1970, 1970 + args.anos)), limite=100)
+                latencias.append(time.perf_counter() - inicio)
+            except Exception as e:
+                erros.append(type(e).__name__)
+            finally:
+                db.close()
+
+    def escritor():
+        engine.dispose(close=False)  # conexões do pool não podem ser compartilhadas após o fork
+        while not parar_escrita.is_set():
+            if args.ingestao:
+                from app.ingestao import atualizar_todos
+                atualizar_todos(forcar=True)
+            else:
+                df = base.assign(quantidade=base["quantidade"] * (1 + 0.01 * (ciclos.value + 1)))
+                gravar_incremental(df, "producao")
+                atualizar_resumos_pendentes("producao")
+            ciclos.value += 1
+
+    threads = [threading.Thread(target=leitor, args=(i,)) for i in range(args.leitores)]
+    processo = multiprocessing.get_context("fork").Process(target=escritor)
+    if not args.sem_escrita:
+        processo.start()
+    for t in threads:
+        t.start()
+    time.sleep(args.duracao)
+    parar.set()
+    parar_escrita.set()
+    for t in threads:
+        t.join()
+    if not args.sem_escrita:
+        processo.join()
+
+    ms = np.array(latencias) * 1000
+    print(json.dumps({
+        "modo": args.modo,
+        "escrita": not args.sem_escrita,
+        "leituras_por_s": len(latencias) / args.duracao,
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else None,
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else None,
+        "max_ms": float(ms.max()) if len(ms) else None,
+        "erros": len(erros),
+        "ciclos_escrita": ciclos.value,
+    }))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leitores", type=int, default=8)
+    parser.add_argument("--duracao", type=float, default=10)
+    parser.add_argument("--itens", type=int, default=400)
+    parser.add_argument("--anos", type=int, default=54)
+    parser.add_argument("--ingestao", action="store_true", help="usa a ingestão completa como carga de escrita")
+    parser.add_argument("--modo", help=argparse.SUPPRESS)
+    parser.add_argument("--sem-escrita", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        executar_modo(args)
+        sys.exit()
+
+    repassados = sys.argv[1:]
+    print(f"{args.leitores} leitores, {args.duracao:.0f}s por cenário, tabela de {args.itens * args.anos} linhas")
+    print(f"{'journal':8} {'escrita':8} {'leituras/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'máx ms':>9} {'erros':>6} {'ciclos':>7}")
+    for modo in ("DELETE", "WAL"):
+        for extra in (["--sem-escrita"], []):
+            saida = subprocess.run(
+                [sys.executable, "-m", "benchmarks.load_leitura", *repassados, "--modo", modo, *extra],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            r = json.loads(saida.strip().splitlines()[-1])
+            print(
+                f"{r['modo']:8} {'sim' if r['escrita'] else 'não':8} {r['leituras_por_s']:11.0f} "
+                f"{r['p50_ms'] or 0:8.2f} {r['p99_ms'] or 0:8.2f} {r['max_ms'] or 0:9.1f} {r['erros']:6} {r['ciclos_escrita']:7}"
+            )
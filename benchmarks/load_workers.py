@@ -0,0 +1,128 @@
+"""
+Teste de carga com vários workers do uvicorn (`WEB_CONCURRENCY`): vazão e latência de uma mistura
+de consultas e análises, com o cache de respostas de cada processo (`memoria`) e com o cache
+compartilhado entre os workers (`sqlite`).
+
+As falhas de cache são contadas pelo cabeçalho `Server-Timing` (`cache;desc="falha"`): com o cache
+compartilhado, cada resposta é calculada uma vez por todos os workers; com o cache do processo,
+até uma vez por worker.
+
+O banco de origem é copiado para um diretório temporário (nunca é alterado).
+
+Uso: python -m benchmarks.load_workers [--workers 1 2 4] [--concorrencia 100] [--duracao 10] [--banco dados_embrapa.db]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+if __name__ == "__main__":
+    # Antes de importar o app: o banco usado é sempre uma cópia temporária
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/load_workers.db"
+    os.environ["AGENDADOR_ATIVO"] = "0"  # sem ingestão concorrendo com a carga
+
+from app.migracoes import inicializar_banco  # noqa: E402
+from app.utils import create_access_token  # noqa: E402
+
+CAMINHOS = [
+    *[f"/producao?ano={ano}&limite=50" for ano in range(1970, 2024)],
+    *[f"/exportacao?ano={ano}" for ano in range(2000, 2024)],
+    *[f"/analytics/producao/previsao?anos={anos}" for anos in range(1, 11)],
+    *[f"/analytics/comercializacao/ranking-regioes?ano={ano}" for ano in range(2010, 2024)],
+    *[f"/analytics/exportacao/tendencias?pais={pais}" for pais in ("Paraguai", "Rússia", "Estados Unidos", "China", "Japão")],
+]
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor(ambiente: dict, aquecimento: float):
+    porta = porta_livre()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta), "--log-level", "warning"],
+        env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{porta}"
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(url + "/", timeout=1).close()
+            # Tempo para todos os workers subirem e carregarem a cópia colunar (que invalida o cache)
+            time.sleep(aquecimento)
+            return processo, url
+        except OSError:
+            time.sleep(0.1)
+    processo.terminate()
+    raise RuntimeError("uvicorn não iniciou")
+
+
+async def carga(url: str, token: str, concorrencia: int, duracao: float):
+    import httpx
+
+    latencias, erros, falhas_cache = [], 0, 0
+    fim = time.perf_counter() + duracao
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60, headers={"Authorization": f"Bearer {token}"}) as cliente:
+        async def usuario():
+            nonlocal erros, falhas_cache
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                try:
+                    resposta = await cliente.get(random.choice(CAMINHOS))
+                except httpx.HTTPError:
+                    erros += 1
+                    continue
+                if resposta.status_code == 200:
+                    latencias.append(time.perf_counter() - inicio)
+                    falhas_cache += 'cache;desc="falha"' in resposta.headers.get("server-timing", "")
+                else:
+                    erros += 1
+
+        await asyncio.gather(*[usuario() for _ in range(concorrencia)])
+    latencias.sort()
+    return {
+        "req_s": len(latencias) / duracao,
+        "p50_ms": latencias[len(latencias) // 2] * 1000 if latencias else 0,
+        "p99_ms": latencias[int(len(latencias) * 0.99)] * 1000 if latencias else 0,
+        "falhas_cache": falhas_cache,
+        "erros": erros,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concorrencia", type=int, default=100)
+    parser.add_argument("--duracao", type=float, default=10)
+    parser.add_argument("--aquecimento", type=float, default=5)
+    parser.add_argument("--banco", default="dados_embrapa.db", help="banco de origem (é copiado, nunca alterado)")
+    args = parser.parse_args()
+
+    banco = os.environ["DATABASE_URL"].removeprefix("sqlite:///")
+    shutil.copy(args.banco, banco)
+    inicializar_banco()
+    token = create_access_token({"sub": "carga"})
+
+    print(f"{len(CAMINHOS)} caminhos distintos, {args.concorrencia} clientes, {args.duracao:.0f}s por cenário, {os.cpu_count()} CPU(s)")
+    print(f"{'cache':8} {'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'falhas cache':>13} {'erros':>6}")
+    for backend in ("memoria", "sqlite"):
+        for workers in args.workers:
+            cache_arquivo = os.path.join(os.path.dirname(banco), f".cache_respostas_{workers}.sqlite")
+            ambiente = {**os.environ, "WEB_CONCURRENCY": str(workers), "CACHE_RESPOSTAS_BACKEND": backend,
+                        "CACHE_RESPOSTAS_ARQUIVO": cache_arquivo}
+            processo, url = iniciar_servidor(ambiente, args.aquecimento)
+            try:
+                r = asyncio.run(carga(url, token, args.concorrencia, args.duracao))
+            finally:
+                processo.terminate()
+                processo.wait()
+            print(f"{backend:8} {workers:7} {r['req_s']:8.0f} {r['p50_ms']:8.1f} {r['p99_ms']:9.1f} {r['falhas_cache']:13} {r['erros']:6}")
@@ -0,0 +1,107 @@
+"""
+Verificação dos planos de consulta: exercita os endpoints da API sobre uma cópia do banco,
+captura cada SQL emitido e roda EXPLAIN QUERY PLAN. Falha (código de saída 1) se alguma
+consulta filtrada cair numa varredura completa (SCAN da tabela ou de um índice inteiro,
+em vez de SEARCH por um índice).
+
+Consultas sem WHERE (ex: exportação completa, paginada pela chave primária) leem a tabela
+inteira por definição e não contam como falha.
+
+Uso: python -m benchmarks.planos_consultas [--banco dados_embrapa.db] [--verbose]
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import warnings
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--banco", default="dados_embrapa.db", help="banco de origem (é copiado, nunca alterado)")
+parser.add_argument("--verbose", action="store_true", help="mostra o plano de todas as consultas")
+args = parser.parse_args()
+
+copia = os.path.join(tempfile.mkdtemp(), "planos.db")
+shutil.copy(args.banco, copia)
+os.environ["DATABASE_URL"] = f"sqlite:///{copia}"
+os.environ["CACHE_RESPOSTAS_TAMANHO"] = "0"  # sem cache, cada requisição chega ao banco
+os.environ["EXPORTACAO_LOTE"] = "50"
+warnings.filterwarnings("ignore")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, text  # noqa: E402
+
+import main  # noqa: E402
+from app.database import engine, engine_async, engine_leitura  # noqa: E402
+from app.migracoes import inicializar_banco  # noqa: E402
+from app.utils import create_access_token  # noqa: E402
+
+REQUISICOES = [
+    *[
+        f"/{tipo}?{params}"
+        for tipo, filtro in (
+            ("producao", "produto=VINHO DE MESA"),
+            ("comercializacao", "produto=VINHO DE MESA"),
+            ("processamento", "cultivar=Isabel"),
+            ("importacao", "pais=Chile"),
+            ("exportacao", "pais=Paraguai"),
+        )
+        for params in ("", "ano=2020", filtro, f"{filtro}&ano=2020", "categoria=geral", f"categoria=geral&{filtro}&offset=10")
+    ],
+    "/analytics/producao/previsao?anos=3",
+    "/analytics/exportacao/tendencias?pais=Paraguai",
+    "/analytics/comercializacao/ranking-regioes?ano=2020",
+    "/analytics/importacao/alerta-estoque?produto=vinhos",
+    "/analytics/producao/arvore",
+    "/analytics/comercializacao/arvore?no=1&ano=2020",
+    *[f"/exportar/{tipo}?formato=ndjson" for tipo in ("producao", "importacao")],
+    "/exportar/exportacao?formato=csv&categoria=espumantes&ano_inicial=2015",
+    "/exportar/processamento?formato=ndjson&ano_inicial=2020&ano_final=2021",
+    "/agregacoes/exportacao?agrupar=ano&agrupar=pais&agregacao=soma&agregacao=crescimento&pais=Chile&pais=Paraguai&ano_inicial=2015",
+    "/agregacoes/producao?agrupar=produto&agregacao=media&agregacao=maximo&produto=VINHO DE MESA&produto=SUCO",
+    "/agregacoes/processamento?agrupar=ano&agregacao=soma&categoria=viniferas&ano_inicial=2010&ano_final=2020",
+    "/agregacoes/importacao?agrupar=&agregacao=soma&ano_inicial=2020",
+    "/agregacoes/comercializacao?agrupar=ano&agregacao=soma&nivel=todos&control=vm_Tinto",
+]
+
+# Sem o lifespan (e sua cópia em memória), as consultas dos endpoints vão ao banco
+inicializar_banco()
+consultas = {}
+
+def capturar(conn, cursor, sql, parametros, contexto, executemany):
+    if sql.lstrip().upper().startswith("SELECT") and not executemany:
+        consultas.setdefault(sql, parametros)
+
+for e in (engine, engine_leitura, engine_async.sync_engine):
+    event.listen(e, "before_cursor_execute", capturar)
+
+cliente = TestClient(main.app)
+cabecalhos = {"Authorization": "Bearer " + create_access_token({"sub": "planos"})}
+for caminho in REQUISICOES:
+    resposta = cliente.get(caminho, headers=cabecalhos)
+    if resposta.status_code != 200:
+        print(f"aviso: {caminho} respondeu {resposta.status_code}; suas consultas podem não ter sido exercitadas")
+admin = {"username": "admin", "password": "admin123"}
+cliente.post("/solicitacoes-pendentes", data=admin)
+cliente.post("/status-acesso", data={"username": "planos", "password": "x"})
+
+for e in (engine, engine_leitura, engine_async.sync_engine):
+    event.remove(e, "before_cursor_execute", capturar)
+
+# Varredura de uma tabela; percorrer o resultado de uma subconsulta do SQLAlchemy (anon_N) não conta
+VARREDURA = re.compile(r"^SCAN (?!anon_\d)\w+")
+falhas = 0
+with engine.connect() as conn:
+    for sql, parametros in consultas.items():
+        plano = [linha[3] for linha in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parametros)]
+        varreduras = [p for p in plano if VARREDURA.match(p)]
+        falhou = bool(varreduras) and re.search(r"\bWHERE\b", sql, re.I)
+        falhas += bool(falhou)
+        if falhou or args.verbose:
+            print(("FALHA " if falhou else "ok    ") + " ".join(sql.split())[:160])
+            for passo in plano:
+                print(f"        {passo}")
+
+print(f"{len(consultas)} consultas distintas, {falhas} com varredura completa")
+sys.exit(1 if falhas else 0)
@@ -0,0 +1,124 @@
+"""
+Servidor local no formato do site da Embrapa (páginas `index.php?opcao=...&subopcao=...` com os
+botões das sub-abas e o link de download, e os CSVs em `download/`), para rodar a ingestão sem
+acesso à internet.
+
+Os CSVs são gerados com semente fixa, no formato de cada aba: produtos/cultivares com itens e
+subitens (`control` prefixado), separados por `;` ou por tabulação, e importação/exportação com
+o par quantidade/valor de cada ano.
+
+Uso: python -m benchmarks.servidor_embrapa_local [--porta 8765] [--diretorio DIR]
+
+e, em outro terminal, com um banco e um cache de downloads descartáveis:
+
+    EMBRAPA_BASE_URL=http://127.0.0.1:8765/ DATABASE_URL=sqlite:////tmp/local.db \\
+    CACHE_DOWNLOAD_DIR=/tmp/cache_local python -m app.ingestao
+"""
+import argparse
+import functools
+import http.server
+import os
+import tempfile
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+ANOS = list(range(1970, 2024))
+PAISES = ["Alemanha", "Argentina", "Chile", "França", "Itália", "Portugal", "Uruguai"]
+ITENS = [("VINHO DE MESA", ["Tinto", "Branco", "Rosado"]), ("SUCO", ["Suco simples", "Suco concentrado"])]
+
+# Aba -> (rótulo da sub-aba, arquivo); rótulo vazio para abas sem sub-abas
+ABAS = {
+    "opt_02": [("", "Producao.csv")],
+    "opt_03": [
+        ("Viníferas", "ProcessaViniferas.csv"),
+        ("Americanas e híbridas", "ProcessaAmericanas.csv"),
+        ("Uvas de mesa", "ProcessaMesa.csv"),
+        ("Sem classificação", "ProcessaSemclass.csv"),
+    ],
+    "opt_04": [("", "Comercio.csv")],
+    "opt_05": [
+        ("Vinhos de mesa", "ImpVinhos.csv"),
+        ("Espumantes", "ImpEspumantes.csv"),
+        ("Uvas frescas", "ImpFrescas.csv"),
+        ("Uvas passas", "ImpPassas.csv"),
+        ("Suco de uva", "ImpSuco.csv"),
+    ],
+    "opt_06": [
+        ("Vinhos de mesa", "ExpVinho.csv"),
+        ("Espumantes", "ExpEspumantes.csv"),
+        ("Uvas frescas", "ExpUva.csv"),
+        ("Suco de uva", "ExpSuco.csv"),
+    ],
+}
+
+
+def _csv_itens(caminho: str, coluna_nome: str, itens: list, rng, sep: str = ";"):
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(sep.join(["id", "control", coluna_nome] + [str(a) for a in ANOS]) + "\n")
+        id_original = 0
+        for item, subitens in itens:
+            id_original += 1
+            f.write(sep.join([str(id_original), item, item] + [str(int(v)) for v in rng.uniform(0, 1e6, len(ANOS))]) + "\n")
+            for subitem in subitens:
+                id_original += 1
+                control = f"{item[:2].lower()}_{subitem}"
+                f.write(sep.join([str(id_original), control, subitem] + [str(int(v)) for v in rng.uniform(0, 1e5, len(ANOS))]) + "\n")
+
+
+def _csv_paises(caminho: str, rng):
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write("\t".join(["Id", "País"] + [str(a) for a in ANOS for _ in (0, 1)]) + "\n")
+        for i, pais in enumerate(PAISES, start=1):
+            f.write("\t".join([str(i), pais] + [str(int(v)) for v in rng.uniform(0, 1e5, 2 * len(ANOS))]) + "\n")
+
+
+def gerar_arquivos(diretorio: str):
+    rng = np.random.default_rng(0)
+    download = os.path.join(diretorio, "download")
+    os.makedirs(download, exist_ok=True)
+    _csv_itens(os.path.join(download, "Producao.csv"), "produto", ITENS, rng)
+    _csv_itens(os.path.join(download, "Comercio.csv"), "Produto", ITENS, rng)
+    _csv_itens(os.path.join(download, "ProcessaViniferas.csv"), "cultivar",
+               [("TINTAS", ["Cabernet", "Merlot"]), ("BRANCAS", ["Chardonnay"])], rng)
+    for arquivo in ("ProcessaAmericanas.csv", "ProcessaMesa.csv", "ProcessaSemclass.csv"):
+        _csv_itens(os.path.join(download, arquivo), "cultivar",
+                   [("TINTAS", ["Isabel", "Bordo"]), ("BRANCAS", ["Niagara"])], rng, sep="\t")
+    for subabas in (ABAS["opt_05"], ABAS["opt_06"]):
+        for _, arquivo in subabas:
+            _csv_paises(os.path.join(download, arquivo), rng)
+
+
+class ManipuladorEmbrapa(http.server.SimpleHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.endswith("index.php"):
+            return super().do_GET()  # CSVs em download/
+
+        parametros = parse_qs(url.query)
+        subabas = ABAS.get(parametros.get("opcao", ["opt_01"])[0], [])
+        indice = int(parametros.get("subopcao", ["subopt_01"])[0][-2:]) - 1 if subabas else 0
+        botoes = "".join(
+            f'<button type="submit" value="subopt_{i + 1:02d}" name="subopcao" class="btn_sopt">{rotulo}</button>'
+            for i, (rotulo, _) in enumerate(subabas) if rotulo
+        )
+        link = f'<a href="download/{subabas[indice][1]}" class="footer_content" target="_blank">DOWNLOAD</a>' if subabas else ""
+        corpo = f"<html><body><form>{botoes}</form><table></table>{link}</body></html>".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--diretorio", help="onde gravar os CSVs gerados (padrão: diretório temporário)")
+    args = parser.parse_args()
+
+    diretorio = args.diretorio or tempfile.mkdtemp()
+    gerar_arquivos(diretorio)
+    manipulador = functools.partial(ManipuladorEmbrapa, directory=diretorio)
+    print(f"servindo {diretorio} em http://127.0.0.1:{args.porta}/ (EMBRAPA_BASE_URL)")
+    http.server.ThreadingHTTPServer(("127.0.0.1", args.porta), manipulador).serve_forever()
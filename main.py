@@ -1,16 +1,38 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routes import router
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import Base, engine
-from app.models import Producao
+from app.agendador import agendador
+from app.colunar import copia as copia_colunar
+from app.config import settings
+from app.database import engine_async
+from app.metricas import MiddlewareMetricas
+from app.migracoes import inicializar_banco
 
-# Criação das tabelas
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Criação das tabelas e migrações pendentes, na subida e não no import do módulo. Com vários
+    # workers, a trava `.migracoes.lock` faz um migrar de cada vez; os seguintes não têm nada a aplicar.
+    if settings.MIGRACOES_NA_SUBIDA:
+        await asyncio.to_thread(inicializar_banco)
+    # Cópia colunar em memória das tabelas de dados, usada pelos endpoints de consulta
+    if settings.COLUNAR_ATIVO:
+        await copia_colunar.iniciar()
+    # Atualização periódica dos dados da Embrapa em segundo plano
+    if settings.AGENDADOR_ATIVO:
+        await agendador.iniciar()
+    yield
+    await agendador.parar()
+    await copia_colunar.parar()
+    # Fecha as conexões aiosqlite (e suas threads) antes de o processo terminar
+    await engine_async.dispose()
 
 app = FastAPI(
     title="Tech Challenge API - Embrapa",
     description="Consulta pública dos dados de vitivinicultura da Embrapa",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Libera CORS se necessário
@@ -22,6 +44,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Histograma de latência por rota (/metrics) e cabeçalho Server-Timing em cada resposta
+app.add_middleware(MiddlewareMetricas)
+
 app.include_router(router)
 
 @app.get("/")